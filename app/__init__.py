@@ -7,6 +7,10 @@ def create_app():
     app = Flask(__name__, template_folder='views', static_folder='static')
     app.config.from_object(Config)
 
+    # Pool de conexiones: devolver al pool lo prestado en cada request
+    from .database import init_app as init_db
+    init_db(app)
+
     # =========================================================================
     # 1. Importar Blueprints (Controladores)
     # =========================================================================
@@ -67,6 +71,10 @@ def create_app():
     app.register_blueprint(empresa_bp, url_prefix='/empresa')
     app.register_blueprint(reportes_bp, url_prefix='/reportes')
 
+    # Comandos de mantenimiento (flask kardex-recalcular, ...)
+    from .commands import register_commands
+    register_commands(app)
+
     # Ruta principal
     @app.route('/')
     def index():
@@ -0,0 +1,254 @@
+# app/commands.py
+"""Comandos de mantenimiento para `flask <comando>` (registrados en create_app)."""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import click
+
+from app.database import get_db_connection, close_db_connection, get_pool, UnitOfWork
+from app.models.kardex_model import KardexModel
+from app.models.reporte_model import ReporteModel
+from app.models.serie_documento_model import SerieDocumentoModel
+from app.models.venta_model import VentaModel
+
+
+def register_commands(app):
+    """Registra los comandos de línea de la aplicación."""
+    _registrar_kardex_recalcular(app)
+    _registrar_explain(app)
+    _registrar_stock_diario(app)
+    _registrar_ventas_benchmark(app)
+
+
+def _registrar_kardex_recalcular(app):
+    @app.cli.command('kardex-recalcular')
+    @click.option('--almacen', 'id_almacen', type=int, required=True, help='ID del almacén a recalcular.')
+    @click.option('--articulo', 'id_articulo', type=int, default=None, help='Solo este artículo.')
+    @click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Recalcular desde esta fecha (YYYY-MM-DD); por defecto todo el historial.')
+    @click.option('--workers', type=int, default=None,
+                  help='Artículos recalculados en paralelo (por defecto, el tamaño del pool).')
+    def kardex_recalcular(id_almacen, id_articulo, desde, workers):
+        """Recalcula saldos y costos promedio del kardex de un almacén, en paralelo por artículo."""
+        kardex_model = KardexModel()
+        articulos = [id_articulo] if id_articulo else kardex_model.get_articulos_con_kardex(id_almacen)
+        if not articulos:
+            click.echo(f"El almacén {id_almacen} no tiene registros de kardex.")
+            return
+
+        # Cada artículo es independiente: su propia transacción y conexión del pool
+        workers = max(1, min(workers or get_pool().pool_size, len(articulos)))
+        click.echo(f"Recalculando {len(articulos)} artículos del almacén {id_almacen} con {workers} hilos...")
+
+        inicio = datetime.now()
+        filas, fallidos = 0, []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(kardex_model.recalcular_kardex, articulo, id_almacen, desde): articulo
+                       for articulo in articulos}
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                if resultado is False:
+                    fallidos.append(futuros[futuro])
+                else:
+                    filas += resultado
+
+        segundos = (datetime.now() - inicio).total_seconds()
+        click.echo(f"Kardex recalculado: {filas} registros en {segundos:.1f} s.")
+
+        # Los saldos cambiaron: regenerar el resumen diario del mismo alcance
+        if kardex_model.refrescar_stock_diario(id_almacen, [id_articulo] if id_articulo else None,
+                                               desde.date() if desde else None) is False:
+            click.echo("No se pudo actualizar el resumen diario; ejecute `flask stock-diario`.")
+        if fallidos:
+            raise click.ClickException(f"No se pudo recalcular los artículos: {sorted(fallidos)}")
+
+
+def _consultas_explain(id_articulo, id_almacen, desde, hasta):
+    """Consultas representativas (con sus parámetros) cuyo plan debe usar índices sobre kardex."""
+    kardex_model = KardexModel()
+    reporte_model = ReporteModel()
+    return [
+        ('Kardex por artículo y almacén',
+         kardex_model._kardex_articulo_query(id_articulo, id_almacen, desde, hasta)),
+        ('Kardex por almacén',
+         kardex_model._kardex_almacen_query(id_almacen, desde, hasta)),
+        ('Reporte de kardex por artículo',
+         reporte_model._kardex_articulo_query(id_articulo, id_almacen, desde, hasta)),
+        ('Stock a la fecha por almacén',
+         kardex_model._stock_al_query(hasta, id_almacen=id_almacen)),
+    ]
+
+
+def _registrar_explain(app):
+    @app.cli.command('db-explain')
+    @click.option('--almacen', 'id_almacen', type=int, required=True, help='Almacén con movimientos reales.')
+    @click.option('--articulo', 'id_articulo', type=int, required=True,
+                  help='Artículo con muchos registros de kardex en ese almacén.')
+    @click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Inicio del rango (YYYY-MM-DD); por defecto, un año antes de --hasta.')
+    @click.option('--hasta', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Fin del rango (YYYY-MM-DD); por defecto, hoy.')
+    def db_explain(id_almacen, id_articulo, desde, hasta):
+        """
+        Verifica con EXPLAIN que las consultas de kardex no recorran la tabla completa.
+
+        El plan depende de los datos: use un almacén, artículo y rango con
+        movimientos, o un rango vacío puede dar un plan que no representa
+        el uso real.
+        """
+        hasta = (hasta or datetime.now()).date()
+        desde = desde.date() if desde else hasta - timedelta(days=365)
+        click.echo(f"Artículo {id_articulo}, almacén {id_almacen}, del {desde} al {hasta}:")
+
+        conn = get_db_connection()
+        if conn is None:
+            raise click.ClickException("No se pudo conectar a la base de datos.")
+        cursor = conn.cursor(dictionary=True)
+        fallidas = []
+        try:
+            for descripcion, (query, params) in _consultas_explain(id_articulo, id_almacen,
+                                                                   desde.isoformat(), hasta.isoformat()):
+                cursor.execute("EXPLAIN " + query, params)
+                plan = [fila for fila in cursor.fetchall() if fila['table'] in ('k', 'k2')]
+                for fila in plan:
+                    ok = fila['type'] != 'ALL' and fila['key'] is not None
+                    click.echo(f"{'OK   ' if ok else 'FALLA'} {descripcion}: type={fila['type']} "
+                               f"key={fila['key']} rows={fila['rows']}")
+                    if not ok:
+                        fallidas.append(descripcion)
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+        if fallidas:
+            raise click.ClickException(f"Consultas sin índice (ver migrations/004): {', '.join(fallidas)}")
+
+
+def _registrar_stock_diario(app):
+    @app.cli.command('stock-diario')
+    @click.option('--almacen', 'id_almacen', type=int, default=None, help='Solo este almacén.')
+    @click.option('--desde', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Regenerar desde esta fecha (YYYY-MM-DD).')
+    @click.option('--completo', is_flag=True, help='Regenerar todo el historial.')
+    def stock_diario(id_almacen, desde, completo):
+        """
+        Regenera el resumen diario de stock (tabla stock_diario) desde el kardex.
+
+        Sin opciones es incremental (para el cron nocturno): cada almacén se
+        regenera desde el último día que ya tenía en el resumen.
+        """
+        kardex_model = KardexModel()
+        almacenes = [id_almacen] if id_almacen else [a['id_almacen'] for a in ReporteModel().get_almacenes()]
+
+        inicio = datetime.now()
+        filas, fallidos = 0, []
+        # Una transacción por almacén para no mantener bloqueos sobre todo el resumen
+        for almacen in almacenes:
+            if completo:
+                fecha = None
+            elif desde:
+                fecha = desde.date()
+            else:
+                fecha = kardex_model.get_ultima_fecha_stock_diario(almacen)
+            resultado = kardex_model.refrescar_stock_diario(almacen, desde=fecha)
+            if resultado is False:
+                fallidos.append(almacen)
+                continue
+            filas += resultado
+            click.echo(f"Almacén {almacen}: {resultado} días-artículo desde {fecha or 'el inicio'}.")
+
+        segundos = (datetime.now() - inicio).total_seconds()
+        click.echo(f"Resumen diario regenerado: {filas} filas en {segundos:.1f} s.")
+        if fallidos:
+            raise click.ClickException(f"No se pudo regenerar los almacenes: {sorted(fallidos)}")
+
+
+def _articulos_con_stock(id_almacen, limite):
+    """Artículos con más stock del almacén, para armar carritos de prueba."""
+    conn = get_db_connection()
+    if conn is None:
+        raise click.ClickException("No se pudo conectar a la base de datos.")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+                       SELECT sa.id_articulo, a.precio_venta
+                       FROM stock_almacen sa
+                                JOIN articulo a ON sa.id_articulo = a.id_articulo
+                       WHERE sa.id_almacen = %s \
+                         AND sa.stock_actual > 0
+                       ORDER BY sa.stock_actual DESC LIMIT %s \
+                       """, (id_almacen, limite))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        close_db_connection(conn)
+
+
+def _registrar_ventas_benchmark(app):
+    @app.cli.command('ventas-benchmark')
+    @click.option('--almacen', 'id_almacen', type=int, required=True, help='Almacén del que se vende.')
+    @click.option('--serie', 'id_serie', type=int, required=True, help='Serie de documento de las ventas.')
+    @click.option('--tipo-documento', 'id_tipo_documento', type=int, required=True, help='Tipo de documento.')
+    @click.option('--usuario', 'id_usuario', type=int, required=True, help='Usuario vendedor.')
+    @click.option('--ventas', type=int, default=200, help='Ventas a registrar.')
+    @click.option('--lineas', type=int, default=5, help='Líneas por venta.')
+    @click.option('--articulos', type=int, default=20,
+                  help='Artículos distintos entre los que se eligen las líneas (menos = más contención).')
+    @click.option('--workers', type=int, default=None, help='Ventas simultáneas (por defecto, el tamaño del pool).')
+    def ventas_benchmark(id_almacen, id_serie, id_tipo_documento, id_usuario, ventas, lineas, articulos, workers):
+        """
+        Mide el rendimiento del registro de ventas ante ráfagas de cobro.
+
+        Cada venta pasa por VentaModel.registrar_venta completo (validación,
+        cabecera, detalle, stock y kardex) y luego se revierte, así que la base
+        de datos queda igual.
+        """
+        catalogo = _articulos_con_stock(id_almacen, articulos)
+        if not catalogo:
+            raise click.ClickException(f"El almacén {id_almacen} no tiene artículos con stock.")
+
+        serie = SerieDocumentoModel().get_serie_documento_by_id(id_serie)
+        if not serie:
+            raise click.ClickException(f"No existe la serie {id_serie}.")
+
+        venta_model = VentaModel()
+        workers = max(1, min(workers or get_pool().pool_size, ventas))
+
+        def vender(numero):
+            carrito = random.sample(catalogo, min(lineas, len(catalogo)))
+            inicio_venta = time.perf_counter()
+            faltantes = []
+            with UnitOfWork() as uow:
+                id_venta = venta_model.registrar_venta(
+                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'), id_tipo_documento, id_serie, numero, None,
+                    id_usuario, id_almacen,
+                    [{'id_articulo': articulo['id_articulo'], 'cantidad': 1,
+                      'precio_unitario': articulo['precio_venta'] or 0} for articulo in carrito],
+                    uow=uow, faltantes=faltantes)
+                uow.rollback()
+            return bool(id_venta), bool(faltantes), time.perf_counter() - inicio_venta
+
+        click.echo(f"Registrando {ventas} ventas de {lineas} líneas con {workers} hilos "
+                   f"sobre {len(catalogo)} artículos (cada venta se revierte)...")
+
+        inicio = time.perf_counter()
+        latencias, fallidas, sin_stock = [], 0, 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for futuro in as_completed([executor.submit(vender, serie['correlativo_actual'] + i + 1)
+                                       for i in range(ventas)]):
+                ok, falto_stock, segundos = futuro.result()
+                latencias.append(segundos)
+                if not ok:
+                    fallidas += 1
+                    sin_stock += falto_stock
+        total = time.perf_counter() - inicio
+
+        latencias.sort()
+        p50 = latencias[len(latencias) // 2] * 1000
+        p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000
+        click.echo(f"{ventas / total:.1f} ventas/s, {ventas * lineas / total:.1f} líneas/s "
+                   f"en {total:.1f} s; latencia p50 {p50:.1f} ms, p95 {p95:.1f} ms.")
+        if fallidas:
+            click.echo(f"{fallidas} ventas fallidas ({sin_stock} por stock insuficiente).")
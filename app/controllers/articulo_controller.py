@@ -158,6 +158,32 @@ def delete_articulo(id_articulo):
 
     return redirect(url_for('articulos_bp.list_articulos'))
 
+@articulos_bp.route('/api/autocompletar')
+@login_required
+@role_required(['ADMINISTRADOR', 'ALMACENERO', 'VENTAS'])
+def autocompletar_articulos():
+    """Autocompletado de artículos por código o nombre, paginado (?q=&page=&per_page=)."""
+    termino = request.args.get('q', '', type=str)
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', 20, type=int)), 50)
+
+    # Se pide una fila de más para saber si hay otra página sin contar
+    articulos = articulo_model.autocompletar_articulos(termino, limit=per_page + 1,
+                                                       offset=(page - 1) * per_page)
+    return jsonify({
+        'success': True,
+        'data': [{
+            'id_articulo': art['id_articulo'],
+            'codigo': art['codigo'],
+            'nombre': art['nombre'],
+            'precio_compra': float(art['precio_compra'] or 0),
+            'precio_venta': float(art['precio_venta'] or 0),
+        } for art in articulos[:per_page]],
+        'page': page,
+        'has_more': len(articulos) > per_page
+    })
+
+
 @articulos_bp.route('/api/articulos')
 @login_required
 @role_required(['ADMINISTRADOR', 'ALMACENERO'])
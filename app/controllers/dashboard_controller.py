@@ -1,8 +1,10 @@
 from flask import Blueprint, render_template
+from app.config import Config
 from app.models.articulo_model import ArticuloModel
 from app.models.almacen_model import AlmacenModel
 from app.models.movimiento_model import MovimientoModel
 from app.models.stock_almacen_model import StockAlmacenModel
+from app.services.dashboard_metrics import DashboardMetrics
 from app.controllers.auth_controller import login_required
 
 dashboard_bp = Blueprint('dashboard_bp', __name__)
@@ -11,28 +13,25 @@ almacen_model = AlmacenModel()
 movimiento_model = MovimientoModel()
 stock_model = StockAlmacenModel()
 
+# Conteos y últimos movimientos con consultas agregadas, cacheados unos segundos
+metricas_dashboard = DashboardMetrics({
+    'total_articulos': articulo_model.contar_articulos,
+    'total_almacenes': almacen_model.contar_almacenes,
+    'stock_bajo': stock_model.contar_stock_bajo,
+    'movimientos_recientes': lambda: movimiento_model.buscar_movimientos(limit=5),
+}, ttl=getattr(Config, 'DASHBOARD_CACHE_TTL', 60))
+
 
 @dashboard_bp.route('/')
 @dashboard_bp.route('/dashboard')
 @login_required
 def dashboard():
     """Renderiza el dashboard principal."""
-    # Obtener datos para las tarjetas
-    articulos = articulo_model.get_all_articulos()
-    almacenes = almacen_model.get_all_almacenes()
-
-    # Obtener stock bajo y crítico
-    stock_bajo = stock_model.get_stock_bajo()
-    stock_bajo_count = len(stock_bajo)
-    stock_critico_count = len([item for item in stock_bajo if item['faltante'] > 10])  # Ejemplo
-
-    # Obtener movimientos recientes (últimos 5)
-    movimientos_recientes = movimiento_model.get_all_movimientos()[:5]
+    metricas = metricas_dashboard.get()
 
     return render_template('dashboard.html',
-                           total_articulos=len(articulos),
-                           total_almacenes=len(almacenes),
-                           stock_bajo_count=stock_bajo_count,
-                           stock_critico_count=stock_critico_count,
-                           stock_bajo=stock_bajo,
-                           movimientos_recientes=movimientos_recientes)
\ No newline at end of file
+                           total_articulos=metricas['total_articulos'],
+                           total_almacenes=metricas['total_almacenes'],
+                           stock_bajo_count=metricas['stock_bajo']['bajo'],
+                           stock_critico_count=metricas['stock_bajo']['critico'],
+                           movimientos_recientes=metricas['movimientos_recientes'])
@@ -82,7 +82,6 @@ def list_inventario_inicial():
 @role_required(['ADMINISTRADOR'])
 def add_inventario_inicial():
     almacenes = almacen_model.get_all_almacenes()
-    articulos = articulo_model.get_all_articulos()
 
     if request.method == 'POST':
         fecha = request.form.get('fecha')
@@ -96,7 +95,6 @@ def add_inventario_inicial():
             flash('❌ Ya existe inventario inicial para este artículo', 'error')
             return render_template('inventario_inicial/add.html',
                                    almacenes=almacenes,
-                                   articulos=articulos,
                                    fecha_hoy=datetime.now().strftime('%Y-%m-%d'))
 
         # CREAR inventario inicial
@@ -117,7 +115,6 @@ def add_inventario_inicial():
 
     return render_template('inventario_inicial/add.html',
                            almacenes=almacenes,
-                           articulos=articulos,
                            fecha_hoy=datetime.now().strftime('%Y-%m-%d'))
 
 
@@ -3,6 +3,7 @@ from app.models.kardex_model import KardexModel
 from app.models.articulo_model import ArticuloModel
 from app.models.almacen_model import AlmacenModel
 from app.controllers.auth_controller import login_required, role_required
+from app.utils.exportacion import FORMATOS, respuesta_streaming
 
 kardex_bp = Blueprint('kardex_bp', __name__)
 kardex_model = KardexModel()
@@ -14,9 +15,8 @@ almacen_model = AlmacenModel()
 @role_required(['ADMINISTRADOR', 'ALMACENERO'])
 def index_kardex():
     """Página principal del kardex."""
-    articulos = articulo_model.get_all_articulos()
     almacenes = almacen_model.get_all_almacenes()
-    return render_template('kardex/index.html', articulos=articulos, almacenes=almacenes)
+    return render_template('kardex/index.html', almacenes=almacenes)
 
 @kardex_bp.route('/articulo', methods=['GET', 'POST'])
 @login_required
@@ -66,6 +66,12 @@ def kardex_almacen():
 
             print(f"DEBUG: Consultando kardex para almacén {id_almacen}")
 
+            # Botón "Exportar": CSV/NDJSON en streaming, sin cargar todo el kardex en memoria
+            formato = request.form.get('formato')
+            if formato in FORMATOS:
+                filas = kardex_model.iter_kardex_almacen(id_almacen, fecha_inicio, fecha_fin)
+                return respuesta_streaming(filas, formato, f"kardex_almacen_{id_almacen}")
+
             kardex = kardex_model.get_kardex_almacen(id_almacen, fecha_inicio, fecha_fin)
             almacen = almacen_model.get_almacen_by_id(id_almacen)
             almacenes = almacen_model.get_all_almacenes()
@@ -5,7 +5,7 @@ from app.models.almacen_model import AlmacenModel
 from app.models.articulo_model import ArticuloModel
 from app.models.proveedor_model import ProveedorModel
 from app.controllers.auth_controller import login_required, role_required
-from app.utils.pagination import Paginator, search_items
+from app.utils.pagination import KeysetPaginator
 from datetime import datetime
 
 movimientos_bp = Blueprint('movimientos_bp', __name__)
@@ -16,149 +16,68 @@ articulo_model = ArticuloModel()
 proveedor_model = ProveedorModel()
 
 
-@movimientos_bp.route('/entradas')
-@login_required
-@role_required(['ADMINISTRADOR', 'ALMACENERO'])
-def list_entradas():
-    """Muestra el listado de movimientos de entrada con paginación."""
-    # Obtener todos los movimientos de entrada
-    movimientos = movimiento_model.get_all_movimientos(tipo='entrada')
+def _parse_fecha(valor):
+    """Convierte 'YYYY-MM-DD' en date; None si está vacío o no es válido."""
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+    except ValueError:
+        return None
+
 
-    # Obtener parámetros de búsqueda (NUEVOS)
+def _listar_movimientos(tipo, template):
+    """Renderiza el listado paginado de movimientos filtrando y paginando en la base de datos."""
+    # Obtener parámetros de búsqueda
     search = request.args.get('search', '')
     id_articulo = request.args.get('id_articulo', '')
     fecha_desde = request.args.get('fecha_desde', '')
     fecha_hasta = request.args.get('fecha_hasta', '')
 
-    # Aplicar búsqueda por texto si existe
-    if search:
-        movimientos = search_items(movimientos, search, [
-            'almacen_nombre',
-            'tipo_movimiento_nombre',
-            'proveedor_nombre',
-            'nombre_usuario',
-            'observacion'
-        ])
-
-    # Aplicar filtro por artículo (NUEVO)
-    if id_articulo:
-        try:
-            id_articulo_int = int(id_articulo)
-            # Filtrar movimientos que contengan el artículo
-            movimientos_filtrados = []
-            for movimiento in movimientos:
-                detalle = movimiento_model.get_detalle_movimiento(movimiento['id_movimiento_cabecera'])
-                if any(item['id_articulo'] == id_articulo_int for item in detalle):
-                    movimientos_filtrados.append(movimiento)
-            movimientos = movimientos_filtrados
-        except ValueError:
-            pass  # Si id_articulo no es un número válido, ignorar
-
-    # Aplicar filtros por fecha (NUEVO)
-    if fecha_desde:
-        try:
-            fecha_desde_dt = datetime.strptime(fecha_desde, '%Y-%m-%d')
-            movimientos = [m for m in movimientos if m['fecha_movimiento'] >= fecha_desde_dt]
-        except ValueError:
-            pass
-
-    if fecha_hasta:
-        try:
-            fecha_hasta_dt = datetime.strptime(fecha_hasta, '%Y-%m-%d')
-            # Añadir un día para incluir la fecha hasta
-            fecha_hasta_dt = fecha_hasta_dt.replace(hour=23, minute=59, second=59)
-            movimientos = [m for m in movimientos if m['fecha_movimiento'] <= fecha_hasta_dt]
-        except ValueError:
-            pass
-
-    # Obtener artículos para el dropdown (NUEVO)
-    articulos = articulo_model.get_all_articulos()
-
-    # Aplicar paginación
-    paginator = Paginator(movimientos, default_per_page=10)
+    filtros = {
+        'tipo': tipo,
+        'search': search.strip() or None,
+        'id_articulo': int(id_articulo) if id_articulo.isdigit() else None,
+        'fecha_desde': _parse_fecha(fecha_desde),
+        'fecha_hasta': _parse_fecha(fecha_hasta),
+    }
+
+    # Paginación por cursor: el costo de cada página no depende de su posición
+    paginator = KeysetPaginator(
+        lambda clave, direccion, limit: movimiento_model.buscar_movimientos_keyset(
+            clave, direccion, limit, **filtros),
+        lambda m: (m['fecha_movimiento'], m['id_movimiento_cabecera']),
+        default_per_page=10,
+        count_fn=lambda: movimiento_model.contar_movimientos(**filtros)
+    )
+
+    # El buscador carga los artículos por autocompletado; solo se necesita el del filtro activo
+    articulo_seleccionado = articulo_model.get_articulo_by_id(filtros['id_articulo']) if filtros['id_articulo'] else None
 
     return render_template(
-        'movimientos/entradas/list.html',
+        template,
         movimientos=paginator.get_items(),
         pagination=paginator.get_pagination_data(),
         search=search,
-        articulos=articulos,  # NUEVO: pasar artículos al template
-        id_articulo=id_articulo,  # NUEVO: mantener el artículo seleccionado
-        fecha_desde=fecha_desde,  # NUEVO: mantener fecha desde
-        fecha_hasta=fecha_hasta   # NUEVO: mantener fecha hasta
+        articulo_seleccionado=articulo_seleccionado,
+        id_articulo=id_articulo,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta
     )
 
 
+@movimientos_bp.route('/entradas')
+@login_required
+@role_required(['ADMINISTRADOR', 'ALMACENERO'])
+def list_entradas():
+    """Muestra el listado de movimientos de entrada con paginación."""
+    return _listar_movimientos('entrada', 'movimientos/entradas/list.html')
+
+
 @movimientos_bp.route('/salidas')
 @login_required
 @role_required(['ADMINISTRADOR', 'ALMACENERO'])
 def list_salidas():
     """Muestra el listado de movimientos de salida con paginación."""
-    # Obtener todos los movimientos de salida
-    movimientos = movimiento_model.get_all_movimientos(tipo='salida')
-
-    # Obtener parámetros de búsqueda (NUEVOS)
-    search = request.args.get('search', '')
-    id_articulo = request.args.get('id_articulo', '')
-    fecha_desde = request.args.get('fecha_desde', '')
-    fecha_hasta = request.args.get('fecha_hasta', '')
-
-    # Aplicar búsqueda por texto si existe
-    if search:
-        movimientos = search_items(movimientos, search, [
-            'almacen_nombre',
-            'tipo_movimiento_nombre',
-            'nombre_usuario',
-            'observacion'
-        ])
-
-    # Aplicar filtro por artículo (NUEVO)
-    if id_articulo:
-        try:
-            id_articulo_int = int(id_articulo)
-            # Filtrar movimientos que contengan el artículo
-            movimientos_filtrados = []
-            for movimiento in movimientos:
-                detalle = movimiento_model.get_detalle_movimiento(movimiento['id_movimiento_cabecera'])
-                if any(item['id_articulo'] == id_articulo_int for item in detalle):
-                    movimientos_filtrados.append(movimiento)
-            movimientos = movimientos_filtrados
-        except ValueError:
-            pass  # Si id_articulo no es un número válido, ignorar
-
-    # Aplicar filtros por fecha (NUEVO)
-    if fecha_desde:
-        try:
-            fecha_desde_dt = datetime.strptime(fecha_desde, '%Y-%m-%d')
-            movimientos = [m for m in movimientos if m['fecha_movimiento'] >= fecha_desde_dt]
-        except ValueError:
-            pass
-
-    if fecha_hasta:
-        try:
-            fecha_hasta_dt = datetime.strptime(fecha_hasta, '%Y-%m-%d')
-            # Añadir un día para incluir la fecha hasta
-            fecha_hasta_dt = fecha_hasta_dt.replace(hour=23, minute=59, second=59)
-            movimientos = [m for m in movimientos if m['fecha_movimiento'] <= fecha_hasta_dt]
-        except ValueError:
-            pass
-
-    # Obtener artículos para el dropdown (NUEVO)
-    articulos = articulo_model.get_all_articulos()
-
-    # Aplicar paginación
-    paginator = Paginator(movimientos, default_per_page=10)
-
-    return render_template(
-        'movimientos/salidas/list.html',
-        movimientos=paginator.get_items(),
-        pagination=paginator.get_pagination_data(),
-        search=search,
-        articulos=articulos,  # NUEVO: pasar artículos al template
-        id_articulo=id_articulo,  # NUEVO: mantener el artículo seleccionado
-        fecha_desde=fecha_desde,  # NUEVO: mantener fecha desde
-        fecha_hasta=fecha_hasta   # NUEVO: mantener fecha hasta
-    )
+    return _listar_movimientos('salida', 'movimientos/salidas/list.html')
 
 
 @movimientos_bp.route('/entradas/add', methods=['GET', 'POST'])
@@ -271,15 +190,12 @@ def detalle_movimiento_temporal():
         # ✅ CORREGIDO: Usar 'razon_social' en lugar de 'nombre'
         movimiento_temporal['proveedor_nombre'] = proveedor['razon_social'] if proveedor else 'N/A'
 
-    articulos = articulo_model.get_all_articulos()
-
     # Calcular totales
     total_cantidad = sum(item['cantidad'] for item in movimiento_temporal['detalle'])
     total_valor = sum(item['cantidad'] * item['costo_unitario'] for item in movimiento_temporal['detalle'])
 
     return render_template('movimientos/detalle_temporal.html',
                            movimiento=movimiento_temporal,
-                           articulos=articulos,
                            total_cantidad=total_cantidad,
                            total_valor=total_valor)
 
@@ -334,59 +250,38 @@ def procesar_movimiento_temporal():
         return redirect(url_for('movimientos_bp.detalle_movimiento_temporal'))
 
     try:
-        # ✅ Crear movimiento en BD
-        id_movimiento = movimiento_model.create_movimiento(
+        # ✅ Cabecera, detalle, stock y kardex en una sola transacción.
+        # El precio_venta lo resuelve el modelo (costo en entradas, precio del artículo en salidas).
+        faltantes = []
+        id_movimiento = movimiento_model.registrar_movimiento(
             movimiento_temporal['fecha_movimiento'],
             movimiento_temporal['id_almacen'],
             movimiento_temporal['id_tipo_movimiento'],
             movimiento_temporal['observacion'],
             movimiento_temporal['id_usuario'],
-            movimiento_temporal.get('id_proveedor')
+            movimiento_temporal['detalle'],
+            id_proveedor=movimiento_temporal.get('id_proveedor'),
+            es_entrada=movimiento_temporal['es_entrada'],
+            faltantes=faltantes
         )
 
-        print(f"🔍 DEBUG: ID Movimiento creado = {id_movimiento}")
-
-        if not id_movimiento:
-            flash('Error al crear movimiento en BD.', 'error')
-            return redirect(url_for('movimientos_bp.detalle_movimiento_temporal'))
+        print(f"🔍 DEBUG: ID Movimiento registrado = {id_movimiento}")
 
-        # ✅ AGREGAR DETALLES CON PRECIO_VENTA Y es_entrada
-        for item in movimiento_temporal['detalle']:
-            print(f"🔍 DEBUG: Agregando artículo {item}")
-
-            # Determinar precio_venta según tipo de movimiento
-            if movimiento_temporal['es_entrada']:
-                # Para entradas, precio_venta = costo_unitario
-                precio_venta = item['costo_unitario']
-            else:
-                # Para salidas, usar precio_venta del artículo
-                articulo_info = articulo_model.get_articulo_by_id(item['id_articulo'])
-                precio_venta = articulo_info['precio_venta'] if articulo_info else item['costo_unitario']
-
-            # ✅ LLAMAR CORRECTAMENTE CON TODOS LOS PARÁMETROS
-            success = movimiento_model.agregar_detalle_movimiento(
-                id_movimiento,
-                item['id_articulo'],
-                item['cantidad'],
-                item['costo_unitario'],
-                precio_venta,
-                movimiento_temporal['es_entrada']  # ← NUEVO PARÁMETRO
-            )
-
-            if not success:
-                print(f"❌ Error al agregar artículo {item['id_articulo']}")
-                flash(f'Error al agregar artículo {item["articulo_nombre"]}', 'error')
-
-        # Procesar movimiento (actualizar stock)
-        if movimiento_model.actualizar_stock(id_movimiento):
+        if id_movimiento:
             # Limpiar sesión
             session.pop('movimiento_temporal', None)
 
             tipo = "entrada" if movimiento_temporal['es_entrada'] else "salida"
             flash(f'✅ Movimiento de {tipo} procesado y guardado exitosamente.', 'success')
             return redirect(url_for('movimientos_bp.detalle_movimiento', id_movimiento=id_movimiento))
+        elif faltantes:
+            for linea in faltantes:
+                flash(f"Stock insuficiente para {linea['codigo']} - {linea['articulo_nombre']}: "
+                      f"solicitado {linea['solicitado']}, disponible {linea['disponible']}.", 'error')
+            flash('No se guardó ningún cambio.', 'error')
+            return redirect(url_for('movimientos_bp.detalle_movimiento_temporal'))
         else:
-            flash('Error al procesar movimiento.', 'error')
+            flash('Error al procesar movimiento. No se guardó ningún cambio.', 'error')
             return redirect(url_for('movimientos_bp.detalle_movimiento_temporal'))
 
     except Exception as e:
@@ -440,8 +335,6 @@ def detalle_movimiento(id_movimiento):
         return redirect(url_for('movimientos_bp.list_entradas'))
 
     detalle = movimiento_model.get_detalle_movimiento(id_movimiento)
-    articulos = articulo_model.get_all_articulos()
-
     # Calcular totales
     # Calcular totales
     total_cantidad = sum(item['cantidad'] for item in detalle)
@@ -456,7 +349,6 @@ def detalle_movimiento(id_movimiento):
     return render_template('movimientos/detalle.html',
                            movimiento=movimiento,
                            detalle=detalle,
-                           articulos=articulos,
                            total_cantidad=total_cantidad,
                            total_valor=total_valor)
 
@@ -2,12 +2,21 @@ from flask import Blueprint, render_template, request, jsonify, send_file
 from app.models.reporte_model import ReporteModel
 from app.controllers.auth_controller import login_required, role_required
 from app.utils.pdf_generator import generar_pdf
+from app.utils.exportacion import FORMATOS, respuesta_streaming
+from app.services.dashboard_metrics import generacion_datos
+from app.utils.response_cache import ResponseCache
+from app.config import Config
 import io
 from datetime import datetime
 
 reportes_bp = Blueprint('reportes_bp', __name__)
 reporte_model = ReporteModel()
 
+# Resúmenes ya calculados, por combinación de parámetros y generación de los datos
+# (registrar un movimiento la avanza; el TTL cubre los cambios de otros workers)
+resumen_cache = ResponseCache(max_items=getattr(Config, 'REPORTES_CACHE_SIZE', 200),
+                              ttl=getattr(Config, 'REPORTES_CACHE_TTL', 300))
+
 
 @reportes_bp.route('/')
 @login_required
@@ -52,6 +61,12 @@ def api_kardex():
         fecha_desde = request.args.get('fecha_desde')
         fecha_hasta = request.args.get('fecha_hasta')
 
+        # ?formato=csv|ndjson: exportación en streaming, sin cargar todo el kardex en memoria
+        formato = request.args.get('formato')
+        if formato in FORMATOS:
+            filas = reporte_model.iter_kardex_articulo(id_articulo, id_almacen, fecha_desde, fecha_hasta)
+            return respuesta_streaming(filas, formato, f"kardex_articulo_{id_articulo}_{id_almacen}")
+
         datos = reporte_model.get_kardex_articulo(id_articulo, id_almacen, fecha_desde, fecha_hasta)
 
         return jsonify({
@@ -112,6 +127,76 @@ def api_movimientos():
         }), 500
 
 
+def _parsear_fecha(valor):
+    """Normaliza una fecha AAAA-MM-DD ('2026-1-5' -> '2026-01-05'); None si falta o no es válida."""
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+@reportes_bp.route('/api/movimientos/resumen')
+@login_required
+def api_movimientos_resumen():
+    """
+    API con totales de movimientos agrupados en el servidor.
+
+    ?agrupar=mes,almacen (dia|semana|mes, almacen, tipo, articulo, categoria)
+    con los mismos filtros que /api/movimientos.
+    """
+    try:
+        agrupar = [d.strip() for d in request.args.get('agrupar', 'mes').split(',') if d.strip()]
+        id_tipo_movimiento = request.args.get('id_tipo_movimiento', type=int)
+        id_almacen = request.args.get('id_almacen', type=int)
+
+        invalidas = [d for d in agrupar if d not in ReporteModel.DIMENSIONES_RESUMEN]
+        periodos = [d for d in agrupar if d in ('dia', 'semana', 'mes')]
+        if not agrupar or invalidas or len(periodos) > 1 or len(set(agrupar)) != len(agrupar):
+            return jsonify({
+                'success': False,
+                'error': f"Agrupación no válida. Opciones: {', '.join(ReporteModel.DIMENSIONES_RESUMEN)}"
+            }), 400
+        if not request.args.get('fecha_desde') or not request.args.get('fecha_hasta'):
+            return jsonify({
+                'success': False,
+                'error': 'Debe indicar fecha_desde y fecha_hasta'
+            }), 400
+        fecha_desde = _parsear_fecha(request.args.get('fecha_desde'))
+        fecha_hasta = _parsear_fecha(request.args.get('fecha_hasta'))
+        if not fecha_desde or not fecha_hasta:
+            return jsonify({
+                'success': False,
+                'error': 'Fecha no válida: use el formato AAAA-MM-DD'
+            }), 400
+
+        clave = (f"{generacion_datos()}|{','.join(agrupar)}|{id_tipo_movimiento}|{id_almacen}|"
+                 f"{fecha_desde}|{fecha_hasta}")
+        datos = resumen_cache.get(clave)
+        en_cache = datos is not None
+        if not en_cache:
+            datos = reporte_model.get_resumen_movimientos(agrupar, id_tipo_movimiento, id_almacen,
+                                                          fecha_desde, fecha_hasta)
+            if datos is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'No se pudo calcular el resumen de movimientos'
+                }), 500
+            resumen_cache.set(clave, datos)
+
+        return jsonify({
+            'success': True,
+            'agrupar': agrupar,
+            'data': datos,
+            'total': len(datos),
+            'cache': en_cache
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @reportes_bp.route('/exportar/pdf')
 @login_required
 def exportar_pdf():
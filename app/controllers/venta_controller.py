@@ -7,6 +7,9 @@ from app.models.articulo_model import ArticuloModel
 from app.models.almacen_model import AlmacenModel
 from app.models.stock_almacen_model import StockAlmacenModel
 from app.controllers.auth_controller import login_required, role_required
+from app.services.correlativos import AsignadorCorrelativos
+from app.utils.pagination import KeysetPaginator
+from app.config import Config
 from datetime import datetime
 
 ventas_bp = Blueprint('ventas_bp', __name__)
@@ -17,58 +20,34 @@ serie_documento_model = SerieDocumentoModel()
 articulo_model = ArticuloModel()
 almacen_model = AlmacenModel()
 stock_model = StockAlmacenModel()
+correlativos = AsignadorCorrelativos(
+    serie_documento_model.reservar_correlativos,
+    bloque=getattr(Config, 'VENTAS_BLOQUE_CORRELATIVOS', 1)
+)
 
 
 @ventas_bp.route('/')
 @login_required
 @role_required(['ADMINISTRADOR', 'VENTAS'])
 def list_ventas():
-    """Muestra el listado de ventas."""
-    ventas = venta_model.get_all_ventas()
-    return render_template('ventas/list.html', ventas=ventas)
-
-
-@ventas_bp.route('/add', methods=['GET', 'POST'])
+    """Muestra el listado de ventas con paginación."""
+    # Paginación por cursor: el costo de cada página no depende de su posición
+    paginator = KeysetPaginator(
+        venta_model.buscar_ventas_keyset,
+        lambda v: (v['fecha_emision'], v['id_venta']),
+        default_per_page=10,
+        count_fn=venta_model.contar_ventas
+    )
+    return render_template('ventas/list.html',
+                           ventas=paginator.get_items(),
+                           pagination=paginator.get_pagination_data())
+
+
+@ventas_bp.route('/add')
 @login_required
 @role_required(['ADMINISTRADOR', 'VENTAS'])
 def add_venta():
-    """Crea una nueva venta."""
-    if request.method == 'POST':
-        fecha_emision = request.form.get('fecha_emision')
-        id_tipo_documento = int(request.form.get('id_tipo_documento'))
-        id_serie = int(request.form.get('id_serie'))
-        id_cliente = request.form.get('id_cliente')
-        id_cliente = int(id_cliente) if id_cliente else None
-        id_almacen = int(request.form.get('id_almacen'))
-        id_usuario = session.get('user_id')
-
-        # Obtener el número de documento (correlativo)
-        serie = serie_documento_model.get_serie_by_id(id_serie)
-        if not serie:
-            flash('Serie no encontrada.', 'error')
-            return redirect(url_for('ventas_bp.add_venta'))
-
-        numero_documento = serie['correlativo_actual'] + 1
-
-        # Por ahora, los totales se calcularán en el detalle, así que los ponemos en 0
-        total_gravado = 0
-        total_igv = 0
-        total_venta = 0
-
-        # Crear la venta
-        id_venta = venta_model.create_venta(
-            fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente, id_usuario, total_gravado,
-            total_igv, total_venta
-        )
-
-        if id_venta:
-            # Incrementar el correlativo de la serie
-            serie_documento_model.incrementar_correlativo(id_serie)
-            flash('Venta creada exitosamente. Ahora puede agregar artículos.', 'success')
-            return redirect(url_for('ventas_bp.detalle_venta', id_venta=id_venta))
-        else:
-            flash('Error al crear venta.', 'error')
-
+    """Muestra el formulario de venta; el carrito se registra completo en /ventas/registrar."""
     tipos_documento = tipo_documento_model.get_all_tipos_documento()
     clientes = cliente_model.get_all_clientes()
     almacenes = almacen_model.get_all_almacenes()
@@ -80,6 +59,51 @@ def add_venta():
                            fecha_hoy=datetime.now().strftime('%Y-%m-%dT%H:%M'))
 
 
+@ventas_bp.route('/registrar', methods=['POST'])
+@login_required
+@role_required(['ADMINISTRADOR', 'VENTAS'])
+def registrar_venta():
+    """
+    Registra una venta completa (cabecera, carrito, stock y kardex) en una
+    sola transacción. Espera JSON con fecha_emision, id_tipo_documento,
+    id_serie, id_cliente, id_almacen y lineas [{id_articulo, cantidad, precio_unitario}].
+    """
+    datos = request.get_json(silent=True) or {}
+    try:
+        id_serie = int(datos['id_serie'])
+        id_almacen = int(datos['id_almacen'])
+        id_tipo_documento = int(datos['id_tipo_documento'])
+        id_cliente = int(datos['id_cliente']) if datos.get('id_cliente') else None
+        fecha_emision = (datetime.fromisoformat(datos['fecha_emision']) if datos.get('fecha_emision')
+                         else datetime.now().replace(microsecond=0))
+        lineas = [{'id_articulo': int(linea['id_articulo']),
+                   'cantidad': int(linea['cantidad']),
+                   'precio_unitario': float(linea['precio_unitario'])}
+                  for linea in datos.get('lineas') or []]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos de venta inválidos'}), 400
+
+    if not lineas or any(linea['cantidad'] <= 0 for linea in lineas):
+        return jsonify({'success': False, 'message': 'La venta debe tener artículos con cantidad mayor a cero'}), 400
+
+    numero_documento = correlativos.siguiente(id_serie)
+    if numero_documento is None:
+        return jsonify({'success': False, 'message': 'Serie no encontrada'}), 400
+
+    faltantes = []
+    id_venta = venta_model.registrar_venta(
+        fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente, session.get('user_id'),
+        id_almacen, lineas, faltantes=faltantes
+    )
+
+    if id_venta:
+        return jsonify({'success': True, 'id_venta': id_venta,
+                        'url': url_for('ventas_bp.detalle_venta', id_venta=id_venta)})
+    if faltantes:
+        return jsonify({'success': False, 'message': 'Stock insuficiente', 'faltantes': faltantes}), 409
+    return jsonify({'success': False, 'message': 'Error al registrar la venta'}), 500
+
+
 @ventas_bp.route('/detalle/<int:id_venta>')
 @login_required
 @role_required(['ADMINISTRADOR', 'VENTAS'])
@@ -91,7 +115,7 @@ def detalle_venta(id_venta):
         return redirect(url_for('ventas_bp.list_ventas'))
 
     detalle = venta_model.get_detalle_venta(id_venta)
-    articulos = articulo_model.get_all_articulos()
+    procesada = venta_model.venta_procesada(id_venta)
 
     # Calcular totales
     total_gravado = sum(item['subtotal'] / (1 + item['porcentaje_igv'] / 100) for item in detalle)
@@ -101,7 +125,7 @@ def detalle_venta(id_venta):
     return render_template('ventas/detalle.html',
                            venta=venta,
                            detalle=detalle,
-                           articulos=articulos,
+                           procesada=procesada,
                            total_gravado=total_gravado,
                            total_igv=total_igv,
                            total_venta=total_venta)
@@ -120,6 +144,9 @@ def agregar_articulo_venta():
         porcentaje_igv = 18  # IGV por defecto 18%
         subtotal = cantidad * precio_unitario * (1 + porcentaje_igv / 100)
 
+        if venta_model.venta_procesada(id_venta):
+            return jsonify({'success': False, 'message': 'La venta ya fue procesada'})
+
         if venta_model.agregar_detalle_venta(id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv,
                                              subtotal):
             return jsonify({'success': True, 'message': 'Artículo agregado a la venta'})
@@ -147,8 +174,17 @@ def procesar_venta(id_venta):
         flash('No hay almacén principal configurado.', 'error')
         return redirect(url_for('ventas_bp.detalle_venta', id_venta=id_venta))
 
-    if venta_model.actualizar_stock_venta(id_venta, almacen_principal['id_almacen']):
+    if venta_model.venta_procesada(id_venta):
+        flash('La venta ya fue procesada; el stock ya se descontó.', 'warning')
+        return redirect(url_for('ventas_bp.detalle_venta', id_venta=id_venta))
+
+    faltantes = []
+    if venta_model.actualizar_stock_venta(id_venta, almacen_principal['id_almacen'], faltantes=faltantes):
         flash('Venta procesada exitosamente. Stock actualizado.', 'success')
+    elif faltantes:
+        for linea in faltantes:
+            flash(f"Stock insuficiente para {linea['codigo']} - {linea['articulo_nombre']}: "
+                  f"disponible {linea['disponible']}, requerido {linea['solicitado']}.", 'error')
     else:
         flash('Error al procesar venta. Verifique el stock disponible.', 'error')
 
@@ -159,17 +195,11 @@ def procesar_venta(id_venta):
 @login_required
 @role_required(['ADMINISTRADOR', 'VENTAS'])
 def anular_venta(id_venta):
-    """Anula una venta."""
-    # Obtener el almacén principal
-    almacen_principal = almacen_model.get_almacen_principal()
-    if not almacen_principal:
-        flash('No hay almacén principal configurado.', 'error')
-        return redirect(url_for('ventas_bp.list_ventas'))
-
-    if venta_model.anular_venta(id_venta, almacen_principal['id_almacen']):
+    """Anula una venta (repone el stock si ya se había descontado)."""
+    if venta_model.anular_venta(id_venta):
         flash('Venta anulada exitosamente.', 'success')
     else:
-        flash('Error al anular venta.', 'error')
+        flash('Error al anular venta. Verifique que no esté anulada.', 'error')
 
     return redirect(url_for('ventas_bp.list_ventas'))
 
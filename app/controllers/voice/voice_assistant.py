@@ -1,10 +1,14 @@
 # app/controllers/voice/voice_assistant.py
-from flask import Blueprint, request, jsonify, session, render_template
+import os
+import tempfile
+
+from flask import Blueprint, request, jsonify, session, render_template, url_for
+from app.config import Config
 from app.services.voice.intent_detector import IntentDetector
+from app.services.voice.voice_jobs import VoiceJobManager
 from app.controllers.auth_controller import login_required
 from datetime import datetime
 from app.services.voice.movement_service import MovementService
-from flask import session
 # Crear Blueprint
 voice_bp = Blueprint('voice_bp', __name__,
                      template_folder='../../views/voice',
@@ -14,6 +18,42 @@ voice_bp = Blueprint('voice_bp', __name__,
 intent_detector = IntentDetector()
 movement_service = MovementService()
 
+# Cola acotada para procesar comandos sin bloquear el worker durante la llamada a Gemini.
+# El estado se publica en una carpeta común: la consulta puede llegar a cualquier worker
+voice_jobs = VoiceJobManager(
+    max_workers=getattr(Config, 'VOICE_JOB_WORKERS', 4),
+    max_pending=getattr(Config, 'VOICE_JOB_MAX_PENDING', 32),
+    timeout=getattr(Config, 'VOICE_JOB_TIMEOUT', 30),
+    retention=getattr(Config, 'VOICE_JOB_RETENTION', 300),
+    directorio=getattr(Config, 'VOICE_JOB_DIR',
+                       os.path.join(tempfile.gettempdir(), 'sistema_voz_voice_jobs'))
+)
+
+
+def _analizar_comando(command_text, usuario_id):
+    """Analiza el comando y agrega la metadata de la respuesta"""
+    analysis = intent_detector.analyze_command(command_text)
+
+    # Agregar metadata
+    analysis['comando_original'] = command_text
+    analysis['usuario_id'] = usuario_id
+    analysis['timestamp'] = datetime.now().isoformat()
+    analysis['error'] = False
+
+    print(f"✅ Análisis completado: {analysis['intencion']}")
+    if analysis['intencion'] == 'BUSCAR_PRODUCTO':
+        print(f"📦 Productos encontrados: {analysis['cantidad_resultados']}")
+
+    return analysis
+
+
+def _get_job_usuario(job_id):
+    """Obtiene el trabajo solo si pertenece al usuario de la sesión"""
+    job = voice_jobs.get(job_id)
+    if not job or job['usuario_id'] != session.get('user_id'):
+        return None
+    return job
+
 
 @voice_bp.route('/interface')
 @login_required
@@ -26,7 +66,10 @@ def voice_interface():
 @login_required
 def process_voice_command():
     """
-    Endpoint para procesar comandos de voz/texto
+    Endpoint para procesar comandos de voz/texto.
+
+    Con {"async": true} (o ?async=1) encola el comando y responde 202 con un
+    job_id; el resultado se consulta en /voice/jobs/<job_id>.
     """
     try:
         data = request.get_json()
@@ -45,20 +88,25 @@ def process_voice_command():
 
         print(f"🔊 Procesando comando: '{command_text}'")
 
-        # Analizar el comando
-        analysis = intent_detector.analyze_command(command_text)
-
-        # Agregar metadata
-        analysis['comando_original'] = command_text
-        analysis['usuario_id'] = session.get('user_id')
-        analysis['timestamp'] = datetime.now().isoformat()
-        analysis['error'] = False
+        modo_async = data.get('async') or request.args.get('async') == '1'
+        if modo_async:
+            user_id = session.get('user_id')
+            job_id = voice_jobs.submit(_analizar_comando, command_text, user_id, usuario_id=user_id)
+            if not job_id:
+                return jsonify({
+                    "error": True,
+                    "message": "El asistente está ocupado, intenta de nuevo en unos segundos"
+                }), 503
 
-        print(f"✅ Análisis completado: {analysis['intencion']}")
-        if analysis['intencion'] == 'BUSCAR_PRODUCTO':
-            print(f"📦 Productos encontrados: {analysis['cantidad_resultados']}")
+            return jsonify({
+                "error": False,
+                "job_id": job_id,
+                "estado": VoiceJobManager.PENDIENTE,
+                "url": url_for('voice_bp.get_voice_job', job_id=job_id)
+            }), 202
 
-        return jsonify(analysis)
+        # Analizar el comando (modo síncrono)
+        return jsonify(_analizar_comando(command_text, session.get('user_id')))
 
     except Exception as e:
         print(f"❌ Error en process_voice_command: {e}")
@@ -68,6 +116,21 @@ def process_voice_command():
         }), 500
 
 
+@voice_bp.route('/jobs/<job_id>')
+@login_required
+def get_voice_job(job_id):
+    """Consulta el estado y el resultado de un comando encolado"""
+    job = _get_job_usuario(job_id)
+    if not job:
+        return jsonify({
+            "error": True,
+            "message": "Trabajo no encontrado"
+        }), 404
+
+    job.pop('usuario_id', None)
+    return jsonify(job)
+
+
 @voice_bp.route('/execute', methods=['POST'])
 @login_required
 def execute_command():
@@ -134,6 +197,18 @@ def execute_command():
         }), 500
 
 
+@voice_bp.route('/stats')
+@login_required
+def voice_stats():
+    """Estadísticas del asistente: proporción de comandos resueltos sin Gemini"""
+    return jsonify({
+        "status": "success",
+        "intenciones": intent_detector.get_stats(),
+        "cache": intent_detector.voice_model.cache.stats(),
+        "trabajos": voice_jobs.stats()
+    })
+
+
 @voice_bp.route('/test-search')
 @login_required
 def test_search():
@@ -1,29 +1,291 @@
 # app/database.py
+import os
+import threading
+import time
+from collections import deque
+
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context
 from app.config import Config
 
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL seguro para hilos.
+
+    - Limita el número de conexiones abiertas por proceso (pool_size).
+    - Reutiliza conexiones ociosas en lugar de abrir una nueva por consulta.
+    - Verifica la salud de las conexiones que llevan tiempo ociosas (ping).
+    - Recicla conexiones que superan su tiempo de vida (recycle).
+    """
+
+    def __init__(self, pool_size=5, recycle=3600, timeout=10, ping_interval=30, **connect_args):
+        self.pool_size = max(1, int(pool_size))
+        self.recycle = recycle
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.connect_args = connect_args
+
+        self._idle = deque()  # (conexion, creada_en, ultimo_uso)
+        self._created = {}  # id(conexion) -> creada_en
+        self._in_use = set()  # id(conexion) prestadas actualmente
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self.pid = os.getpid()
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.connect_args)
+        with self._lock:
+            self._created[id(connection)] = time.monotonic()
+            self._in_use.add(id(connection))
+        return connection
+
+    def _discard(self, connection):
+        with self._lock:
+            self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _is_healthy(self, connection, created_at, last_used):
+        """Determina si una conexión ociosa puede reutilizarse."""
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            return False
+        if self.ping_interval is not None and now - last_used > self.ping_interval:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                return False
+        return True
+
+    def acquire(self):
+        """Obtiene una conexión del pool, esperando como máximo `timeout` segundos."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise mysql.connector.errors.PoolError(
+                f"No hay conexiones disponibles en el pool (tamaño {self.pool_size})"
+            )
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    return self._connect()
+
+                connection, created_at, last_used = entry
+                if self._is_healthy(connection, created_at, last_used):
+                    with self._lock:
+                        self._in_use.add(id(connection))
+                    return connection
+                print("Conexión MySQL caducada o inválida descartada del pool.")
+                self._discard(connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        """Devuelve una conexión al pool, descartándola si quedó en mal estado."""
+        with self._lock:
+            if id(connection) not in self._in_use:
+                if id(connection) not in self._created:
+                    # Conexión ajena al pool (por ejemplo, abierta antes de un fork)
+                    connection.close()
+                return  # Ya fue devuelta
+            self._in_use.discard(id(connection))
+
+        try:
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+                reusable = connection.is_connected()
+            except Error:
+                reusable = False
+
+            if reusable:
+                with self._lock:
+                    self._idle.append((connection, self._created[id(connection)], time.monotonic()))
+            else:
+                self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def dispose(self):
+        """Cierra todas las conexiones ociosas del pool."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Devuelve el estado actual del pool."""
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'abiertas': len(self._created),
+                'ociosas': len(self._idle),
+                'en_uso': len(self._in_use),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Devuelve el pool del proceso actual, creándolo de forma perezosa (seguro tras fork de gunicorn)."""
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool(
+                    pool_size=getattr(Config, 'MYSQL_POOL_SIZE', 5),
+                    recycle=getattr(Config, 'MYSQL_POOL_RECYCLE', 3600),
+                    timeout=getattr(Config, 'MYSQL_POOL_TIMEOUT', 10),
+                    ping_interval=getattr(Config, 'MYSQL_POOL_PING_INTERVAL', 30),
+                    host=Config.MYSQL_HOST,
+                    user=Config.MYSQL_USER,
+                    password=Config.MYSQL_PASSWORD,
+                    database=Config.MYSQL_DB,
+                    # Cursores con resultado leído por completo: permite abrir varios
+                    # cursores sobre la misma conexión (UnitOfWork) sin "Unread result found"
+                    buffered=True
+                )
+    return _pool
+
+
+def _prestadas():
+    """Conexiones prestadas durante el request actual (para devolverlas en el teardown)."""
+    if not has_app_context():
+        return None
+    if '_db_prestadas' not in g:
+        g._db_prestadas = []
+    return g._db_prestadas
+
+
 def get_db_connection():
-    """Establece y devuelve una conexión a la base de datos."""
+    """Obtiene una conexión del pool de la base de datos."""
     try:
-        connection = mysql.connector.connect(
-            host=Config.MYSQL_HOST,
-            user=Config.MYSQL_USER,
-            password=Config.MYSQL_PASSWORD,
-            database=Config.MYSQL_DB
-        )
-        if connection.is_connected():
-            print("Conexión a la base de datos MySQL exitosa.")
-            return connection
+        connection = get_pool().acquire()
+        prestadas = _prestadas()
+        if prestadas is not None:
+            prestadas.append(connection)
+        return connection
     except Error as e:
         print(f"Error al conectar a la base de datos MySQL: {e}")
         return None
 
+
 def close_db_connection(connection):
-    """Cierra la conexión a la base de datos."""
-    if connection and connection.is_connected():
-        connection.close()
-        print("Conexión a la base de datos MySQL cerrada.")
+    """Devuelve la conexión al pool."""
+    if connection is None:
+        return
+    prestadas = _prestadas()
+    if prestadas is not None:
+        prestadas[:] = [c for c in prestadas if c is not connection]
+    get_pool().release(connection)
+
+
+class UnitOfWork:
+    """
+    Unidad de trabajo: una sola conexión y una sola transacción compartida
+    por varias operaciones de los modelos.
+
+    Uso:
+        with UnitOfWork() as uow:
+            id_mov = movimiento_model.create_movimiento(..., uow=uow)
+            movimiento_model.actualizar_stock(id_mov, uow=uow)
+
+    Al salir del bloque se confirma la transacción; si ocurre una excepción
+    (o se llamó a rollback()) se revierte. La conexión vuelve al pool.
+    """
+
+    def __init__(self):
+        self.connection = None
+        self._finalizada = False
+
+    def __enter__(self):
+        self.connection = get_db_connection()
+        if self.connection is None:
+            raise Error("No se pudo obtener una conexión para la unidad de trabajo")
+        self.connection.start_transaction()
+        self._finalizada = False
+        return self
+
+    def cursor(self, dictionary=False):
+        return self.connection.cursor(dictionary=dictionary)
+
+    def commit(self):
+        self.connection.commit()
+        self._finalizada = True
+
+    def rollback(self):
+        self.connection.rollback()
+        self._finalizada = True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if not self._finalizada:
+                if exc_type is None:
+                    self.commit()
+                else:
+                    self.rollback()
+        finally:
+            close_db_connection(self.connection)
+            self.connection = None
+        return False
+
+
+def iter_query(query, params=(), lote=500):
+    """
+    Ejecuta una consulta con un cursor de servidor (sin buffer) y entrega las
+    filas como diccionarios de a `lote`, sin cargar el resultado completo en
+    memoria. Pensado para exportaciones grandes.
+
+    La conexión queda ocupada hasta que el generador se agota o se cierra.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    agotado = False
+    try:
+        cursor.execute(query, params)
+        while True:
+            filas = cursor.fetchmany(lote)
+            if not filas:
+                break
+            yield from filas
+        agotado = True
+    except Error as e:
+        print(f"Error al leer consulta en streaming: {e}")
+    finally:
+        if not agotado:
+            # Quedaron filas sin leer (p. ej. el cliente se desconectó): cerrar la
+            # conexión en vez de leer el resto; el pool la descarta al devolverla
+            try:
+                conn.close()
+            except Error:
+                pass
+        try:
+            cursor.close()
+        except Error:
+            pass
+        close_db_connection(conn)
+
+
+def init_app(app):
+    """Registra la devolución automática de conexiones al terminar cada request."""
+
+    @app.teardown_appcontext
+    def _devolver_conexiones(exception=None):
+        prestadas = g.pop('_db_prestadas', None)
+        for connection in prestadas or []:
+            print("Conexión MySQL no devuelta explícitamente; regresándola al pool.")
+            get_pool().release(connection)
+
 
 # Ejemplo de uso (solo para prueba, no se usará directamente en el flujo MVC)
 if __name__ == '__main__':
@@ -38,4 +300,5 @@ if __name__ == '__main__':
             print(f"Error al ejecutar consulta: {e}")
         finally:
             cursor.close()
-            close_db_connection(conn)
\ No newline at end of file
+            close_db_connection(conn)
+        print(get_pool().stats())
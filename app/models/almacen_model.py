@@ -1,10 +1,13 @@
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.dashboard_metrics import invalidar_metricas_dashboard
+from app.services.catalogos import catalogo_cacheado, invalidar_catalogo
 
 class AlmacenModel:
     def __init__(self):
         pass
 
+    @catalogo_cacheado('almacen')
     def get_all_almacenes(self):
         """Obtiene todos los almacenes de la tabla 'almacen'."""
         conn = get_db_connection()
@@ -23,6 +26,23 @@ class AlmacenModel:
             cursor.close()
             close_db_connection(conn)
 
+    def contar_almacenes(self):
+        """Cuenta los almacenes registrados."""
+        conn = get_db_connection()
+        if conn is None:
+            return 0
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM almacen")
+            return cursor.fetchone()[0]
+        except mysql.connector.Error as err:
+            print(f"Error al contar almacenes: {err}")
+            return 0
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    @catalogo_cacheado('almacen')
     def get_almacen_by_id(self, id_almacen):
         """Obtiene un almacén por su ID."""
         conn = get_db_connection()
@@ -63,6 +83,8 @@ class AlmacenModel:
             query = "INSERT INTO almacen (nombre, direccion, es_principal) VALUES (%s, %s, %s)"
             cursor.execute(query, (nombre, direccion, es_principal))
             conn.commit()
+            invalidar_catalogo('almacen')
+            invalidar_metricas_dashboard()
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear almacén: {err}")
@@ -94,6 +116,7 @@ class AlmacenModel:
             query = "UPDATE almacen SET nombre = %s, direccion = %s, es_principal = %s WHERE id_almacen = %s"
             cursor.execute(query, (nombre, direccion, es_principal, id_almacen))
             conn.commit()
+            invalidar_catalogo('almacen')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al actualizar almacén: {err}")
@@ -115,6 +138,8 @@ class AlmacenModel:
             query = "DELETE FROM almacen WHERE id_almacen = %s"
             cursor.execute(query, (id_almacen,))
             conn.commit()
+            invalidar_catalogo('almacen')
+            invalidar_metricas_dashboard()
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al eliminar almacén: {err}")
@@ -124,6 +149,7 @@ class AlmacenModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('almacen')
     def get_almacen_principal(self):
         """Obtiene el almacén principal."""
         conn = get_db_connection()
@@ -1,5 +1,8 @@
+import re
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.dashboard_metrics import invalidar_metricas_dashboard
+from app.services.voice.product_index import notificar_cambio_articulo
 
 class ArticuloModel:
     def __init__(self):
@@ -31,6 +34,89 @@ class ArticuloModel:
             cursor.close()
             close_db_connection(conn)
 
+    def contar_articulos(self):
+        """Cuenta los artículos registrados."""
+        conn = get_db_connection()
+        if conn is None:
+            return 0
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM articulo")
+            return cursor.fetchone()[0]
+        except mysql.connector.Error as err:
+            print(f"Error al contar artículos: {err}")
+            return 0
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    # Longitud mínima de palabra del índice FULLTEXT (innodb_ft_min_token_size)
+    LONGITUD_MINIMA_FULLTEXT = 3
+
+    def autocompletar_articulos(self, termino, limit=20, offset=0):
+        """
+        Busca artículos para el autocompletado usando solo índices:
+        prefijo de código, palabras del nombre (FULLTEXT, cada palabra como
+        prefijo) y, para términos cortos, prefijo de nombre.
+
+        Orden: código exacto, prefijo de código, relevancia del nombre y
+        nombre. Sin término devuelve la primera página por nombre.
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            columnas = "id_articulo, codigo, nombre, precio_compra, precio_venta"
+            termino = (termino or '').strip()
+            if not termino:
+                cursor.execute(f"SELECT {columnas} FROM articulo ORDER BY nombre LIMIT %s OFFSET %s",
+                               (limit, offset))
+                return cursor.fetchall()
+
+            prefijo = termino.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            consultas = [f"""
+                         SELECT {columnas}, IF(codigo = %s, 3, 2) as prioridad, 0 as relevancia
+                         FROM articulo
+                         WHERE codigo LIKE %s \
+                         """]
+            params = [termino, prefijo]
+
+            # Palabras sin operadores del modo booleano; todas obligatorias y como prefijo
+            palabras = [p for p in re.findall(r'\w+', termino) if len(p) >= self.LONGITUD_MINIMA_FULLTEXT]
+            if palabras:
+                booleana = ' '.join(f"+{palabra}*" for palabra in palabras)
+                consultas.append(f"""
+                                 SELECT {columnas}, 1 as prioridad,
+                                        MATCH(nombre) AGAINST (%s IN BOOLEAN MODE) as relevancia
+                                 FROM articulo
+                                 WHERE MATCH(nombre) AGAINST (%s IN BOOLEAN MODE) \
+                                 """)
+                params.extend([booleana, booleana])
+            else:
+                consultas.append(f"""
+                                 SELECT {columnas}, 1 as prioridad, 0 as relevancia
+                                 FROM articulo
+                                 WHERE nombre LIKE %s \
+                                 """)
+                params.append(prefijo)
+
+            query = f"""
+                    SELECT id_articulo, codigo, nombre, precio_compra, precio_venta
+                    FROM ({' UNION ALL '.join(consultas)}) r
+                    GROUP BY id_articulo, codigo, nombre, precio_compra, precio_venta
+                    ORDER BY MAX(prioridad) DESC, MAX(relevancia) DESC, nombre
+                    LIMIT %s OFFSET %s \
+                    """
+            cursor.execute(query, params + [limit, offset])
+            return cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al autocompletar artículos: {err}")
+            return []
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
     def get_articulo_by_id(self, id_articulo):
         """Obtiene un artículo por su ID."""
         conn = get_db_connection()
@@ -80,6 +166,8 @@ class ArticuloModel:
             cursor.execute(query, (codigo, nombre, precio_compra, precio_venta, stock_minimo,
                                  id_categoria, id_marca, id_unidad_medida))
             conn.commit()
+            invalidar_metricas_dashboard()
+            notificar_cambio_articulo(cursor.lastrowid)
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear artículo: {err}")
@@ -113,6 +201,7 @@ class ArticuloModel:
             cursor.execute(query, (codigo, nombre, precio_compra, precio_venta, stock_minimo,
                                  id_categoria, id_marca, id_unidad_medida, id_articulo))
             conn.commit()
+            notificar_cambio_articulo(id_articulo)
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al actualizar artículo: {err}")
@@ -134,6 +223,8 @@ class ArticuloModel:
             query = "DELETE FROM articulo WHERE id_articulo = %s"
             cursor.execute(query, (id_articulo,))
             conn.commit()
+            invalidar_metricas_dashboard()
+            notificar_cambio_articulo(id_articulo)
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al eliminar artículo: {err}")
@@ -146,11 +237,15 @@ class ArticuloModel:
     # En tu ArticuloModel, agrega este método específico para voz:
 
 
-    def get_articulos_para_voz(self):
-        """Obtiene artículos con todos los campos necesarios para el asistente de voz"""
+    def get_articulos_para_voz(self, id_articulo=None):
+        """
+        Obtiene artículos con todos los campos necesarios para el asistente de voz.
+        Con `id_articulo` devuelve solo ese artículo (si está activo), para refrescar el índice.
+        Retorna None ante un error de base de datos.
+        """
         conn = get_db_connection()
         if conn is None:
-            return []
+            return None
 
         cursor = conn.cursor(dictionary=True)
         try:
@@ -171,10 +266,15 @@ class ArticuloModel:
                              LEFT JOIN categoria c ON a.id_categoria = c.id_categoria
                              LEFT JOIN marca m ON a.id_marca = m.id_marca
                              LEFT JOIN unidad_medida um ON a.id_unidad_medida = um.id_unidad_medida
-                    WHERE a.estado = 'ACTIVO'
-                    ORDER BY a.nombre \
+                    WHERE a.estado = 'ACTIVO' \
                     """
-            cursor.execute(query)
+            params = []
+            if id_articulo is not None:
+                query += " AND a.id_articulo = %s"
+                params.append(id_articulo)
+            query += " ORDER BY a.nombre"
+
+            cursor.execute(query, params)
             articulos = cursor.fetchall()
 
             # Asegurar que todos los campos existan
@@ -187,7 +287,7 @@ class ArticuloModel:
 
         except Exception as e:
             print(f"Error al obtener artículos para voz: {e}")
-            return []
+            return None
         finally:
             cursor.close()
             close_db_connection(conn)
@@ -1,12 +1,14 @@
 # app/models/categoria_model.py
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.catalogos import catalogo_cacheado, invalidar_catalogo
 
 
 class CategoriaModel:
     def __init__(self):
         pass
 
+    @catalogo_cacheado('categoria')
     def get_all_categorias(self):
         """Obtiene todas las categorías de la tabla 'categoria'."""
         conn = get_db_connection()
@@ -25,6 +27,7 @@ class CategoriaModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('categoria')
     def get_categoria_by_id(self, id_categoria):
         """Obtiene una categoría por su ID."""
         conn = get_db_connection()
@@ -60,6 +63,7 @@ class CategoriaModel:
             query = "INSERT INTO categoria (nombre, descripcion) VALUES (%s, %s)"
             cursor.execute(query, (nombre, descripcion))
             conn.commit()
+            invalidar_catalogo('categoria')
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear categoría: {err}")
@@ -86,6 +90,7 @@ class CategoriaModel:
             query = "UPDATE categoria SET nombre = %s, descripcion = %s WHERE id_categoria = %s"
             cursor.execute(query, (nombre, descripcion, id_categoria))
             conn.commit()
+            invalidar_catalogo('categoria')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al actualizar categoría: {err}")
@@ -107,6 +112,7 @@ class CategoriaModel:
             query = "DELETE FROM categoria WHERE id_categoria = %s"
             cursor.execute(query, (id_categoria,))
             conn.commit()
+            invalidar_catalogo('categoria')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al eliminar categoría: {err}")
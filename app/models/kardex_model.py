@@ -1,11 +1,78 @@
 import mysql.connector
-from app.database import get_db_connection, close_db_connection
+from datetime import datetime
+from app.database import get_db_connection, close_db_connection, UnitOfWork, iter_query
 
 
 class KardexModel:
+    # Filas del kardex que se reescriben por sentencia al recalcular
+    LOTE_RECALCULO = 1000
+
     def __init__(self):
         pass
 
+    @staticmethod
+    def calcular_saldo(cantidad_saldo, costo_promedio, cantidad_entrada, costo_entrada, cantidad_salida):
+        """
+        Aplica una línea al saldo con costo promedio ponderado.
+
+        Devuelve (nuevo_saldo, nuevo_costo_promedio, valor_saldo, costo_salida).
+        """
+        if cantidad_entrada:
+            # Calcular nuevo costo promedio (solo para entradas)
+            if cantidad_saldo + cantidad_entrada > 0:
+                costo_promedio = ((cantidad_saldo * costo_promedio) + (cantidad_entrada * costo_entrada)) / \
+                                 (cantidad_saldo + cantidad_entrada)
+            else:
+                costo_promedio = costo_entrada
+            costo_salida = 0
+        else:
+            costo_salida = costo_promedio  # Para salidas, usamos el costo promedio
+
+        nuevo_saldo = cantidad_saldo + cantidad_entrada - cantidad_salida
+        return nuevo_saldo, costo_promedio, nuevo_saldo * costo_promedio, costo_salida
+
+    @staticmethod
+    def _filtro_fechas(query, params, fecha_inicio, fecha_fin):
+        """
+        Agrega el rango de fechas como intervalo semiabierto [inicio, fin + 1 día)
+        sobre k.fecha, sin funciones sobre la columna, para que use los índices
+        de la migración 004.
+        """
+        if fecha_inicio:
+            query += " AND k.fecha >= %s"
+            params.append(fecha_inicio)
+
+        if fecha_fin:
+            query += " AND k.fecha < %s + INTERVAL 1 DAY"
+            params.append(fecha_fin)
+
+        return query
+
+    def _kardex_articulo_query(self, id_articulo, id_almacen=None, fecha_inicio=None, fecha_fin=None):
+        """Construye la consulta del kardex de un artículo y sus parámetros."""
+        query = """
+                SELECT k.*, \
+                       a.nombre  as articulo_nombre, \
+                       a.codigo  as articulo_codigo, \
+                       al.nombre as almacen_nombre, \
+                       tm.nombre as tipo_movimiento, \
+                       tm.es_entrada
+                FROM kardex k
+                         INNER JOIN articulo a ON k.id_articulo = a.id_articulo
+                         INNER JOIN almacen al ON k.id_almacen = al.id_almacen
+                         INNER JOIN tipo_movimiento tm ON k.id_tipo_movimiento = tm.id_tipo_movimiento
+                WHERE k.id_articulo = %s \
+                """
+        params = [id_articulo]
+
+        if id_almacen:
+            query += " AND k.id_almacen = %s"
+            params.append(id_almacen)
+
+        query = self._filtro_fechas(query, params, fecha_inicio, fecha_fin)
+        query += " ORDER BY k.fecha ASC, k.id_kardex ASC"
+        return query, params
+
     def get_kardex_articulo(self, id_articulo, id_almacen=None, fecha_inicio=None, fecha_fin=None):
         """Obtiene el kardex de un artículo específico."""
         print(f"DEBUG: Obteniendo kardex para artículo {id_articulo}, almacén {id_almacen}")
@@ -15,34 +82,7 @@ class KardexModel:
             return []
         cursor = conn.cursor(dictionary=True)
         try:
-            query = """
-                    SELECT k.*, \
-                           a.nombre  as articulo_nombre, \
-                           a.codigo  as articulo_codigo, \
-                           al.nombre as almacen_nombre, \
-                           tm.nombre as tipo_movimiento, \
-                           tm.es_entrada
-                    FROM kardex k
-                             INNER JOIN articulo a ON k.id_articulo = a.id_articulo
-                             INNER JOIN almacen al ON k.id_almacen = al.id_almacen
-                             INNER JOIN tipo_movimiento tm ON k.id_tipo_movimiento = tm.id_tipo_movimiento
-                    WHERE k.id_articulo = %s \
-                    """
-            params = [id_articulo]
-
-            if id_almacen:
-                query += " AND k.id_almacen = %s"
-                params.append(id_almacen)
-
-            if fecha_inicio:
-                query += " AND DATE(k.fecha) >= %s"
-                params.append(fecha_inicio)
-
-            if fecha_fin:
-                query += " AND DATE(k.fecha) <= %s"
-                params.append(fecha_fin)
-
-            query += " ORDER BY k.fecha ASC, k.id_kardex ASC"
+            query, params = self._kardex_articulo_query(id_articulo, id_almacen, fecha_inicio, fecha_fin)
 
             print(f"DEBUG: Ejecutando query: {query}")
             print(f"DEBUG: Parámetros: {params}")
@@ -60,6 +100,25 @@ class KardexModel:
             cursor.close()
             close_db_connection(conn)
 
+    def _kardex_almacen_query(self, id_almacen, fecha_inicio=None, fecha_fin=None):
+        """Construye la consulta del kardex de un almacén y sus parámetros."""
+        query = """
+                SELECT k.*, \
+                       a.nombre  as articulo_nombre, \
+                       a.codigo  as articulo_codigo, \
+                       tm.nombre as tipo_movimiento, \
+                       tm.es_entrada
+                FROM kardex k
+                         INNER JOIN articulo a ON k.id_articulo = a.id_articulo
+                         INNER JOIN tipo_movimiento tm ON k.id_tipo_movimiento = tm.id_tipo_movimiento
+                WHERE k.id_almacen = %s \
+                """
+        params = [id_almacen]
+
+        query = self._filtro_fechas(query, params, fecha_inicio, fecha_fin)
+        query += " ORDER BY k.fecha ASC, k.id_kardex ASC"
+        return query, params
+
     def get_kardex_almacen(self, id_almacen, fecha_inicio=None, fecha_fin=None):
         """Obtiene el kardex de un almacén específico."""
         print(f"DEBUG: Obteniendo kardex para almacén {id_almacen}")
@@ -69,28 +128,7 @@ class KardexModel:
             return []
         cursor = conn.cursor(dictionary=True)
         try:
-            query = """
-                    SELECT k.*, \
-                           a.nombre  as articulo_nombre, \
-                           a.codigo  as articulo_codigo, \
-                           tm.nombre as tipo_movimiento, \
-                           tm.es_entrada
-                    FROM kardex k
-                             INNER JOIN articulo a ON k.id_articulo = a.id_articulo
-                             INNER JOIN tipo_movimiento tm ON k.id_tipo_movimiento = tm.id_tipo_movimiento
-                    WHERE k.id_almacen = %s \
-                    """
-            params = [id_almacen]
-
-            if fecha_inicio:
-                query += " AND DATE(k.fecha) >= %s"
-                params.append(fecha_inicio)
-
-            if fecha_fin:
-                query += " AND DATE(k.fecha) <= %s"
-                params.append(fecha_fin)
-
-            query += " ORDER BY k.fecha ASC, k.id_kardex ASC"
+            query, params = self._kardex_almacen_query(id_almacen, fecha_inicio, fecha_fin)
 
             print(f"DEBUG: Ejecutando query: {query}")
             print(f"DEBUG: Parámetros: {params}")
@@ -108,26 +146,557 @@ class KardexModel:
             cursor.close()
             close_db_connection(conn)
 
+    def iter_kardex_almacen(self, id_almacen, fecha_inicio=None, fecha_fin=None):
+        """Recorre el kardex de un almacén fila por fila con un cursor de servidor (exportaciones)."""
+        query, params = self._kardex_almacen_query(id_almacen, fecha_inicio, fecha_fin)
+        return iter_query(query, params)
+
     def get_saldo_actual_articulo(self, id_articulo, id_almacen):
         """Obtiene el saldo actual de un artículo en un almacén."""
-        conn = get_db_connection()
+        saldo = self.get_saldo_snapshot(id_articulo, id_almacen)
+        return saldo['cantidad_saldo'] if saldo else 0
+
+    def get_saldo_snapshot(self, id_articulo, id_almacen, uow=None, bloquear=False):
+        """
+        Obtiene el último saldo (cantidad, costo promedio, valor) de un artículo
+        en un almacén desde la tabla kardex_saldo, con una búsqueda por clave primaria.
+
+        Con `bloquear` (dentro de una unidad de trabajo) la fila queda bloqueada
+        hasta el fin de la transacción, de modo que dos movimientos simultáneos
+        del mismo artículo y almacén encadenan sus saldos en orden.
+
+        Si el par aún no tiene snapshot (datos anteriores a la migración 002),
+        se toma el último registro del kardex.
+        """
+        conn = uow.connection if uow else get_db_connection()
         if conn is None:
-            return 0
-        cursor = conn.cursor()
+            return None
+        cursor = conn.cursor(dictionary=True)
         try:
             query = """
-                    SELECT cantidad_saldo
+                    SELECT cantidad_saldo, costo_promedio, valor_saldo, id_kardex_ultimo
+                    FROM kardex_saldo
+                    WHERE id_articulo = %s \
+                      AND id_almacen = %s \
+                    """
+            if bloquear:
+                query += " FOR UPDATE"
+            cursor.execute(query, (id_articulo, id_almacen))
+            saldo = cursor.fetchone()
+            if saldo:
+                return saldo
+
+            query = """
+                    SELECT cantidad_saldo, costo_promedio, valor_saldo, id_kardex as id_kardex_ultimo
                     FROM kardex
                     WHERE id_articulo = %s \
                       AND id_almacen = %s
                     ORDER BY fecha DESC, id_kardex DESC LIMIT 1 \
                     """
             cursor.execute(query, (id_articulo, id_almacen))
-            resultado = cursor.fetchone()
-            return resultado[0] if resultado else 0
+            return cursor.fetchone()
+        except mysql.connector.Error as err:
+            print(f"Error al obtener saldo de kardex: {err}")
+            if uow:
+                raise
+            return None
+        finally:
+            cursor.close()
+            if uow is None:
+                close_db_connection(conn)
+
+    def get_saldos_snapshot(self, ids_articulo, id_almacen, uow, bloquear=True):
+        """
+        Obtiene en una consulta los saldos de varios artículos de un almacén
+        ({id_articulo: saldo}); los pares sin snapshot se completan desde el
+        último registro del kardex, también en una sola consulta.
+        """
+        ids = list(dict.fromkeys(ids_articulo))
+        if not ids:
+            return {}
+        cursor = uow.cursor(dictionary=True)
+        try:
+            marcadores = ', '.join(['%s'] * len(ids))
+            query = f"""
+                    SELECT id_articulo, cantidad_saldo, costo_promedio, valor_saldo, id_kardex_ultimo, fecha_ultimo
+                    FROM kardex_saldo
+                    WHERE id_almacen = %s \
+                      AND id_articulo IN ({marcadores}) \
+                    """
+            if bloquear:
+                query += " FOR UPDATE"
+            cursor.execute(query, [id_almacen] + ids)
+            saldos = {fila['id_articulo']: fila for fila in cursor.fetchall()}
+
+            faltantes = [i for i in ids if i not in saldos]
+            if faltantes:
+                marcadores = ', '.join(['%s'] * len(faltantes))
+                query = f"""
+                        SELECT id_articulo, cantidad_saldo, costo_promedio, valor_saldo, id_kardex_ultimo, fecha_ultimo
+                        FROM (SELECT k.id_articulo, k.cantidad_saldo, k.costo_promedio, k.valor_saldo, \
+                                     k.id_kardex as id_kardex_ultimo, k.fecha as fecha_ultimo, \
+                                     ROW_NUMBER() OVER (PARTITION BY k.id_articulo \
+                                         ORDER BY k.fecha DESC, k.id_kardex DESC) as rn
+                              FROM kardex k
+                              WHERE k.id_almacen = %s \
+                                AND k.id_articulo IN ({marcadores})) ultimos
+                        WHERE rn = 1 \
+                        """
+                cursor.execute(query, [id_almacen] + faltantes)
+                for fila in cursor.fetchall():
+                    fila.pop('rn', None)
+                    saldos[fila['id_articulo']] = fila
+            return saldos
+        finally:
+            cursor.close()
+
+    def guardar_saldos_snapshot(self, saldos, uow):
+        """
+        Actualiza en un solo lote los snapshots de saldo dentro de la transacción
+        del asiento de kardex.
+
+        saldos: tuplas (id_articulo, id_almacen, cantidad_saldo, costo_promedio,
+        valor_saldo, id_kardex, fecha).
+        """
+        if not saldos:
+            return
+        cursor = uow.cursor()
+        try:
+            query = """
+                    INSERT INTO kardex_saldo
+                    (id_articulo, id_almacen, cantidad_saldo, costo_promedio, valor_saldo,
+                     id_kardex_ultimo, fecha_ultimo)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE cantidad_saldo   = VALUES(cantidad_saldo), \
+                                            costo_promedio   = VALUES(costo_promedio), \
+                                            valor_saldo      = VALUES(valor_saldo), \
+                                            id_kardex_ultimo = VALUES(id_kardex_ultimo), \
+                                            fecha_ultimo     = VALUES(fecha_ultimo) \
+                    """
+            cursor.executemany(query, saldos)
+        finally:
+            cursor.close()
+
+    def get_saldo_al(self, id_articulo, id_almacen, fecha):
+        """
+        Obtiene el saldo de un artículo en un almacén al cierre de `fecha`
+        (último registro del kardex con fecha <= ese día) o None si aún no
+        tenía movimientos. Es un solo descenso por el índice
+        (id_articulo, id_almacen, fecha).
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            query = """
+                    SELECT id_kardex, fecha, cantidad_saldo, costo_promedio, valor_saldo
+                    FROM kardex
+                    WHERE id_articulo = %s \
+                      AND id_almacen = %s \
+                      AND fecha < %s + INTERVAL 1 DAY
+                    ORDER BY fecha DESC, id_kardex DESC LIMIT 1 \
+                    """
+            cursor.execute(query, (id_articulo, id_almacen, fecha))
+            return cursor.fetchone()
+        except mysql.connector.Error as err:
+            print(f"Error al obtener saldo a la fecha: {err}")
+            return None
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def _stock_al_query(self, fecha, id_almacen=None, id_articulo=None):
+        """
+        Construye la consulta de stock al cierre de `fecha` para varios pares
+        artículo/almacén a la vez.
+
+        Los pares salen de kardex_saldo (uno por par con kardex) y, para cada
+        uno, una subconsulta correlacionada toma el id_kardex del último
+        registro <= fecha recorriendo el índice (id_articulo, id_almacen, fecha)
+        hacia atrás: una búsqueda por clave en lugar de agrupar el historial.
+        """
+        query = """
+                SELECT k.id_almacen, al.nombre as almacen, k.id_articulo, a.codigo, a.nombre as articulo,
+                       k.fecha as fecha_ultimo_movimiento, k.cantidad_saldo, k.costo_promedio, k.valor_saldo
+                FROM (SELECT (SELECT k2.id_kardex \
+                              FROM kardex k2 \
+                              WHERE k2.id_articulo = ks.id_articulo \
+                                AND k2.id_almacen = ks.id_almacen \
+                                AND k2.fecha < %s + INTERVAL 1 DAY \
+                              ORDER BY k2.fecha DESC, k2.id_kardex DESC LIMIT 1) as id_kardex
+                      FROM kardex_saldo ks
+                      WHERE 1 = 1 \
+                """
+        params = [fecha]
+
+        if id_almacen:
+            query += " AND ks.id_almacen = %s"
+            params.append(id_almacen)
+
+        if id_articulo:
+            query += " AND ks.id_articulo = %s"
+            params.append(id_articulo)
+
+        query += """) ultimos
+                         JOIN kardex k ON k.id_kardex = ultimos.id_kardex
+                         JOIN articulo a ON k.id_articulo = a.id_articulo
+                         JOIN almacen al ON k.id_almacen = al.id_almacen
+                ORDER BY al.nombre, a.nombre \
+                """
+        return query, params
+
+    def get_stock_al(self, fecha, id_almacen=None, id_articulo=None):
+        """
+        Obtiene el stock valorizado al cierre de `fecha` de todo el catálogo,
+        de un almacén o de un artículo en todos sus almacenes (para cierres
+        de mes y auditorías). Los pares sin movimientos hasta esa fecha no
+        aparecen.
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            query, params = self._stock_al_query(fecha, id_almacen, id_articulo)
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al obtener stock a la fecha: {err}")
+            return []
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def get_articulos_con_kardex(self, id_almacen):
+        """Obtiene los IDs de los artículos que tienen registros de kardex en un almacén."""
+        conn = get_db_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT DISTINCT id_articulo FROM kardex WHERE id_almacen = %s", (id_almacen,))
+            return [fila[0] for fila in cursor.fetchall()]
+        except mysql.connector.Error as err:
+            print(f"Error al obtener artículos con kardex: {err}")
+            return []
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def registrar_lineas(self, fecha, id_almacen, id_tipo_movimiento, tipo_documento, numero_documento,
+                         lineas, uow):
+        """
+        Registra en el kardex las líneas de un documento (movimiento o venta)
+        dentro de la unidad de trabajo.
+
+        lineas: dicts con id_articulo, cantidad_entrada, costo_entrada y
+        cantidad_salida. Los saldos anteriores se leen en una consulta, los
+        promedios se calculan en memoria y las filas se insertan en un solo
+        lote, así que el número de consultas no depende de las líneas.
+        Devuelve True o False.
+        """
+        cursor = uow.cursor()
+        try:
+            # Saldos anteriores de todos los artículos en una consulta (bloqueados)
+            saldos = self.get_saldos_snapshot([linea['id_articulo'] for linea in lineas], id_almacen,
+                                              uow=uow, bloquear=True)
+
+            # Artículos cuyo último saldo es posterior a la fecha del documento (registro con fecha pasada)
+            fecha_documento = fecha
+            if isinstance(fecha_documento, str):
+                fecha_documento = datetime.fromisoformat(fecha_documento)
+            # DATETIME redondea las fracciones de segundo al guardar: con segundos enteros
+            # la búsqueda por fecha de las filas recién insertadas coincide con lo guardado
+            fecha_documento = fecha_documento.replace(microsecond=0)
+            retroactivos = [id_articulo for id_articulo, saldo in saldos.items()
+                            if saldo.get('fecha_ultimo') and saldo['fecha_ultimo'] > fecha_documento]
+
+            # Calcular en memoria; un artículo repetido encadena sobre su propio saldo
+            filas_kardex = []
+            for linea in lineas:
+                saldo_anterior = saldos.get(linea['id_articulo'])
+                if saldo_anterior:
+                    cantidad_saldo_anterior = saldo_anterior['cantidad_saldo'] or 0
+                    costo_promedio_anterior = saldo_anterior['costo_promedio'] or 0
+                else:
+                    cantidad_saldo_anterior = 0
+                    costo_promedio_anterior = 0
+
+                nuevo_saldo, nuevo_costo_promedio, valor_saldo, costo_salida = self.calcular_saldo(
+                    cantidad_saldo_anterior, costo_promedio_anterior, linea['cantidad_entrada'],
+                    linea['costo_entrada'], linea['cantidad_salida'])
+
+                saldos[linea['id_articulo']] = {
+                    'cantidad_saldo': nuevo_saldo,
+                    'costo_promedio': nuevo_costo_promedio,
+                    'valor_saldo': valor_saldo,
+                }
+                filas_kardex.append((
+                    fecha_documento,
+                    id_almacen,
+                    linea['id_articulo'],
+                    id_tipo_movimiento,
+                    tipo_documento,
+                    numero_documento,
+                    linea['cantidad_entrada'],
+                    linea['costo_entrada'],
+                    linea['cantidad_salida'],
+                    costo_salida,
+                    nuevo_saldo,
+                    nuevo_costo_promedio,
+                    valor_saldo
+                ))
+
+            # Insertar todas las filas en kardex (INSERT de varias filas)
+            kardex_query = """
+                           INSERT INTO kardex
+                           (fecha, id_almacen, id_articulo, id_tipo_movimiento,
+                            tipo_documento, numero_documento,
+                            cantidad_entrada, costo_entrada, cantidad_salida, costo_salida,
+                            cantidad_saldo, costo_promedio, valor_saldo)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) \
+                           """
+            cursor.executemany(kardex_query, filas_kardex)
+
+            # Último id_kardex de cada artículo del documento, para el snapshot.
+            # La fecha acota la búsqueda a idx_kardex_articulo_almacen_fecha
+            # (numero_documento no está indexado)
+            marcadores = ', '.join(['%s'] * len(saldos))
+            cursor.execute(f"""
+                           SELECT id_articulo, MAX(id_kardex)
+                           FROM kardex
+                           WHERE id_articulo IN ({marcadores}) \
+                             AND id_almacen = %s \
+                             AND fecha = %s \
+                             AND numero_documento = %s
+                           GROUP BY id_articulo \
+                           """, list(saldos) + [id_almacen, fecha_documento, numero_documento])
+            ultimos = dict(cursor.fetchall())
+
+            # Mantener los snapshots de saldo en la misma transacción
+            self.guardar_saldos_snapshot([
+                (id_articulo, id_almacen, saldo['cantidad_saldo'], saldo['costo_promedio'], saldo['valor_saldo'],
+                 ultimos.get(id_articulo), fecha_documento)
+                for id_articulo, saldo in saldos.items()
+                if id_articulo in ultimos
+            ], uow)
+
+            # Reencadenar los saldos posteriores a un documento con fecha pasada
+            for id_articulo in retroactivos:
+                print(f"DEBUG: Documento con fecha pasada - recalculando kardex del artículo {id_articulo}")
+                if self.recalcular_kardex(id_articulo, id_almacen, fecha_documento, uow=uow) is False:
+                    return False
+
+            # Resumen diario de los artículos afectados desde el día del documento.
+            # Si falla se deshace solo el resumen (lo repara `flask stock-diario`) y
+            # el registro sigue; tras un deadlock MySQL ya revirtió toda la transacción,
+            # el savepoint no existe y ROLLBACK TO lanza error: el registro falla
+            cursor.execute("SAVEPOINT stock_diario")
+            if self.refrescar_stock_diario(id_almacen, list(ultimos), fecha_documento.date(), uow=uow) is False:
+                cursor.execute("ROLLBACK TO SAVEPOINT stock_diario")
+                print("DEBUG: No se pudo actualizar el resumen diario de stock")
+            else:
+                cursor.execute("RELEASE SAVEPOINT stock_diario")
+
+            return True
         except mysql.connector.Error as err:
-            print(f"Error al obtener saldo actual: {err}")
-            return 0
+            print(f"DEBUG: Error al registrar en kardex: {err}")
+            return False
         finally:
             cursor.close()
-            close_db_connection(conn)
\ No newline at end of file
+
+    def recalcular_kardex(self, id_articulo, id_almacen, desde=None, uow=None):
+        """
+        Recalcula los saldos y costos promedio del kardex de un artículo en un
+        almacén a partir de `desde` (fecha); sin fecha, todo su historial.
+
+        Se usa cuando se registra un movimiento con fecha anterior al último
+        saldo: solo se relee y reescribe el tramo posterior a esa fecha. Las
+        filas se recorren por lotes en orden (fecha, id_kardex), de modo que la
+        memoria no depende del tamaño del kardex, y cada lote se reescribe con
+        un solo UPDATE. Al final se actualiza el snapshot de saldo.
+
+        Devuelve el número de filas recalculadas o False si falla.
+        """
+        if uow is None:
+            try:
+                with UnitOfWork() as uow:
+                    resultado = self.recalcular_kardex(id_articulo, id_almacen, desde, uow=uow)
+                    if resultado is False:
+                        uow.rollback()
+                    return resultado
+            except mysql.connector.Error as err:
+                print(f"Error al recalcular kardex: {err}")
+                return False
+
+        cursor = uow.cursor(dictionary=True)
+        try:
+            # Bloquear el snapshot para no cruzarse con un registro simultáneo
+            cursor.execute("""
+                           SELECT id_kardex_ultimo
+                           FROM kardex_saldo
+                           WHERE id_articulo = %s \
+                             AND id_almacen = %s FOR UPDATE \
+                           """, (id_articulo, id_almacen))
+            cursor.fetchall()
+
+            # Saldo inicial: último registro anterior al tramo a recalcular
+            cantidad_saldo, costo_promedio, valor_saldo = 0, 0, 0
+            if desde:
+                cursor.execute("""
+                               SELECT cantidad_saldo, costo_promedio, valor_saldo
+                               FROM kardex
+                               WHERE id_articulo = %s \
+                                 AND id_almacen = %s \
+                                 AND fecha < %s
+                               ORDER BY fecha DESC, id_kardex DESC LIMIT 1 \
+                               """, (id_articulo, id_almacen, desde))
+                anterior = cursor.fetchone()
+                if anterior:
+                    cantidad_saldo = anterior['cantidad_saldo'] or 0
+                    costo_promedio = anterior['costo_promedio'] or 0
+                    valor_saldo = anterior['valor_saldo'] or 0
+
+            lote_query = """
+                         SELECT id_kardex, fecha, cantidad_entrada, costo_entrada, cantidad_salida
+                         FROM kardex
+                         WHERE id_articulo = %s \
+                           AND id_almacen = %s \
+                         """
+            total = 0
+            ultimo = None  # (fecha, id_kardex) de la última fila procesada
+            while True:
+                query = lote_query
+                params = [id_articulo, id_almacen]
+                if ultimo:
+                    query += " AND (fecha > %s OR (fecha = %s AND id_kardex > %s))"
+                    params += [ultimo[0], ultimo[0], ultimo[1]]
+                elif desde:
+                    query += " AND fecha >= %s"
+                    params.append(desde)
+                query += " ORDER BY fecha, id_kardex LIMIT %s"
+                cursor.execute(query, params + [self.LOTE_RECALCULO])
+                filas = cursor.fetchall()
+                if not filas:
+                    break
+
+                valores = []
+                for fila in filas:
+                    cantidad_saldo, costo_promedio, valor_saldo, costo_salida = self.calcular_saldo(
+                        cantidad_saldo, costo_promedio,
+                        fila['cantidad_entrada'] or 0, fila['costo_entrada'] or 0, fila['cantidad_salida'] or 0)
+                    valores += [fila['id_kardex'], costo_salida, cantidad_saldo, costo_promedio, valor_saldo]
+
+                seleccion = " UNION ALL ".join(
+                    ["SELECT %s AS id_kardex, %s AS costo_salida, %s AS cantidad_saldo, "
+                     "%s AS costo_promedio, %s AS valor_saldo"] * len(filas))
+                cursor.execute(f"""
+                               UPDATE kardex k
+                                   INNER JOIN ({seleccion}) v ON k.id_kardex = v.id_kardex
+                               SET k.costo_salida   = v.costo_salida, \
+                                   k.cantidad_saldo = v.cantidad_saldo, \
+                                   k.costo_promedio = v.costo_promedio, \
+                                   k.valor_saldo    = v.valor_saldo \
+                               """, valores)
+
+                total += len(filas)
+                ultimo = (filas[-1]['fecha'], filas[-1]['id_kardex'])
+                if len(filas) < self.LOTE_RECALCULO:
+                    break
+
+            if ultimo:
+                self.guardar_saldos_snapshot([(id_articulo, id_almacen, cantidad_saldo, costo_promedio,
+                                               valor_saldo, ultimo[1], ultimo[0])], uow)
+
+            print(f"Kardex recalculado: artículo {id_articulo}, almacén {id_almacen}, {total} registros")
+            return total
+        except mysql.connector.Error as err:
+            print(f"Error al recalcular kardex: {err}")
+            return False
+        finally:
+            cursor.close()
+
+    def refrescar_stock_diario(self, id_almacen=None, ids_articulo=None, desde=None, uow=None):
+        """
+        Recalcula el resumen diario (tabla stock_diario) desde el kardex a
+        partir de `desde` (fecha); sin fecha, todo el historial. Puede
+        limitarse a un almacén y a ciertos artículos.
+
+        Las filas del alcance se borran y se vuelven a insertar con un solo
+        INSERT ... SELECT: totales del día y saldo de la última fila de cada día.
+        Devuelve el número de filas generadas o False si falla.
+        """
+        if uow is None:
+            try:
+                with UnitOfWork() as uow:
+                    resultado = self.refrescar_stock_diario(id_almacen, ids_articulo, desde, uow=uow)
+                    if resultado is False:
+                        uow.rollback()
+                    return resultado
+            except mysql.connector.Error as err:
+                print(f"Error al actualizar el resumen diario de stock: {err}")
+                return False
+
+        condiciones, params = [], []
+        if desde:
+            condiciones.append("{t}fecha >= %s")
+            params.append(desde)
+        if id_almacen:
+            condiciones.append("{t}id_almacen = %s")
+            params.append(id_almacen)
+        if ids_articulo:
+            condiciones.append("{t}id_articulo IN (" + ', '.join(['%s'] * len(ids_articulo)) + ")")
+            params.extend(ids_articulo)
+
+        def where(prefijo):
+            return (" WHERE " + " AND ".join(c.format(t=prefijo) for c in condiciones)) if condiciones else ""
+
+        cursor = uow.cursor()
+        try:
+            cursor.execute("DELETE FROM stock_diario" + where(""), params)
+            cursor.execute("""
+                           INSERT INTO stock_diario
+                           (fecha, id_almacen, id_articulo, cantidad_entrada, cantidad_salida,
+                            valor_entrada, valor_salida, cantidad_cierre, costo_promedio, valor_cierre)
+                           SELECT dia, id_almacen, id_articulo, entradas, salidas,
+                                  valor_entrada, valor_salida, cantidad_saldo, costo_promedio, valor_saldo
+                           FROM (SELECT DATE(k.fecha) as dia, k.id_almacen, k.id_articulo, \
+                                        SUM(k.cantidad_entrada) OVER dia_articulo                   as entradas, \
+                                        SUM(k.cantidad_salida) OVER dia_articulo                    as salidas, \
+                                        SUM(k.cantidad_entrada * k.costo_entrada) OVER dia_articulo as valor_entrada, \
+                                        SUM(k.cantidad_salida * k.costo_salida) OVER dia_articulo   as valor_salida, \
+                                        k.cantidad_saldo, k.costo_promedio, k.valor_saldo, \
+                                        ROW_NUMBER() OVER (PARTITION BY k.id_almacen, k.id_articulo, DATE(k.fecha) \
+                                            ORDER BY k.fecha DESC, k.id_kardex DESC)                as rn
+                                 FROM kardex k""" + where("k.") + """
+                                 WINDOW dia_articulo AS (PARTITION BY k.id_almacen, k.id_articulo, DATE(k.fecha))) d
+                           WHERE rn = 1 \
+                           """, params)
+            return cursor.rowcount
+        except mysql.connector.Error as err:
+            print(f"Error al actualizar el resumen diario de stock: {err}")
+            return False
+        finally:
+            cursor.close()
+
+    def get_ultima_fecha_stock_diario(self, id_almacen=None):
+        """Obtiene el último día presente en el resumen diario (punto de partida incremental)."""
+        conn = get_db_connection()
+        if conn is None:
+            return None
+        cursor = conn.cursor()
+        try:
+            query = "SELECT MAX(fecha) FROM stock_diario"
+            params = []
+            if id_almacen:
+                query += " WHERE id_almacen = %s"
+                params.append(id_almacen)
+            cursor.execute(query, params)
+            return cursor.fetchone()[0]
+        except mysql.connector.Error as err:
+            print(f"Error al obtener la última fecha del resumen diario: {err}")
+            return None
+        finally:
+            cursor.close()
+            close_db_connection(conn)
@@ -1,12 +1,14 @@
 # app/models/marca_model.py
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.catalogos import catalogo_cacheado, invalidar_catalogo
 
 
 class MarcaModel:
     def __init__(self):
         pass
 
+    @catalogo_cacheado('marca')
     def get_all_marcas(self):
         """Obtiene todas las marcas de la tabla 'marcas'."""
         conn = get_db_connection()
@@ -25,6 +27,7 @@ class MarcaModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('marca')
     def get_marca_by_id(self, id_marca):
         """Obtiene una marcas por su ID."""
         conn = get_db_connection()
@@ -60,6 +63,7 @@ class MarcaModel:
             query = "INSERT INTO marca (nombre, descripcion) VALUES (%s, %s)"
             cursor.execute(query, (nombre, descripcion))
             conn.commit()
+            invalidar_catalogo('marca')
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear marcas: {err}")
@@ -86,6 +90,7 @@ class MarcaModel:
             query = "UPDATE marca SET nombre = %s, descripcion = %s WHERE id_marca = %s"
             cursor.execute(query, (nombre, descripcion, id_marca))
             conn.commit()
+            invalidar_catalogo('marca')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al actualizar marcas: {err}")
@@ -107,6 +112,7 @@ class MarcaModel:
             query = "DELETE FROM marca WHERE id_marca = %s"
             cursor.execute(query, (id_marca,))
             conn.commit()
+            invalidar_catalogo('marca')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al eliminar marcas: {err}")
@@ -1,7 +1,11 @@
 import mysql.connector
-from app.database import get_db_connection, close_db_connection
+from app.database import get_db_connection, close_db_connection, UnitOfWork
+from app.services.dashboard_metrics import invalidar_metricas_dashboard
+from app.models.kardex_model import KardexModel
 from datetime import datetime
 
+kardex_model = KardexModel()
+
 
 class MovimientoModel:
     def __init__(self):
@@ -46,9 +50,152 @@ class MovimientoModel:
             cursor.close()
             close_db_connection(conn)
 
-    def get_movimiento_by_id(self, id_movimiento_cabecera):
-        """Obtiene un movimiento por su ID."""
+    # Campos de texto en los que busca el listado de movimientos
+    CAMPOS_BUSQUEDA = ['al.nombre', 'tm.nombre', 'u.nombre_usuario', 'mc.observacion']
+
+    # Semi-join: el motor se detiene en la primera línea del artículo por cabecera.
+    # Usa el índice idx_movimiento_detalle_articulo (migrations/001).
+    FILTRO_ARTICULO = "EXISTS (SELECT 1 FROM movimiento_detalle md " \
+                      "WHERE md.id_movimiento_cabecera = mc.id_movimiento_cabecera " \
+                      "AND md.id_articulo = %s)"
+
+    def _filtros_listado(self, tipo=None, search=None, id_articulo=None, fecha_desde=None, fecha_hasta=None):
+        """Construye el WHERE y sus parámetros para el listado de movimientos."""
+        condiciones = []
+        params = []
+
+        if tipo == 'entrada':
+            condiciones.append("tm.es_entrada = 1")
+        elif tipo == 'salida':
+            condiciones.append("tm.es_entrada = 0")
+
+        if search:
+            campos = list(self.CAMPOS_BUSQUEDA)
+            if tipo != 'salida':
+                campos.append('p.razon_social')
+            patron = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            condiciones.append("(" + " OR ".join(f"{campo} LIKE %s" for campo in campos) + ")")
+            params.extend([patron] * len(campos))
+
+        if id_articulo:
+            condiciones.append(self.FILTRO_ARTICULO)
+            params.append(id_articulo)
+
+        # Rango semiabierto [desde, hasta + 1 día) para poder usar el índice de fecha
+        if fecha_desde:
+            condiciones.append("mc.fecha_movimiento >= %s")
+            params.append(fecha_desde)
+        if fecha_hasta:
+            condiciones.append("mc.fecha_movimiento < %s + INTERVAL 1 DAY")
+            params.append(fecha_hasta)
+
+        where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return where, params
+
+    def contar_movimientos(self, tipo=None, search=None, id_articulo=None, fecha_desde=None, fecha_hasta=None):
+        """Cuenta los movimientos que cumplen los filtros del listado."""
         conn = get_db_connection()
+        if conn is None:
+            return 0
+        cursor = conn.cursor()
+        try:
+            where, params = self._filtros_listado(tipo, search, id_articulo, fecha_desde, fecha_hasta)
+            query = """
+                    SELECT COUNT(*)
+                    FROM movimiento_cabecera mc
+                             INNER JOIN tipo_movimiento tm ON mc.id_tipo_movimiento = tm.id_tipo_movimiento
+                             INNER JOIN almacen al ON mc.id_almacen = al.id_almacen
+                             INNER JOIN usuario u ON mc.id_usuario_registro = u.id_usuario
+                             LEFT JOIN proveedor p ON mc.id_proveedor = p.id_proveedor \
+                    """ + where
+            cursor.execute(query, params)
+            return cursor.fetchone()[0]
+        except mysql.connector.Error as err:
+            print(f"Error al contar movimientos: {err}")
+            return 0
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def buscar_movimientos(self, tipo=None, search=None, id_articulo=None, fecha_desde=None, fecha_hasta=None,
+                           limit=10, offset=0):
+        """Obtiene una página de movimientos filtrados, ordenados del más reciente al más antiguo."""
+        conn = get_db_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            where, params = self._filtros_listado(tipo, search, id_articulo, fecha_desde, fecha_hasta)
+            query = """
+                    SELECT mc.*, \
+                           tm.nombre      as tipo_movimiento_nombre, \
+                           tm.es_entrada, \
+                           al.nombre      as almacen_nombre, \
+                           u.nombre_usuario, \
+                           p.razon_social as proveedor_nombre
+                    FROM movimiento_cabecera mc
+                             INNER JOIN tipo_movimiento tm ON mc.id_tipo_movimiento = tm.id_tipo_movimiento
+                             INNER JOIN almacen al ON mc.id_almacen = al.id_almacen
+                             INNER JOIN usuario u ON mc.id_usuario_registro = u.id_usuario
+                             LEFT JOIN proveedor p ON mc.id_proveedor = p.id_proveedor \
+                    """ + where
+            query += " ORDER BY mc.fecha_movimiento DESC, mc.id_movimiento_cabecera DESC LIMIT %s OFFSET %s"
+            cursor.execute(query, params + [limit, offset])
+            return cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al buscar movimientos: {err}")
+            return []
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def buscar_movimientos_keyset(self, clave, direccion, limit, tipo=None, search=None, id_articulo=None,
+                                  fecha_desde=None, fecha_hasta=None):
+        """
+        Obtiene una página de movimientos filtrados por cursor (fecha_movimiento, id_movimiento_cabecera).
+
+        direccion 'next': movimientos anteriores a `clave`, del más reciente al más antiguo.
+        direccion 'prev': movimientos posteriores a `clave`, del más antiguo al más reciente.
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            where, params = self._filtros_listado(tipo, search, id_articulo, fecha_desde, fecha_hasta)
+            operador, orden = ('<', 'DESC') if direccion == 'next' else ('>', 'ASC')
+            if clave:
+                where += " AND " if where else " WHERE "
+                where += f"(mc.fecha_movimiento {operador} %s OR " \
+                         f"(mc.fecha_movimiento = %s AND mc.id_movimiento_cabecera {operador} %s))"
+                params += [clave[0], clave[0], clave[1]]
+
+            query = """
+                    SELECT mc.*, \
+                           tm.nombre      as tipo_movimiento_nombre, \
+                           tm.es_entrada, \
+                           al.nombre      as almacen_nombre, \
+                           u.nombre_usuario, \
+                           p.razon_social as proveedor_nombre
+                    FROM movimiento_cabecera mc
+                             INNER JOIN tipo_movimiento tm ON mc.id_tipo_movimiento = tm.id_tipo_movimiento
+                             INNER JOIN almacen al ON mc.id_almacen = al.id_almacen
+                             INNER JOIN usuario u ON mc.id_usuario_registro = u.id_usuario
+                             LEFT JOIN proveedor p ON mc.id_proveedor = p.id_proveedor \
+                    """ + where
+            query += f" ORDER BY mc.fecha_movimiento {orden}, mc.id_movimiento_cabecera {orden} LIMIT %s"
+            cursor.execute(query, params + [limit])
+            return cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al buscar movimientos: {err}")
+            return []
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def get_movimiento_by_id(self, id_movimiento_cabecera, uow=None):
+        """Obtiene un movimiento por su ID."""
+        conn = uow.connection if uow else get_db_connection()
         if conn is None:
             return None
         cursor = conn.cursor(dictionary=True)
@@ -75,11 +222,12 @@ class MovimientoModel:
             return None
         finally:
             cursor.close()
-            close_db_connection(conn)
+            if uow is None:
+                close_db_connection(conn)
 
-    def get_detalle_movimiento(self, id_movimiento_cabecera):
+    def get_detalle_movimiento(self, id_movimiento_cabecera, uow=None):
         """Obtiene el detalle de un movimiento."""
-        conn = get_db_connection()
+        conn = uow.connection if uow else get_db_connection()
         if conn is None:
             return []
         cursor = conn.cursor(dictionary=True)
@@ -103,12 +251,13 @@ class MovimientoModel:
             return []
         finally:
             cursor.close()
-            close_db_connection(conn)
+            if uow is None:
+                close_db_connection(conn)
 
     def create_movimiento(self, fecha_movimiento, id_almacen, id_tipo_movimiento, observacion, id_usuario,
-                          id_proveedor=None):
-        """Crea un nuevo movimiento."""
-        conn = get_db_connection()
+                          id_proveedor=None, uow=None):
+        """Crea un nuevo movimiento. Con `uow` no confirma: lo hace la unidad de trabajo."""
+        conn = uow.connection if uow else get_db_connection()
         if conn is None:
             return False
         cursor = conn.cursor()
@@ -120,20 +269,23 @@ class MovimientoModel:
                     """
             cursor.execute(query,
                            (fecha_movimiento, id_almacen, id_tipo_movimiento, observacion, id_usuario, id_proveedor))
-            conn.commit()
+            if uow is None:
+                conn.commit()
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear movimiento: {err}")
-            conn.rollback()
+            if uow is None:
+                conn.rollback()
             return False
         finally:
             cursor.close()
-            close_db_connection(conn)
+            if uow is None:
+                close_db_connection(conn)
 
     def agregar_detalle_movimiento(self, id_movimiento_cabecera, id_articulo, cantidad, costo_unitario,
-                                   precio_venta=None, es_entrada=True):
+                                   precio_venta=None, es_entrada=True, uow=None):
         """Agrega un detalle al movimiento con ambos precios"""
-        conn = get_db_connection()  # ✅ OBTENER CONEXIÓN CORRECTAMENTE
+        conn = uow.connection if uow else get_db_connection()
         if conn is None:
             return False
 
@@ -146,7 +298,7 @@ class MovimientoModel:
                     precio_venta = costo_unitario
                 else:
                     # Para salidas, obtener el precio_venta del artículo
-                    articulo = self.get_articulo_by_id(id_articulo)
+                    articulo = self.get_articulo_by_id(id_articulo, uow=uow)
                     precio_venta = articulo['precio_venta'] if articulo else costo_unitario
 
             query = """
@@ -155,141 +307,191 @@ class MovimientoModel:
                 VALUES (%s, %s, %s, %s, %s)
             """
             cursor.execute(query, (id_movimiento_cabecera, id_articulo, cantidad, costo_unitario, precio_venta))
-            conn.commit()  # ✅ USAR conn EN LUGAR DE self.conn
+            if uow is None:
+                conn.commit()
             print(
                 f"✅ Detalle guardado: Movimiento {id_movimiento_cabecera}, Artículo {id_articulo}, Cantidad {cantidad}")
             return True
         except Exception as e:
             print(f"❌ Error al agregar detalle: {e}")
-            conn.rollback()
+            if uow is None:
+                conn.rollback()
             return False
         finally:
             cursor.close()
-            close_db_connection(conn)  # ✅ CERRAR CONEXIÓN
-
-    def actualizar_stock(self, id_movimiento_cabecera):
-        """Actualiza el stock basado en el movimiento."""
+            if uow is None:
+                close_db_connection(conn)
+
+    def actualizar_stock(self, id_movimiento_cabecera, uow=None, faltantes=None):
+        """
+        Actualiza el stock basado en el movimiento y lo registra en el kardex.
+
+        Si se recibe `uow`, todo ocurre dentro de esa unidad de trabajo (misma
+        conexión y transacción); si no, se abre una propia para que stock y
+        kardex se confirmen o reviertan juntos.
+
+        El stock se modifica con una sola sentencia por movimiento y de forma
+        atómica (stock_actual = stock_actual ± cantidad), sin leerlo antes.
+        Si una salida no tiene stock suficiente, `faltantes` (lista opcional)
+        recibe una entrada por artículo con id_articulo, codigo, articulo_nombre,
+        solicitado y disponible, y no se guarda nada.
+        """
         print(f"DEBUG: Iniciando actualizar_stock para movimiento {id_movimiento_cabecera}")
 
-        conn = get_db_connection()
-        if conn is None:
-            print("DEBUG: Error de conexión a la base de datos")
-            return False
+        if uow is None:
+            try:
+                with UnitOfWork() as uow:
+                    if not self.actualizar_stock(id_movimiento_cabecera, uow=uow, faltantes=faltantes):
+                        uow.rollback()
+                        return False
+                print("DEBUG: Transacción confirmada - stock y kardex actualizados exitosamente")
+                invalidar_metricas_dashboard()
+                return True
+            except mysql.connector.Error as err:
+                print(f"DEBUG: Error en la base de datos: {err}")
+                return False
 
-        cursor = conn.cursor(dictionary=True)
+        cursor = uow.cursor(dictionary=True)
         try:
-            conn.start_transaction()
-            print("DEBUG: Transacción iniciada")
-
             # Obtener información del movimiento
-            movimiento = self.get_movimiento_by_id(id_movimiento_cabecera)
+            movimiento = self.get_movimiento_by_id(id_movimiento_cabecera, uow=uow)
             if not movimiento:
                 print("DEBUG: Movimiento no encontrado")
-                conn.rollback()
                 return False
 
             print(f"DEBUG: Movimiento encontrado - Tipo: {'ENTRADA' if movimiento['es_entrada'] else 'SALIDA'}")
             print(f"DEBUG: Almacén: {movimiento['id_almacen']}")
 
             # Obtener el detalle del movimiento
-            detalle = self.get_detalle_movimiento(id_movimiento_cabecera)
+            detalle = self.get_detalle_movimiento(id_movimiento_cabecera, uow=uow)
             if not detalle:
                 print("DEBUG: No hay detalle del movimiento")
-                conn.rollback()
                 return False
 
             print(f"DEBUG: {len(detalle)} artículos en el detalle")
 
-            # Actualizar stock para cada artículo
+            # Cantidad total por artículo (un artículo puede repetirse en el detalle)
+            cantidades = {}
             for item in detalle:
-                print(f"DEBUG: Procesando artículo {item['id_articulo']} - Cantidad: {item['cantidad']}")
+                cantidades[item['id_articulo']] = cantidades.get(item['id_articulo'], 0) + item['cantidad']
 
-                # Verificar si existe registro en stock_almacen
-                check_query = """
-                              SELECT stock_actual
-                              FROM stock_almacen
-                              WHERE id_articulo = %s \
-                                AND id_almacen = %s \
-                              """
-                cursor.execute(check_query, (item['id_articulo'], movimiento['id_almacen']))
-                resultado = cursor.fetchone()
-
-                if resultado:
-                    stock_actual = resultado['stock_actual']
-                    print(f"DEBUG: Stock actual encontrado: {stock_actual}")
-
-                    if movimiento['es_entrada']:
-                        nuevo_stock = stock_actual + item['cantidad']
-                        update_query = """
-                                       UPDATE stock_almacen
-                                       SET stock_actual = %s
-                                       WHERE id_articulo = %s \
-                                         AND id_almacen = %s \
-                                       """
-                        print(f"DEBUG: Entrada - Nuevo stock: {nuevo_stock}")
-                        cursor.execute(update_query, (nuevo_stock, item['id_articulo'], movimiento['id_almacen']))
-                    else:
-                        # Verificar stock suficiente para salidas
-                        if stock_actual < item['cantidad']:
-                            print(
-                                f"DEBUG: ERROR - Stock insuficiente. Actual: {stock_actual}, Requerido: {item['cantidad']}")
-                            conn.rollback()
-                            return False
-                        nuevo_stock = stock_actual - item['cantidad']
-                        update_query = """
-                                       UPDATE stock_almacen
-                                       SET stock_actual = %s
-                                       WHERE id_articulo = %s \
-                                         AND id_almacen = %s \
-                                       """
-                        print(f"DEBUG: Salida - Nuevo stock: {nuevo_stock}")
-                        cursor.execute(update_query, (nuevo_stock, item['id_articulo'], movimiento['id_almacen']))
-
-                    print(f"DEBUG: Stock actualizado para artículo {item['id_articulo']}")
-
-                else:
-                    print(f"DEBUG: No existe registro en stock_almacen para artículo {item['id_articulo']}")
-
-                    # Insertar nuevo registro (solo para entradas)
-                    if movimiento['es_entrada']:
-                        insert_query = """
-                                       INSERT INTO stock_almacen (id_articulo, id_almacen, stock_actual)
-                                       VALUES (%s, %s, %s) \
-                                       """
-                        cursor.execute(insert_query, (item['id_articulo'], movimiento['id_almacen'], item['cantidad']))
-                        print(f"DEBUG: Nuevo registro creado para artículo {item['id_articulo']}")
-                    else:
-                        # No se puede crear stock negativo
-                        print(f"DEBUG: ERROR - No se puede crear stock negativo para salida")
-                        conn.rollback()
+            if movimiento['es_entrada']:
+                # Suma atómica; crea la fila si el artículo aún no tiene stock en el almacén
+                upsert_query = """
+                               INSERT INTO stock_almacen (id_articulo, id_almacen, stock_actual)
+                               VALUES (%s, %s, %s)
+                               ON DUPLICATE KEY UPDATE stock_actual = stock_actual + VALUES(stock_actual) \
+                               """
+                cursor.executemany(upsert_query, [
+                    (id_articulo, movimiento['id_almacen'], cantidad)
+                    for id_articulo, cantidad in cantidades.items()
+                ])
+            else:
+                salidas = {id_articulo: cantidad for id_articulo, cantidad in cantidades.items() if cantidad > 0}
+                if salidas:
+                    # Resta atómica con guarda: solo se actualizan filas con stock suficiente
+                    filas = " UNION ALL ".join(["SELECT %s AS id_articulo, %s AS cantidad"] * len(salidas))
+                    params = [valor for par in salidas.items() for valor in par]
+                    update_query = f"""
+                                   UPDATE stock_almacen sa
+                                       INNER JOIN ({filas}) d ON sa.id_articulo = d.id_articulo
+                                   SET sa.stock_actual = sa.stock_actual - d.cantidad
+                                   WHERE sa.id_almacen = %s \
+                                     AND sa.stock_actual >= d.cantidad \
+                                   """
+                    cursor.execute("SAVEPOINT stock_salida")
+                    cursor.execute(update_query, params + [movimiento['id_almacen']])
+
+                    if cursor.rowcount != len(salidas):
+                        # Deshacer la resta parcial para informar el stock disponible real
+                        cursor.execute("ROLLBACK TO SAVEPOINT stock_salida")
+                        reporte = self._reporte_stock_insuficiente(cursor, movimiento['id_almacen'], salidas, detalle)
+                        for linea in reporte:
+                            print(f"DEBUG: ERROR - Stock insuficiente para {linea['codigo']}. "
+                                  f"Disponible: {linea['disponible']}, Requerido: {linea['solicitado']}")
+                        if faltantes is not None:
+                            faltantes.extend(reporte)
                         return False
 
-            print("DEBUG: Todos los artículos procesados - registrando en kardex")
+            print("DEBUG: Stock actualizado - registrando en kardex")
 
-            # REGISTRAR EN KARDEX DESPUÉS DE ACTUALIZAR STOCK
-            if not self.registrar_kardex(id_movimiento_cabecera):
+            # REGISTRAR EN KARDEX DENTRO DE LA MISMA TRANSACCIÓN
+            if not self.registrar_kardex(id_movimiento_cabecera, uow=uow, movimiento=movimiento, detalle=detalle):
                 print("DEBUG: ERROR - No se pudo registrar en kardex")
-                conn.rollback()
                 return False
 
-            print("DEBUG: Transacción confirmada - stock y kardex actualizados exitosamente")
-            conn.commit()
             return True
 
         except mysql.connector.Error as err:
             print(f"DEBUG: Error en la base de datos: {err}")
-            conn.rollback()
             return False
         except Exception as e:
             print(f"DEBUG: Error general: {e}")
-            conn.rollback()
             return False
         finally:
             cursor.close()
-            close_db_connection(conn)
-            print("DEBUG: Conexión cerrada")
 
+    def _reporte_stock_insuficiente(self, cursor, id_almacen, salidas, detalle):
+        """Lista los artículos de una salida cuyo stock no alcanza para la cantidad solicitada."""
+        marcadores = ', '.join(['%s'] * len(salidas))
+        cursor.execute(f"""
+                       SELECT id_articulo, stock_actual
+                       FROM stock_almacen
+                       WHERE id_almacen = %s \
+                         AND id_articulo IN ({marcadores}) \
+                       """, [id_almacen] + list(salidas))
+        stock = {fila['id_articulo']: fila['stock_actual'] for fila in cursor.fetchall()}
+
+        articulos = {item['id_articulo']: item for item in detalle}
+        reporte = []
+        for id_articulo, solicitado in salidas.items():
+            disponible = stock.get(id_articulo, 0)
+            if disponible < solicitado:
+                reporte.append({
+                    'id_articulo': id_articulo,
+                    'codigo': articulos[id_articulo].get('codigo'),
+                    'articulo_nombre': articulos[id_articulo].get('articulo_nombre'),
+                    'solicitado': solicitado,
+                    'disponible': disponible,
+                })
+        return reporte
+
+    def registrar_movimiento(self, fecha_movimiento, id_almacen, id_tipo_movimiento, observacion, id_usuario,
+                             detalle, id_proveedor=None, es_entrada=True, faltantes=None):
+        """
+        Registra un movimiento completo (cabecera, detalle, stock y kardex)
+        en una sola conexión y transacción.
+
+        `detalle` es una lista de diccionarios con id_articulo, cantidad,
+        costo_unitario y opcionalmente precio_venta.
+        Devuelve el ID del movimiento o False si algo falla (nada queda guardado);
+        `faltantes` recibe el detalle de stock insuficiente (ver actualizar_stock).
+        """
+        try:
+            with UnitOfWork() as uow:
+                id_movimiento = self.create_movimiento(fecha_movimiento, id_almacen, id_tipo_movimiento,
+                                                       observacion, id_usuario, id_proveedor, uow=uow)
+                if not id_movimiento:
+                    uow.rollback()
+                    return False
 
+                for item in detalle:
+                    if not self.agregar_detalle_movimiento(id_movimiento, item['id_articulo'], item['cantidad'],
+                                                           item['costo_unitario'], item.get('precio_venta'),
+                                                           es_entrada, uow=uow):
+                        uow.rollback()
+                        return False
+
+                if not self.actualizar_stock(id_movimiento, uow=uow, faltantes=faltantes):
+                    uow.rollback()
+                    return False
+
+            print(f"DEBUG: Movimiento {id_movimiento} registrado en una sola transacción")
+            invalidar_metricas_dashboard()
+            return id_movimiento
+        except mysql.connector.Error as err:
+            print(f"Error al registrar movimiento: {err}")
+            return False
 
     def verificar_stock_suficiente(self, id_movimiento_cabecera):
         """Verifica si hay stock suficiente para un movimiento de salida."""
@@ -367,6 +569,7 @@ class MovimientoModel:
             cursor.execute(delete_cabecera_query, (id_movimiento_cabecera,))
 
             conn.commit()
+            invalidar_metricas_dashboard()
             return True
         except mysql.connector.Error as err:
             print(f"Error al eliminar movimiento: {err}")
@@ -376,135 +579,69 @@ class MovimientoModel:
             cursor.close()
             close_db_connection(conn)
 
-    def registrar_kardex(self, id_movimiento_cabecera):
-        """Registra el movimiento en el kardex."""
+    def registrar_kardex(self, id_movimiento_cabecera, uow=None, movimiento=None, detalle=None):
+        """
+        Registra el movimiento en el kardex.
+
+        Con `uow` se escribe en la transacción de la unidad de trabajo; el
+        movimiento y su detalle pueden pasarse ya cargados para no releerlos.
+        El cálculo y la inserción en lote los hace KardexModel.registrar_lineas.
+        """
         print(f"DEBUG: Registrando kardex para movimiento {id_movimiento_cabecera}")
 
-        conn = get_db_connection()
-        if conn is None:
-            return False
-        cursor = conn.cursor()
-        try:
-            conn.start_transaction()
+        if uow is None:
+            try:
+                with UnitOfWork() as uow:
+                    if not self.registrar_kardex(id_movimiento_cabecera, uow=uow):
+                        uow.rollback()
+                        return False
+                return True
+            except mysql.connector.Error as err:
+                print(f"DEBUG: Error al registrar en kardex: {err}")
+                return False
 
+        try:
             # Obtener información del movimiento
-            movimiento = self.get_movimiento_by_id(id_movimiento_cabecera)
-            detalle = self.get_detalle_movimiento(id_movimiento_cabecera)
+            if movimiento is None:
+                movimiento = self.get_movimiento_by_id(id_movimiento_cabecera, uow=uow)
+            if detalle is None:
+                detalle = self.get_detalle_movimiento(id_movimiento_cabecera, uow=uow)
 
             if not movimiento or not detalle:
                 print("DEBUG: No se pudo obtener movimiento o detalle para kardex")
-                conn.rollback()
                 return False
 
             print(f"DEBUG: Registrando kardex para {len(detalle)} artículos")
 
-            # Para cada artículo en el detalle, registrar en kardex
+            # Líneas en el formato del kardex según el tipo de movimiento
+            lineas = []
             for item in detalle:
-                print(f"DEBUG: Procesando kardex para artículo {item['id_articulo']}")
-
-                # Obtener el último saldo del artículo en este almacén
-                saldo_query = """
-                              SELECT cantidad_saldo, costo_promedio, valor_saldo
-                              FROM kardex
-                              WHERE id_articulo = %s \
-                                AND id_almacen = %s
-                              ORDER BY fecha DESC, id_kardex DESC LIMIT 1 \
-                              """
-                cursor.execute(saldo_query, (item['id_articulo'], movimiento['id_almacen']))
-                saldo_anterior = cursor.fetchone()
-
-                if saldo_anterior:
-                    cantidad_saldo_anterior = saldo_anterior[0] if saldo_anterior[0] is not None else 0
-                    costo_promedio_anterior = saldo_anterior[1] if saldo_anterior[1] is not None else 0
-                    valor_saldo_anterior = saldo_anterior[2] if saldo_anterior[2] is not None else 0
-                else:
-                    cantidad_saldo_anterior = 0
-                    costo_promedio_anterior = 0
-                    valor_saldo_anterior = 0
-
-                print(f"DEBUG: Saldo anterior - Cantidad: {cantidad_saldo_anterior}, Costo: {costo_promedio_anterior}")
-
-                # Calcular nuevos valores según tipo de movimiento
                 if movimiento['es_entrada']:
-                    cantidad_entrada = item['cantidad']
-                    cantidad_salida = 0
-                    costo_entrada = item['costo_unitario']
-                    costo_salida = 0
-
-                    # Calcular nuevo costo promedio (solo para entradas)
-                    if cantidad_saldo_anterior + cantidad_entrada > 0:
-                        nuevo_costo_promedio = (
-                                                       (cantidad_saldo_anterior * costo_promedio_anterior) +
-                                                       (cantidad_entrada * costo_entrada)
-                                               ) / (cantidad_saldo_anterior + cantidad_entrada)
-                    else:
-                        nuevo_costo_promedio = costo_entrada
-
-                    print(f"DEBUG: Entrada - Nuevo costo promedio: {nuevo_costo_promedio}")
+                    lineas.append({'id_articulo': item['id_articulo'], 'cantidad_entrada': item['cantidad'],
+                                   'costo_entrada': item['costo_unitario'], 'cantidad_salida': 0})
                 else:
-                    cantidad_entrada = 0
-                    cantidad_salida = item['cantidad']
-                    costo_entrada = 0
-                    costo_salida = costo_promedio_anterior  # Para salidas, usamos el costo promedio
-                    nuevo_costo_promedio = costo_promedio_anterior
-                    print(f"DEBUG: Salida - Costo salida: {costo_salida}")
-
-                # Calcular nuevo saldo
-                nuevo_saldo = cantidad_saldo_anterior + cantidad_entrada - cantidad_salida
-                valor_saldo = nuevo_saldo * nuevo_costo_promedio
-
-                print(f"DEBUG: Nuevos valores - Saldo: {nuevo_saldo}, Valor: {valor_saldo}")
-
-                # Generar referencia de documento
-                tipo_documento_ref = movimiento['tipo_movimiento_nombre']
-                numero_documento_ref = f"MOV-{movimiento['id_movimiento_cabecera']}"
-
-                # Insertar en kardex
-                kardex_query = """
-                               INSERT INTO kardex
-                               (fecha, id_almacen, id_articulo, id_tipo_movimiento,
-                                tipo_documento, numero_documento,
-                                cantidad_entrada, costo_entrada, cantidad_salida, costo_salida,
-                                cantidad_saldo, costo_promedio, valor_saldo)
-                               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) \
-                               """
-                cursor.execute(kardex_query, (
-                    movimiento['fecha_movimiento'],
-                    movimiento['id_almacen'],
-                    item['id_articulo'],
-                    movimiento['id_tipo_movimiento'],
-                    tipo_documento_ref,
-                    numero_documento_ref,
-                    cantidad_entrada,
-                    costo_entrada,
-                    cantidad_salida,
-                    costo_salida,
-                    nuevo_saldo,
-                    nuevo_costo_promedio,
-                    valor_saldo
-                ))
-
-                print(f"DEBUG: Kardex registrado para artículo {item['id_articulo']}")
+                    lineas.append({'id_articulo': item['id_articulo'], 'cantidad_entrada': 0,
+                                   'costo_entrada': 0, 'cantidad_salida': item['cantidad']})
+
+            if not kardex_model.registrar_lineas(movimiento['fecha_movimiento'], movimiento['id_almacen'],
+                                                 movimiento['id_tipo_movimiento'],
+                                                 movimiento['tipo_movimiento_nombre'],
+                                                 f"MOV-{movimiento['id_movimiento_cabecera']}", lineas, uow):
+                return False
 
-            conn.commit()
             print("DEBUG: Kardex registrado exitosamente")
             return True
 
         except mysql.connector.Error as err:
             print(f"DEBUG: Error al registrar en kardex: {err}")
-            conn.rollback()
             return False
         except Exception as e:
             print(f"DEBUG: Error general en kardex: {e}")
-            conn.rollback()
             return False
-        finally:
-            cursor.close()
-            close_db_connection(conn)
 
-    def get_articulo_by_id(self, id_articulo):
+    def get_articulo_by_id(self, id_articulo, uow=None):
         """Obtiene un artículo por su ID."""
-        conn = get_db_connection()
+        conn = uow.connection if uow else get_db_connection()
         if conn is None:
             return None
         cursor = conn.cursor(dictionary=True)
@@ -518,5 +655,6 @@ class MovimientoModel:
             return None
         finally:
             cursor.close()
-            close_db_connection(conn)
+            if uow is None:
+                close_db_connection(conn)
 
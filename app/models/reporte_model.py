@@ -1,5 +1,5 @@
 import mysql.connector
-from app.database import get_db_connection, close_db_connection
+from app.database import get_db_connection, close_db_connection, iter_query
 
 
 class ReporteModel:
@@ -62,6 +62,32 @@ class ReporteModel:
             cursor.close()
             close_db_connection(conn)
 
+    def _kardex_articulo_query(self, id_articulo, id_almacen, fecha_desde, fecha_hasta):
+        """Construye la consulta del reporte de kardex de un artículo y sus parámetros."""
+        query = """
+                SELECT k.fecha, \
+                       a.nombre  as articulo, \
+                       al.nombre as almacen,
+                       tm.nombre as tipo_movimiento, \
+                       k.tipo_documento, \
+                       k.numero_documento,
+                       k.cantidad_entrada, \
+                       k.cantidad_salida, \
+                       k.cantidad_saldo,
+                       k.costo_promedio, \
+                       k.valor_saldo
+                FROM kardex k
+                         JOIN articulo a ON k.id_articulo = a.id_articulo
+                         JOIN almacen al ON k.id_almacen = al.id_almacen
+                         JOIN tipo_movimiento tm ON k.id_tipo_movimiento = tm.id_tipo_movimiento
+                WHERE k.id_articulo = %s \
+                  AND k.id_almacen = %s
+                  AND k.fecha >= %s
+                  AND k.fecha < %s + INTERVAL 1 DAY
+                ORDER BY k.fecha, k.id_kardex \
+                """
+        return query, (id_articulo, id_almacen, fecha_desde, fecha_hasta)
+
     def get_kardex_articulo(self, id_articulo, id_almacen, fecha_desde, fecha_hasta):
         """Obtiene datos de kardex para un artículo."""
         conn = get_db_connection()
@@ -69,28 +95,8 @@ class ReporteModel:
             return []
         cursor = conn.cursor(dictionary=True)
         try:
-            query = """
-                    SELECT k.fecha, \
-                           a.nombre  as articulo, \
-                           al.nombre as almacen,
-                           tm.nombre as tipo_movimiento, \
-                           k.tipo_documento, \
-                           k.numero_documento,
-                           k.cantidad_entrada, \
-                           k.cantidad_salida, \
-                           k.cantidad_saldo,
-                           k.costo_promedio, \
-                           k.valor_saldo
-                    FROM kardex k
-                             JOIN articulo a ON k.id_articulo = a.id_articulo
-                             JOIN almacen al ON k.id_almacen = al.id_almacen
-                             JOIN tipo_movimiento tm ON k.id_tipo_movimiento = tm.id_tipo_movimiento
-                    WHERE k.id_articulo = %s \
-                      AND k.id_almacen = %s
-                      AND k.fecha BETWEEN %s AND %s
-                    ORDER BY k.fecha, k.id_kardex \
-                    """
-            cursor.execute(query, (id_articulo, id_almacen, fecha_desde, fecha_hasta))
+            query, params = self._kardex_articulo_query(id_articulo, id_almacen, fecha_desde, fecha_hasta)
+            cursor.execute(query, params)
             return cursor.fetchall()
         except mysql.connector.Error as err:
             print(f"Error al obtener kardex: {err}")
@@ -99,6 +105,11 @@ class ReporteModel:
             cursor.close()
             close_db_connection(conn)
 
+    def iter_kardex_articulo(self, id_articulo, id_almacen, fecha_desde, fecha_hasta):
+        """Recorre el kardex de un artículo fila por fila con un cursor de servidor (exportaciones)."""
+        query, params = self._kardex_articulo_query(id_articulo, id_almacen, fecha_desde, fecha_hasta)
+        return iter_query(query, params)
+
     def get_stock_almacen(self, id_almacen, stock_minimo=False):
         """Obtiene stock actual por almacén."""
         conn = get_db_connection()
@@ -164,7 +175,8 @@ class ReporteModel:
                              JOIN articulo a ON md.id_articulo = a.id_articulo
                              JOIN usuario u ON mc.id_usuario_registro = u.id_usuario
                              LEFT JOIN proveedor p ON mc.id_proveedor = p.id_proveedor
-                    WHERE mc.fecha_movimiento BETWEEN %s AND %s \
+                    WHERE mc.fecha_movimiento >= %s
+                      AND mc.fecha_movimiento < %s + INTERVAL 1 DAY \
                     """
 
             params = [fecha_desde, fecha_hasta]
@@ -186,4 +198,151 @@ class ReporteModel:
             return []
         finally:
             cursor.close()
-            close_db_connection(conn)
\ No newline at end of file
+            close_db_connection(conn)
+
+    # Dimensiones permitidas para el resumen: nombre -> columnas (expresión SQL, alias)
+    DIMENSIONES_RESUMEN = {
+        'dia': [("DATE(mc.fecha_movimiento)", 'periodo')],
+        'semana': [("DATE(mc.fecha_movimiento - INTERVAL WEEKDAY(mc.fecha_movimiento) DAY)", 'periodo')],
+        'mes': [("DATE_FORMAT(mc.fecha_movimiento, '%%Y-%%m')", 'periodo')],
+        'almacen': [("al.id_almacen", 'id_almacen'), ("al.nombre", 'almacen')],
+        'tipo': [("tm.id_tipo_movimiento", 'id_tipo_movimiento'), ("tm.nombre", 'tipo_movimiento'),
+                 ("tm.es_entrada", 'es_entrada')],
+        'articulo': [("a.id_articulo", 'id_articulo'), ("a.codigo", 'codigo'), ("a.nombre", 'articulo')],
+        'categoria': [("c.id_categoria", 'id_categoria'), ("c.nombre", 'categoria')],
+    }
+
+    def get_resumen_movimientos(self, agrupar, id_tipo_movimiento, id_almacen, fecha_desde, fecha_hasta):
+        """
+        Obtiene totales de movimientos agrupados en SQL.
+
+        agrupar: lista de dimensiones de DIMENSIONES_RESUMEN (p. ej. ['mes', 'almacen']);
+        el período (dia/semana/mes) admite una sola granularidad.
+        Devuelve None si la consulta falla (para no confundirlo con un rango sin movimientos).
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        try:
+            columnas = [f"{expresion} as {alias}"
+                        for dimension in agrupar for expresion, alias in self.DIMENSIONES_RESUMEN[dimension]]
+            grupos = [alias for dimension in agrupar for _, alias in self.DIMENSIONES_RESUMEN[dimension]]
+
+            query = f"""
+                    SELECT {', '.join(columnas)}, \
+                           COUNT(DISTINCT mc.id_movimiento_cabecera)                            as movimientos, \
+                           COUNT(*)                                                             as lineas, \
+                           SUM(CASE WHEN tm.es_entrada = 1 THEN md.cantidad ELSE 0 END)         as cantidad_entrada, \
+                           SUM(CASE WHEN tm.es_entrada = 0 THEN md.cantidad ELSE 0 END)         as cantidad_salida, \
+                           SUM(CASE WHEN tm.es_entrada = 1 THEN md.cantidad * md.costo_unitario ELSE 0 END) \
+                                                                                                as total_entrada, \
+                           SUM(CASE WHEN tm.es_entrada = 0 THEN md.cantidad * md.costo_unitario ELSE 0 END) \
+                                                                                                as total_salida
+                    FROM movimiento_cabecera mc
+                             JOIN tipo_movimiento tm ON mc.id_tipo_movimiento = tm.id_tipo_movimiento
+                             JOIN almacen al ON mc.id_almacen = al.id_almacen
+                             JOIN movimiento_detalle md ON mc.id_movimiento_cabecera = md.id_movimiento_cabecera
+                             JOIN articulo a ON md.id_articulo = a.id_articulo
+                             LEFT JOIN categoria c ON a.id_categoria = c.id_categoria
+                    WHERE mc.fecha_movimiento >= %s
+                      AND mc.fecha_movimiento < %s + INTERVAL 1 DAY \
+                    """
+            params = [fecha_desde, fecha_hasta]
+
+            if id_tipo_movimiento:
+                query += " AND mc.id_tipo_movimiento = %s"
+                params.append(id_tipo_movimiento)
+
+            if id_almacen:
+                query += " AND mc.id_almacen = %s"
+                params.append(id_almacen)
+
+            query += f" GROUP BY {', '.join(grupos)} ORDER BY {', '.join(grupos)}"
+
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al obtener resumen de movimientos: {err}")
+            return None
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def get_stock_diario(self, id_almacen, fecha_desde, fecha_hasta, id_articulo=None):
+        """
+        Obtiene el resumen diario materializado (tabla stock_diario) de un
+        almacén: entradas, salidas y saldo valorizado al cierre de cada día
+        con movimiento.
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            query = """
+                    SELECT sd.fecha, sd.id_articulo, a.codigo, a.nombre as articulo,
+                           sd.cantidad_entrada, sd.cantidad_salida, sd.valor_entrada, sd.valor_salida,
+                           sd.cantidad_cierre, sd.costo_promedio, sd.valor_cierre
+                    FROM stock_diario sd
+                             JOIN articulo a ON sd.id_articulo = a.id_articulo
+                    WHERE sd.id_almacen = %s
+                      AND sd.fecha >= %s
+                      AND sd.fecha <= %s \
+                    """
+            params = [id_almacen, fecha_desde, fecha_hasta]
+
+            if id_articulo:
+                query += " AND sd.id_articulo = %s"
+                params.append(id_articulo)
+
+            query += " ORDER BY sd.fecha, a.nombre"
+
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al obtener stock diario: {err}")
+            return []
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def get_valorizacion_al(self, fecha, id_almacen=None):
+        """
+        Obtiene el stock valorizado de cada artículo al cierre de `fecha`
+        a partir del resumen diario: la última fila de cada almacén/artículo
+        con fecha <= `fecha` (los días sin movimiento no tienen fila).
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor(dictionary=True)
+        try:
+            filtro_almacen = ""
+            params = [fecha]
+            if id_almacen:
+                filtro_almacen = " AND sd.id_almacen = %s"
+                params.append(id_almacen)
+
+            query = f"""
+                    SELECT s.id_almacen, al.nombre as almacen, s.id_articulo, a.codigo, a.nombre as articulo,
+                           s.fecha as fecha_ultimo_movimiento, s.cantidad_cierre, s.costo_promedio, s.valor_cierre
+                    FROM (SELECT sd.*, \
+                                 ROW_NUMBER() OVER (PARTITION BY sd.id_almacen, sd.id_articulo \
+                                     ORDER BY sd.fecha DESC) as rn
+                          FROM stock_diario sd
+                          WHERE sd.fecha <= %s{filtro_almacen}) s
+                             JOIN articulo a ON s.id_articulo = a.id_articulo
+                             JOIN almacen al ON s.id_almacen = al.id_almacen
+                    WHERE s.rn = 1
+                    ORDER BY al.nombre, a.nombre \
+                    """
+
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except mysql.connector.Error as err:
+            print(f"Error al obtener valorización a la fecha: {err}")
+            return []
+        finally:
+            cursor.close()
+            close_db_connection(conn)
@@ -1,12 +1,14 @@
 # app/models/rol_model.py
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.catalogos import catalogo_cacheado, invalidar_catalogo
 
 
 class RolModel:
     def __init__(self):
         pass
 
+    @catalogo_cacheado('rol')
     def get_all_roles(self):
         """Obtiene todos los roles de la tabla 'rol'."""
         conn = get_db_connection()
@@ -25,6 +27,7 @@ class RolModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('rol')
     def get_rol_by_id(self, id_rol):
         """Obtiene un rol por su ID."""
         conn = get_db_connection()
@@ -60,6 +63,7 @@ class RolModel:
             query = "INSERT INTO rol (nombre) VALUES (%s)"
             cursor.execute(query, (nombre,))
             conn.commit()
+            invalidar_catalogo('rol')
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear rol: {err}")
@@ -86,6 +90,7 @@ class RolModel:
             query = "UPDATE rol SET nombre = %s WHERE id_rol = %s"
             cursor.execute(query, (nombre, id_rol))
             conn.commit()
+            invalidar_catalogo('rol')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al actualizar rol: {err}")
@@ -108,6 +113,7 @@ class RolModel:
             query = "DELETE FROM rol WHERE id_rol = %s"
             cursor.execute(query, (id_rol,))
             conn.commit()
+            invalidar_catalogo('rol')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al eliminar rol: {err}")
@@ -159,4 +159,43 @@ class SerieDocumentoModel:
             return False
         finally:
             cursor.close()
-            close_db_connection(conn)
\ No newline at end of file
+            close_db_connection(conn)
+
+    def reservar_correlativos(self, id_serie, cantidad=1):
+        """
+        Reserva de forma atómica los siguientes `cantidad` correlativos de una
+        serie y devuelve el primero (o None si la serie no existe).
+
+        Un solo UPDATE con LAST_INSERT_ID(expr) incrementa el contador y deja
+        el nuevo valor en la respuesta del servidor, sin SELECT previo. Va en
+        su propia transacción corta para que el bloqueo de la fila de la serie
+        no dure lo que dura la venta; un número reservado y no usado queda
+        como hueco en la numeración.
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return None
+        cursor = conn.cursor()
+        try:
+            query = """
+                UPDATE serie_documento
+                SET correlativo_actual = LAST_INSERT_ID(correlativo_actual + %s)
+                WHERE id_serie = %s
+            """
+            cursor.execute(query, (cantidad, id_serie))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+            ultimo = cursor.lastrowid
+            if not ultimo:
+                cursor.execute("SELECT LAST_INSERT_ID()")
+                ultimo = cursor.fetchone()[0]
+            conn.commit()
+            return ultimo - cantidad + 1
+        except mysql.connector.Error as err:
+            print(f"Error al reservar correlativos: {err}")
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
+            close_db_connection(conn)
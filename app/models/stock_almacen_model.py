@@ -1,5 +1,6 @@
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.dashboard_metrics import invalidar_metricas_dashboard
 
 
 class StockAlmacenModel:
@@ -91,6 +92,7 @@ class StockAlmacenModel:
                 cursor.execute(query, (id_articulo, id_almacen, cantidad))
 
             conn.commit()
+            invalidar_metricas_dashboard()
             return True
         except mysql.connector.Error as err:
             print(f"Error al actualizar stock: {err}")
@@ -132,6 +134,33 @@ class StockAlmacenModel:
             cursor.close()
             close_db_connection(conn)
 
+    def contar_stock_bajo(self, umbral_critico=10):
+        """
+        Cuenta los registros con stock bajo (stock_actual <= stock_minimo) y,
+        entre ellos, los críticos (faltante mayor a `umbral_critico`).
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return {'bajo': 0, 'critico': 0}
+        cursor = conn.cursor(dictionary=True)
+        try:
+            query = """
+                    SELECT COUNT(*) as bajo, \
+                           COALESCE(SUM(a.stock_minimo - sa.stock_actual > %s), 0) as critico
+                    FROM stock_almacen sa
+                             INNER JOIN articulo a ON sa.id_articulo = a.id_articulo
+                    WHERE sa.stock_actual <= a.stock_minimo \
+                    """
+            cursor.execute(query, (umbral_critico,))
+            fila = cursor.fetchone()
+            return {'bajo': int(fila['bajo']), 'critico': int(fila['critico'])}
+        except mysql.connector.Error as err:
+            print(f"Error al contar stock bajo: {err}")
+            return {'bajo': 0, 'critico': 0}
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
     def actualizar_stock_inventario_inicial(self, id_articulo, id_almacen, cantidad):
         """Actualiza el stock desde inventario inicial - VERSIÓN SIMPLIFICADA"""
         conn = get_db_connection()
@@ -159,6 +188,7 @@ class StockAlmacenModel:
                 print(f"Nuevo stock CREADO: {cantidad}")
 
             conn.commit()
+            invalidar_metricas_dashboard()
             return True
 
         except Exception as e:
@@ -211,3 +241,44 @@ class StockAlmacenModel:
             cursor.close()
             close_db_connection(conn)
 
+    def get_stock_by_articulos(self, ids_articulo, id_almacen=None):
+        """
+        Obtiene en una sola consulta el stock total de varios artículos.
+        Devuelve {id_articulo: stock_total}; los artículos sin registro quedan en 0.
+        Con `id_almacen` se limita el total a ese almacén.
+        """
+        ids_articulo = list(dict.fromkeys(ids_articulo))
+        stock = {id_articulo: 0 for id_articulo in ids_articulo}
+        if not ids_articulo:
+            return stock
+
+        conn = get_db_connection()
+        if conn is None:
+            return stock
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            placeholders = ', '.join(['%s'] * len(ids_articulo))
+            query = f"""
+                    SELECT id_articulo, COALESCE(SUM(stock_actual), 0) as stock_total
+                    FROM stock_almacen
+                    WHERE id_articulo IN ({placeholders}) \
+                    """
+            params = list(ids_articulo)
+
+            if id_almacen:
+                query += " AND id_almacen = %s"
+                params.append(id_almacen)
+
+            query += " GROUP BY id_articulo"
+
+            cursor.execute(query, params)
+            for fila in cursor.fetchall():
+                stock[fila['id_articulo']] = fila['stock_total']
+            return stock
+        except mysql.connector.Error as err:
+            print(f"Error al obtener stock de los artículos {ids_articulo}: {err}")
+            return stock
+        finally:
+            cursor.close()
+            close_db_connection(conn)
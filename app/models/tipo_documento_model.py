@@ -1,12 +1,14 @@
 # app/models/tipo_documento_model.py
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.catalogos import catalogo_cacheado, invalidar_catalogo
 
 
 class TipoDocumentoModel:
     def __init__(self):
         pass
 
+    @catalogo_cacheado('tipo_documento')
     def get_all_tipos_documento(self):
         """Obtiene todos los tipos de documento de la tabla 'tipo_documento'."""
         conn = get_db_connection()
@@ -25,6 +27,7 @@ class TipoDocumentoModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('tipo_documento')
     def get_tipo_documento_by_id(self, id_tipo_documento):
         """Obtiene un tipo de documento por su ID."""
         conn = get_db_connection()
@@ -60,6 +63,7 @@ class TipoDocumentoModel:
             query = "INSERT INTO tipo_documento (nombre, codigo_sunat) VALUES (%s, %s)"
             cursor.execute(query, (nombre, codigo_sunat))
             conn.commit()
+            invalidar_catalogo('tipo_documento')
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear tipo de documento: {err}")
@@ -86,6 +90,7 @@ class TipoDocumentoModel:
             query = "UPDATE tipo_documento SET nombre = %s, codigo_sunat = %s WHERE id_tipo_documento = %s"
             cursor.execute(query, (nombre, codigo_sunat, id_tipo_documento))
             conn.commit()
+            invalidar_catalogo('tipo_documento')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al actualizar tipo de documento: {err}")
@@ -107,6 +112,7 @@ class TipoDocumentoModel:
             query = "DELETE FROM tipo_documento WHERE id_tipo_documento = %s"
             cursor.execute(query, (id_tipo_documento,))
             conn.commit()
+            invalidar_catalogo('tipo_documento')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al eliminar tipo de documento: {err}")
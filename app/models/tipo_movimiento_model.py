@@ -1,10 +1,12 @@
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.catalogos import catalogo_cacheado
 
 class TipoMovimientoModel:
     def __init__(self):
         pass
 
+    @catalogo_cacheado('tipo_movimiento')
     def get_all_tipos_movimiento(self):
         """Obtiene todos los tipos de movimiento."""
         conn = get_db_connection()
@@ -23,6 +25,7 @@ class TipoMovimientoModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('tipo_movimiento')
     def get_tipo_movimiento_by_id(self, id_tipo_movimiento):
         """Obtiene un tipo de movimiento por su ID."""
         conn = get_db_connection()
@@ -41,6 +44,7 @@ class TipoMovimientoModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('tipo_movimiento')
     def get_tipos_entrada(self):
         """Obtiene solo los tipos de movimiento de entrada."""
         conn = get_db_connection()
@@ -59,6 +63,7 @@ class TipoMovimientoModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('tipo_movimiento')
     def get_tipos_salida(self):
         """Obtiene solo los tipos de movimiento de salida."""
         conn = get_db_connection()
@@ -1,12 +1,14 @@
 # app/models/unidad_medida_model.py
 import mysql.connector
 from app.database import get_db_connection, close_db_connection
+from app.services.catalogos import catalogo_cacheado, invalidar_catalogo
 
 
 class UnidadMedidaModel:
     def __init__(self):
         pass
 
+    @catalogo_cacheado('unidad_medida')
     def get_all_unidades_medida(self):
         """Obtiene todas las unidades de medida de la tabla 'unidad_medida'."""
         conn = get_db_connection()
@@ -25,6 +27,7 @@ class UnidadMedidaModel:
             cursor.close()
             close_db_connection(conn)
 
+    @catalogo_cacheado('unidad_medida')
     def get_unidad_medida_by_id(self, id_unidad_medida):
         """Obtiene una unidad de medida por su ID."""
         conn = get_db_connection()
@@ -60,6 +63,7 @@ class UnidadMedidaModel:
             query = "INSERT INTO unidad_medida (nombre, abreviatura) VALUES (%s, %s)"
             cursor.execute(query, (nombre, abreviatura))
             conn.commit()
+            invalidar_catalogo('unidad_medida')
             return cursor.lastrowid
         except mysql.connector.Error as err:
             print(f"Error al crear unidad de medida: {err}")
@@ -86,6 +90,7 @@ class UnidadMedidaModel:
             query = "UPDATE unidad_medida SET nombre = %s, abreviatura = %s WHERE id_unidad_medida = %s"
             cursor.execute(query, (nombre, abreviatura, id_unidad_medida))
             conn.commit()
+            invalidar_catalogo('unidad_medida')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al actualizar unidad de medida: {err}")
@@ -107,6 +112,7 @@ class UnidadMedidaModel:
             query = "DELETE FROM unidad_medida WHERE id_unidad_medida = %s"
             cursor.execute(query, (id_unidad_medida,))
             conn.commit()
+            invalidar_catalogo('unidad_medida')
             return cursor.rowcount > 0
         except mysql.connector.Error as err:
             print(f"Error al eliminar unidad de medida: {err}")
@@ -1,19 +1,57 @@
 import mysql.connector
-from app.database import get_db_connection, close_db_connection
+from app.database import get_db_connection, close_db_connection, UnitOfWork
+from app.models.kardex_model import KardexModel
+from app.services.dashboard_metrics import invalidar_metricas_dashboard
 from datetime import datetime
 
+kardex_model = KardexModel()
+
 
 class VentaModel:
+    # Tipo de movimiento con el que las ventas se registran en el kardex
+    TIPO_MOVIMIENTO_VENTA = 6
+    # Reingreso al kardex de una venta anulada (AJUSTE POSITIVO)
+    TIPO_MOVIMIENTO_ANULACION = 3
+    PORCENTAJE_IGV = 18
+
     def __init__(self):
         pass
 
-    def get_all_ventas(self):
-        """Obtiene todas las ventas."""
+    def contar_ventas(self):
+        """Cuenta las ventas registradas."""
+        conn = get_db_connection()
+        if conn is None:
+            return 0
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM venta_cabecera")
+            return cursor.fetchone()[0]
+        except mysql.connector.Error as err:
+            print(f"Error al contar ventas: {err}")
+            return 0
+        finally:
+            cursor.close()
+            close_db_connection(conn)
+
+    def buscar_ventas_keyset(self, clave, direccion, limit):
+        """
+        Obtiene una página de ventas por cursor (fecha_emision, id_venta).
+
+        direccion 'next': ventas anteriores a `clave`, de la más reciente a la más antigua.
+        direccion 'prev': ventas posteriores a `clave`, de la más antigua a la más reciente.
+        """
         conn = get_db_connection()
         if conn is None:
             return []
         cursor = conn.cursor(dictionary=True)
         try:
+            where, params = "", []
+            operador, orden = ('<', 'DESC') if direccion == 'next' else ('>', 'ASC')
+            if clave:
+                where = f" WHERE (vc.fecha_emision {operador} %s OR " \
+                        f"(vc.fecha_emision = %s AND vc.id_venta {operador} %s))"
+                params = [clave[0], clave[0], clave[1]]
+
             query = """
                     SELECT vc.*, \
                            td.nombre               as tipo_documento_nombre, \
@@ -24,12 +62,11 @@ class VentaModel:
                              INNER JOIN tipo_documento td ON vc.id_tipo_documento = td.id_tipo_documento
                              INNER JOIN serie_documento s ON vc.id_serie = s.id_serie
                              LEFT JOIN cliente c ON vc.id_cliente = c.id_cliente
-                             INNER JOIN usuario u ON vc.id_usuario_venta = u.id_usuario
-                    ORDER BY vc.fecha_emision DESC \
-                    """
-            cursor.execute(query)
-            ventas = cursor.fetchall()
-            return ventas
+                             INNER JOIN usuario u ON vc.id_usuario_venta = u.id_usuario \
+                    """ + where
+            query += f" ORDER BY vc.fecha_emision {orden}, vc.id_venta {orden} LIMIT %s"
+            cursor.execute(query, params + [limit])
+            return cursor.fetchall()
         except mysql.connector.Error as err:
             print(f"Error al obtener ventas: {err}")
             return []
@@ -95,129 +132,345 @@ class VentaModel:
             cursor.close()
             close_db_connection(conn)
 
-    def create_venta(self, fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente, id_usuario,
-                     total_gravado, total_igv, total_venta):
-        """Crea una nueva venta."""
+    def agregar_detalle_venta(self, id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv, subtotal):
+        """Agrega un artículo al detalle de la venta."""
         conn = get_db_connection()
         if conn is None:
             return False
         cursor = conn.cursor()
         try:
             query = """
-                    INSERT INTO venta_cabecera
-                    (fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente, id_usuario_venta, \
-                     total_gravado, total_igv, total_venta)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) \
+                    INSERT INTO venta_detalle
+                    (id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv, subtotal)
+                    VALUES (%s, %s, %s, %s, %s, %s) \
                     """
-            cursor.execute(query, (fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente, id_usuario,
-                                   total_gravado, total_igv, total_venta))
+            cursor.execute(query, (id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv, subtotal))
             conn.commit()
             return cursor.lastrowid
         except mysql.connector.Error as err:
-            print(f"Error al crear venta: {err}")
+            print(f"Error al agregar detalle de venta: {err}")
             conn.rollback()
             return False
         finally:
             cursor.close()
             close_db_connection(conn)
 
-    def agregar_detalle_venta(self, id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv, subtotal):
-        """Agrega un artículo al detalle de la venta."""
+    def _parsear_fecha(self, fecha):
+        """
+        Convierte la fecha de emisión (datetime o texto ISO) a datetime con
+        segundos enteros, como la guarda DATETIME; None si no es válida.
+        """
+        if not isinstance(fecha, datetime):
+            try:
+                fecha = datetime.fromisoformat(str(fecha))
+            except ValueError:
+                return None
+        return fecha.replace(microsecond=0)
+
+    def _cantidades_por_articulo(self, lineas):
+        """Suma las cantidades de las líneas por artículo (un artículo puede repetirse)."""
+        cantidades = {}
+        for linea in lineas:
+            cantidades[linea['id_articulo']] = cantidades.get(linea['id_articulo'], 0) + linea['cantidad']
+        return cantidades
+
+    def _validar_stock(self, cursor, id_almacen, cantidades):
+        """
+        Lee y bloquea en una consulta el stock de todos los artículos del
+        carrito. Devuelve las líneas sin stock suficiente (lista vacía si
+        todo alcanza), con el mismo formato que MovimientoModel.
+
+        FOR UPDATE sin OF (compatible con MySQL 5.7) bloquea también las filas
+        de articulo leídas; no se modifican, solo esperan a la venta en curso.
+        """
+        marcadores = ', '.join(['%s'] * len(cantidades))
+        cursor.execute(f"""
+                       SELECT a.id_articulo, a.codigo, a.nombre, COALESCE(sa.stock_actual, 0) as stock_actual
+                       FROM articulo a
+                                LEFT JOIN stock_almacen sa
+                                          ON sa.id_articulo = a.id_articulo AND sa.id_almacen = %s
+                       WHERE a.id_articulo IN ({marcadores})
+                       FOR UPDATE \
+                       """, [id_almacen] + list(cantidades))
+        disponibles = {fila[0]: fila for fila in cursor.fetchall()}
+
+        faltantes = []
+        for id_articulo, cantidad in cantidades.items():
+            _, codigo, nombre, stock_actual = disponibles.get(id_articulo, (id_articulo, None, None, 0))
+            if stock_actual < cantidad:
+                faltantes.append({
+                    'id_articulo': id_articulo,
+                    'codigo': codigo,
+                    'articulo_nombre': nombre,
+                    'solicitado': cantidad,
+                    'disponible': stock_actual,
+                })
+        return faltantes
+
+    def _descontar_stock(self, cursor, id_almacen, cantidades):
+        """Resta el stock de todos los artículos con un solo UPDATE; True si se actualizaron todos."""
+        filas = " UNION ALL ".join(["SELECT %s AS id_articulo, %s AS cantidad"] * len(cantidades))
+        params = [valor for par in cantidades.items() for valor in par]
+        cursor.execute(f"""
+                       UPDATE stock_almacen sa
+                           INNER JOIN ({filas}) d ON sa.id_articulo = d.id_articulo
+                       SET sa.stock_actual = sa.stock_actual - d.cantidad
+                       WHERE sa.id_almacen = %s \
+                         AND sa.stock_actual >= d.cantidad \
+                       """, params + [id_almacen])
+        return cursor.rowcount == len(cantidades)
+
+    def _reponer_stock(self, cursor, id_almacen, cantidades):
+        """Devuelve al stock las cantidades de una venta anulada con un solo UPDATE."""
+        filas = " UNION ALL ".join(["SELECT %s AS id_articulo, %s AS cantidad"] * len(cantidades))
+        params = [valor for par in cantidades.items() for valor in par]
+        cursor.execute(f"""
+                       UPDATE stock_almacen sa
+                           INNER JOIN ({filas}) d ON sa.id_articulo = d.id_articulo
+                       SET sa.stock_actual = sa.stock_actual + d.cantidad
+                       WHERE sa.id_almacen = %s \
+                       """, params + [id_almacen])
+        return cursor.rowcount == len(cantidades)
+
+    def _verificar_stock(self, cursor, id_almacen, cantidades, faltantes):
+        """True si hay stock para todo el carrito; si no, informa y completa `faltantes`."""
+        reporte = self._validar_stock(cursor, id_almacen, cantidades)
+        for linea in reporte:
+            print(f"DEBUG: ERROR - Stock insuficiente para {linea['codigo']}. "
+                  f"Disponible: {linea['disponible']}, Requerido: {linea['solicitado']}")
+        if reporte and faltantes is not None:
+            faltantes.extend(reporte)
+        return not reporte
+
+    def _salida_registrada(self, cursor, id_venta, fecha_emision, cantidades, id_almacen=None):
+        """
+        True si la venta ya tiene sus filas de kardex (stock ya descontado).
+        Se busca por artículo y fecha para usar idx_kardex_articulo_almacen_fecha.
+        """
+        marcadores = ', '.join(['%s'] * len(cantidades))
+        query = f"""
+                SELECT 1
+                FROM kardex
+                WHERE id_articulo IN ({marcadores}) \
+                  AND fecha = %s \
+                  AND numero_documento = %s \
+                """
+        params = list(cantidades) + [fecha_emision.replace(microsecond=0), f"VTA-{id_venta}"]
+        if id_almacen:
+            query += " AND id_almacen = %s"
+            params.append(id_almacen)
+        cursor.execute(query + " LIMIT 1", params)
+        return cursor.fetchone() is not None
+
+    def _salidas_kardex(self, cursor, id_venta, fecha_emision, cantidades):
+        """
+        Filas de kardex de la venta agrupadas por artículo: almacén, cantidad
+        y costo de salida promedio (para reingresarlas al mismo costo).
+        """
+        marcadores = ', '.join(['%s'] * len(cantidades))
+        cursor.execute(f"""
+                       SELECT id_articulo, \
+                              id_almacen, \
+                              SUM(cantidad_salida)                                         as cantidad, \
+                              SUM(cantidad_salida * costo_salida) / SUM(cantidad_salida) as costo
+                       FROM kardex
+                       WHERE id_articulo IN ({marcadores}) \
+                         AND fecha = %s \
+                         AND numero_documento = %s
+                       GROUP BY id_articulo, id_almacen \
+                       """, list(cantidades) + [fecha_emision.replace(microsecond=0), f"VTA-{id_venta}"])
+        return cursor.fetchall()
+
+    def venta_procesada(self, id_venta):
+        """Indica si el stock de la venta ya fue descontado (registrar_venta o procesar)."""
+        venta = self.get_venta_by_id(id_venta)
+        detalle = self.get_detalle_venta(id_venta)
+        if not venta or not detalle:
+            return False
+
         conn = get_db_connection()
         if conn is None:
             return False
         cursor = conn.cursor()
         try:
-            query = """
-                    INSERT INTO venta_detalle
-                    (id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv, subtotal)
-                    VALUES (%s, %s, %s, %s, %s, %s) \
-                    """
-            cursor.execute(query, (id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv, subtotal))
-            conn.commit()
-            return cursor.lastrowid
+            return self._salida_registrada(cursor, id_venta, venta['fecha_emision'],
+                                           self._cantidades_por_articulo(detalle))
         except mysql.connector.Error as err:
-            print(f"Error al agregar detalle de venta: {err}")
-            conn.rollback()
+            print(f"Error al verificar el estado de la venta: {err}")
             return False
         finally:
             cursor.close()
             close_db_connection(conn)
 
-    def actualizar_stock_venta(self, id_venta, id_almacen):
-        """Actualiza el stock basado en la venta."""
-        conn = get_db_connection()
-        if conn is None:
+    def _registrar_salida_venta(self, cursor, id_venta, fecha_emision, id_almacen, lineas, cantidades, uow):
+        """Descuenta el stock ya validado y escribe el kardex de la venta dentro de la transacción."""
+        if not self._descontar_stock(cursor, id_almacen, cantidades):
             return False
-        cursor = conn.cursor()
+
+        return kardex_model.registrar_lineas(
+            fecha_emision, id_almacen, self.TIPO_MOVIMIENTO_VENTA, 'VENTA', f"VTA-{id_venta}",
+            [{'id_articulo': linea['id_articulo'], 'cantidad_entrada': 0, 'costo_entrada': 0,
+              'cantidad_salida': linea['cantidad']} for linea in lineas],
+            uow)
+
+    def registrar_venta(self, fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente,
+                        id_usuario, id_almacen, lineas, uow=None, faltantes=None):
+        """
+        Registra una venta completa (carrito) en una sola transacción.
+
+        lineas: dicts con id_articulo, cantidad y precio_unitario. Se valida
+        el stock de todas las líneas en una consulta, se insertan cabecera y
+        detalle en lote, se descuenta el stock con un UPDATE y se escribe el
+        kardex. Si falta stock no se registra nada y, si se pasa `faltantes`,
+        se completa con las líneas afectadas. Devuelve el id_venta o False.
+        """
+        if not lineas:
+            return False
+
+        fecha = self._parsear_fecha(fecha_emision)
+        if fecha is None:
+            print(f"Error al registrar venta: fecha de emisión inválida '{fecha_emision}'")
+            return False
+        fecha_emision = fecha
+
+        if uow is None:
+            try:
+                with UnitOfWork() as uow:
+                    id_venta = self.registrar_venta(fecha_emision, id_tipo_documento, id_serie, numero_documento,
+                                                    id_cliente, id_usuario, id_almacen, lineas, uow=uow,
+                                                    faltantes=faltantes)
+                    if not id_venta:
+                        uow.rollback()
+                        return False
+                invalidar_metricas_dashboard()
+                return id_venta
+            except mysql.connector.Error as err:
+                print(f"Error al registrar venta: {err}")
+                return False
+
+        cursor = uow.cursor()
         try:
-            # Obtener el detalle de la venta
-            detalle = self.get_detalle_venta(id_venta)
-            if not detalle:
+            # Validar (y bloquear) el stock de todo el carrito antes de escribir nada
+            cantidades = self._cantidades_por_articulo(lineas)
+            if not self._verificar_stock(cursor, id_almacen, cantidades, faltantes):
                 return False
 
-            # Para cada artículo, reducir el stock en el almacén especificado
-            for item in detalle:
-                # Verificar si existe registro en stock_almacen
-                check_query = """
-                              SELECT COUNT(*) \
-                              FROM stock_almacen
-                              WHERE id_articulo = %s \
-                                AND id_almacen = %s \
-                              """
-                cursor.execute(check_query, (item['id_articulo'], id_almacen))
-
-                if cursor.fetchone()[0] > 0:
-                    # Actualizar stock existente
-                    update_query = """
-                                   UPDATE stock_almacen
-                                   SET stock_actual = stock_actual - %s
-                                   WHERE id_articulo = %s \
-                                     AND id_almacen = %s \
-                                   """
-                    cursor.execute(update_query, (item['cantidad'], item['id_articulo'], id_almacen))
-                else:
-                    # No se puede vender un artículo que no tiene stock
-                    return False
+            detalle = []
+            for linea in lineas:
+                subtotal = linea['cantidad'] * linea['precio_unitario'] * (1 + self.PORCENTAJE_IGV / 100)
+                detalle.append((linea['id_articulo'], linea['cantidad'], linea['precio_unitario'],
+                                self.PORCENTAJE_IGV, subtotal))
+            total_venta = sum(fila[4] for fila in detalle)
+            total_gravado = sum(fila[1] * fila[2] for fila in detalle)
 
-            conn.commit()
-            return True
+            cursor.execute("""
+                           INSERT INTO venta_cabecera
+                           (fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente, id_usuario_venta, \
+                            total_gravado, total_igv, total_venta)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) \
+                           """, (fecha_emision, id_tipo_documento, id_serie, numero_documento, id_cliente,
+                                 id_usuario, total_gravado, total_venta - total_gravado, total_venta))
+            id_venta = cursor.lastrowid
+
+            cursor.executemany("""
+                               INSERT INTO venta_detalle
+                               (id_venta, id_articulo, cantidad, precio_unitario, porcentaje_igv, subtotal)
+                               VALUES (%s, %s, %s, %s, %s, %s) \
+                               """, [(id_venta,) + fila for fila in detalle])
+
+            if not self._registrar_salida_venta(cursor, id_venta, fecha_emision, id_almacen, lineas, cantidades,
+                                                uow):
+                return False
+            return id_venta
         except mysql.connector.Error as err:
-            print(f"Error al actualizar stock por venta: {err}")
-            conn.rollback()
+            print(f"Error al registrar venta: {err}")
             return False
         finally:
             cursor.close()
-            close_db_connection(conn)
 
-    def anular_venta(self, id_venta, id_almacen):
-        """Anula una venta y revierte el stock."""
-        conn = get_db_connection()
-        if conn is None:
+    def actualizar_stock_venta(self, id_venta, id_almacen, faltantes=None):
+        """
+        Descuenta el stock de una venta ya registrada y la escribe en el
+        kardex, en una sola transacción (ver registrar_venta).
+        """
+        venta = self.get_venta_by_id(id_venta)
+        # Las líneas sin cantidad no mueven stock (como en MovimientoModel)
+        detalle = [item for item in self.get_detalle_venta(id_venta) if item['cantidad'] > 0]
+        if not venta or not detalle:
             return False
-        cursor = conn.cursor()
+
+        try:
+            with UnitOfWork() as uow:
+                cursor = uow.cursor()
+                try:
+                    cantidades = self._cantidades_por_articulo(detalle)
+                    if self._salida_registrada(cursor, id_venta, venta['fecha_emision'], cantidades, id_almacen):
+                        print(f"DEBUG: La venta {id_venta} ya descontó su stock")
+                        uow.rollback()
+                        return False
+                    if not (self._verificar_stock(cursor, id_almacen, cantidades, faltantes) and
+                            self._registrar_salida_venta(cursor, id_venta, venta['fecha_emision'], id_almacen,
+                                                         detalle, cantidades, uow)):
+                        uow.rollback()
+                        return False
+                finally:
+                    cursor.close()
+            invalidar_metricas_dashboard()
+            return True
+        except mysql.connector.Error as err:
+            print(f"Error al actualizar stock por venta: {err}")
+            return False
+
+    def anular_venta(self, id_venta):
+        """
+        Anula una venta en una sola transacción. Si ya había descontado su
+        stock (filas VTA-<id> en el kardex), lo repone en el mismo almacén
+        con un UPDATE y registra el reingreso en el kardex (ANU-<id>) al
+        costo con que salió, para que stock, saldos y resumen diario sigan
+        cuadrando. Una venta ya anulada no se vuelve a anular.
+        """
+        venta = self.get_venta_by_id(id_venta)
+        if not venta:
+            return False
+        detalle = [item for item in self.get_detalle_venta(id_venta) if item['cantidad'] > 0]
+
         try:
-            # Revertir el stock
-            detalle = self.get_detalle_venta(id_venta)
-            for item in detalle:
-                update_query = """
-                               UPDATE stock_almacen
-                               SET stock_actual = stock_actual + %s
-                               WHERE id_articulo = %s \
-                                 AND id_almacen = %s \
-                               """
-                cursor.execute(update_query, (item['cantidad'], item['id_articulo'], id_almacen))
-
-            # Marcar la venta como anulada
-            anular_query = "UPDATE venta_cabecera SET estado = 'ANULADA' WHERE id_venta = %s"
-            cursor.execute(anular_query, (id_venta,))
+            with UnitOfWork() as uow:
+                cursor = uow.cursor(dictionary=True)
+                try:
+                    # Bloquear la cabecera: dos anulaciones simultáneas no reponen dos veces
+                    cursor.execute("SELECT estado FROM venta_cabecera WHERE id_venta = %s FOR UPDATE", (id_venta,))
+                    cabecera = cursor.fetchone()
+                    if not cabecera or cabecera['estado'] == 'ANULADA':
+                        print(f"DEBUG: La venta {id_venta} no existe o ya está anulada")
+                        uow.rollback()
+                        return False
 
-            conn.commit()
+                    salidas = []
+                    if detalle:
+                        salidas = self._salidas_kardex(cursor, id_venta, venta['fecha_emision'],
+                                                       self._cantidades_por_articulo(detalle))
+                    for id_almacen in {fila['id_almacen'] for fila in salidas}:
+                        filas = [fila for fila in salidas if fila['id_almacen'] == id_almacen]
+                        if not self._reponer_stock(cursor, id_almacen,
+                                                   {fila['id_articulo']: fila['cantidad'] for fila in filas}):
+                            print(f"DEBUG: No se pudo reponer el stock de la venta {id_venta}")
+                            uow.rollback()
+                            return False
+                        if not kardex_model.registrar_lineas(
+                                datetime.now(), id_almacen, self.TIPO_MOVIMIENTO_ANULACION, 'ANULACION',
+                                f"ANU-{id_venta}",
+                                [{'id_articulo': fila['id_articulo'], 'cantidad_entrada': fila['cantidad'],
+                                  'costo_entrada': fila['costo'] or 0, 'cantidad_salida': 0} for fila in filas],
+                                uow):
+                            uow.rollback()
+                            return False
+
+                    cursor.execute("UPDATE venta_cabecera SET estado = 'ANULADA' WHERE id_venta = %s", (id_venta,))
+                finally:
+                    cursor.close()
+            invalidar_metricas_dashboard()
             return True
         except mysql.connector.Error as err:
             print(f"Error al anular venta: {err}")
-            conn.rollback()
             return False
-        finally:
-            cursor.close()
-            close_db_connection(conn)
\ No newline at end of file
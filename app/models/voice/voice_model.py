@@ -1,6 +1,8 @@
 # app/models/voice/voice_model.py
 import google.generativeai as genai
 from app.config import Config
+from app.utils.response_cache import ResponseCache
+from app.utils.texto import normalizar_texto
 import json
 import re
 
@@ -10,6 +12,13 @@ class VoiceModel:
         self.config = Config()
         self._configure_gemini()
 
+        # Caché de respuestas: los operadores repiten las mismas frases todo el día
+        self.cache = ResponseCache(
+            max_items=getattr(self.config, 'VOICE_CACHE_SIZE', 500),
+            ttl=getattr(self.config, 'VOICE_CACHE_TTL', 12 * 3600),
+            path=getattr(self.config, 'VOICE_CACHE_PATH', None)
+        )
+
     def _configure_gemini(self):
         """Configura la API de Gemini con modelo correcto"""
         try:
@@ -30,6 +39,12 @@ class VoiceModel:
         """
         print(f"🔊 Procesando comando: '{text_command}'")
 
+        clave = normalizar_texto(text_command)
+        cached_response = self.cache.get(clave)
+        if cached_response is not None:
+            print(f"⚡ Respuesta obtenida de caché para: '{clave}'")
+            return cached_response
+
         if not self.model:
             return self._create_error_response("Servicio de voz no disponible")
 
@@ -54,6 +69,11 @@ class VoiceModel:
 
             # Extraer y parsear la respuesta
             parsed_response = self._parse_gemini_response(response.text)
+
+            # No guardar respuestas de error por fallos (se reintentan la próxima vez)
+            if not (parsed_response.get('intencion') == 'ERROR' and not parsed_response.get('confianza')):
+                self.cache.set(clave, parsed_response)
+
             return parsed_response
 
         except Exception as e:
@@ -0,0 +1,140 @@
+# app/services/catalogos.py
+import copy
+import functools
+import os
+import tempfile
+import threading
+import time
+
+from app.config import Config
+
+
+class CatalogCache:
+    """
+    Caché en memoria, por proceso, de las tablas de referencia pequeñas
+    (categorías, marcas, unidades, almacenes, tipos...) con versión por tabla.
+
+    - Local: invalidar(tabla) descarta al instante lo guardado de esa tabla.
+    - Entre workers: invalidar() también toca un archivo de señal por tabla
+      en `directorio`; cada worker compara su fecha de modificación como
+      máximo cada `intervalo` segundos (un stat, sin consultar la base).
+    - ttl: segundos tras los cuales una entrada se recarga de todos modos
+      (cubre cambios hechos desde otro servidor o directamente en la base).
+    """
+
+    def __init__(self, directorio=None, intervalo=2, ttl=600):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.ttl = ttl
+
+        self._items = {}  # (tabla, clave) -> (valor, guardado_en)
+        self._senales = {}  # tabla -> (mtime_ns del archivo de señal, revisado_en)
+        self._generaciones = {}  # tabla -> número de invalidaciones vistas
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _archivo_senal(self, tabla):
+        return os.path.join(self.directorio, f"{tabla}.version") if self.directorio else None
+
+    def _leer_senal(self, tabla):
+        archivo = self._archivo_senal(tabla)
+        if archivo is None:
+            return None
+        try:
+            return os.stat(archivo).st_mtime_ns
+        except OSError:
+            return None
+
+    def _revisar_senal(self, tabla, ahora):
+        """Descarta la tabla si otro worker la invalidó desde la última revisión."""
+        senal = self._senales.get(tabla)
+        if senal is not None and ahora - senal[1] < self.intervalo:
+            return
+        version = self._leer_senal(tabla)
+        if senal is not None and version != senal[0]:
+            self._descartar(tabla)
+        self._senales[tabla] = (version, ahora)
+
+    def _descartar(self, tabla):
+        self._generaciones[tabla] = self._generaciones.get(tabla, 0) + 1
+        for clave in [clave for clave in self._items if clave[0] == tabla]:
+            del self._items[clave]
+
+    def get(self, tabla, clave, cargar):
+        """Devuelve una copia del valor guardado o lo obtiene con `cargar()`."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._revisar_senal(tabla, ahora)
+            item = self._items.get((tabla, clave))
+            if item is not None and ahora - item[1] < self.ttl:
+                self._hits += 1
+                return copy.deepcopy(item[0])
+            self._misses += 1
+            generacion = self._generaciones.get(tabla, 0)
+
+        valor = cargar()
+        # Los modelos devuelven []/None ante un error de base de datos: no se guardan.
+        # Tampoco si la tabla se invalidó mientras se cargaba (el valor podría ser viejo)
+        if valor:
+            with self._lock:
+                if self._generaciones.get(tabla, 0) == generacion:
+                    self._items[(tabla, clave)] = (copy.deepcopy(valor), ahora)
+        return valor
+
+    def invalidar(self, tabla):
+        """Descarta la tabla en este proceso y avisa a los demás workers."""
+        with self._lock:
+            self._descartar(tabla)
+
+        archivo = self._archivo_senal(tabla)
+        if archivo is None:
+            return
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(archivo, 'a'):
+                pass
+            os.utime(archivo, ns=(time.time_ns(), time.time_ns()))
+        except OSError as e:
+            print(f"⚠️ No se pudo señalizar la invalidación del catálogo '{tabla}': {e}")
+            return
+
+        with self._lock:
+            self._senales[tabla] = (self._leer_senal(tabla), time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'items': len(self._items),
+                'hits': self._hits,
+                'misses': self._misses,
+                'tasa_aciertos': self._hits / total if total else 0.0,
+            }
+
+
+catalogos = CatalogCache(
+    directorio=getattr(Config, 'CATALOGO_CACHE_DIR',
+                       os.path.join(tempfile.gettempdir(), 'sistema_voz_catalogos')),
+    intervalo=getattr(Config, 'CATALOGO_CACHE_INTERVALO', 2),
+    ttl=getattr(Config, 'CATALOGO_CACHE_TTL', 600)
+)
+
+
+def catalogo_cacheado(tabla):
+    """Decorador para los métodos de lectura de un modelo de catálogo."""
+
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            clave = (metodo.__name__, args, tuple(sorted(kwargs.items())))
+            return catalogos.get(tabla, clave, lambda: metodo(self, *args, **kwargs))
+
+        return envoltura
+
+    return decorador
+
+
+def invalidar_catalogo(tabla):
+    """Descarta las lecturas cacheadas de una tabla de catálogo (en todos los workers)."""
+    catalogos.invalidar(tabla)
@@ -0,0 +1,42 @@
+# app/services/correlativos.py
+import threading
+
+
+class AsignadorCorrelativos:
+    """
+    Entrega números de documento por serie a partir de bloques reservados
+    con SerieDocumentoModel.reservar_correlativos.
+
+    - bloque: correlativos reservados por viaje a la base de datos. Con 1
+      cada número se reserva al momento y la numeración solo tiene huecos por
+      ventas fallidas. Con bloques mayores cada worker reparte su bloque en
+      memoria (sin tocar la fila de la serie); los números de workers
+      distintos se intercalan y, al reiniciar, lo no usado de un bloque queda
+      como hueco (como máximo `bloque - 1` números por worker y serie).
+      Si se edita el correlativo de una serie, cada worker termina antes el
+      bloque que ya tenía reservado.
+    """
+
+    def __init__(self, reservar, bloque=1):
+        """
+        Args:
+            reservar: Función (id_serie, cantidad) -> primer número reservado o None
+            bloque: Correlativos reservados por cada consulta
+        """
+        self.reservar = reservar
+        self.bloque = max(1, int(bloque))
+        self._disponibles = {}  # id_serie -> [siguiente, ultimo]
+        self._lock = threading.Lock()
+
+    def siguiente(self, id_serie):
+        """Devuelve el siguiente número de la serie o None si no se pudo reservar."""
+        with self._lock:
+            rango = self._disponibles.get(id_serie)
+            if rango is None or rango[0] > rango[1]:
+                primero = self.reservar(id_serie, self.bloque)
+                if primero is None:
+                    return None
+                rango = self._disponibles[id_serie] = [primero, primero + self.bloque - 1]
+            numero = rango[0]
+            rango[0] += 1
+            return numero
@@ -0,0 +1,56 @@
+# app/services/dashboard_metrics.py
+import copy
+import threading
+import time
+
+# Generación de los datos del dashboard (por proceso). Los modelos la avanzan
+# al registrar movimientos o cambiar stock; las métricas cacheadas de una
+# generación anterior se recalculan en la siguiente visita.
+_generacion = 0
+_generacion_lock = threading.Lock()
+
+
+def invalidar_metricas_dashboard():
+    """Marca las métricas del dashboard como desactualizadas."""
+    global _generacion
+    with _generacion_lock:
+        _generacion += 1
+
+
+def generacion_datos():
+    """Generación actual de los datos de movimientos y stock (para versionar otras cachés)."""
+    return _generacion
+
+
+class DashboardMetrics:
+    """
+    Métricas del dashboard calculadas con agregados SQL y cacheadas por `ttl` segundos.
+
+    Cada métrica es una función sin argumentos (conteos, LIMIT) que se
+    evalúa solo cuando la caché expiró o fue invalidada; el TTL corto cubre
+    los cambios hechos por otros workers.
+    """
+
+    def __init__(self, cargadores, ttl=60):
+        """
+        Args:
+            cargadores: Diccionario {nombre_metrica: función} con las consultas
+            ttl: Segundos de validez de las métricas
+        """
+        self.cargadores = cargadores
+        self.ttl = ttl
+        self._metricas = None
+        self._calculadas_en = 0.0
+        self._generacion = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Devuelve las métricas (copia), recalculándolas si expiraron o fueron invalidadas."""
+        with self._lock:
+            if (self._metricas is None or self._generacion != _generacion or
+                    time.monotonic() - self._calculadas_en > self.ttl):
+                generacion = _generacion
+                self._metricas = {nombre: cargar() for nombre, cargar in self.cargadores.items()}
+                self._calculadas_en = time.monotonic()
+                self._generacion = generacion
+            return copy.deepcopy(self._metricas)
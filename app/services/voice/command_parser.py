@@ -0,0 +1,180 @@
+# app/services/voice/command_parser.py
+import re
+from app.utils.texto import quitar_tildes
+
+
+class CommandParser:
+    """
+    Intérprete local y determinista para los comandos de voz más comunes.
+
+    Reconoce frases como "buscar lápiz amarillo", "entrada de dos cuadernos"
+    o "registrar salida de 5 cartulinas" sin llamar a Gemini. Devuelve la
+    misma estructura que VoiceModel.process_command, o None si el comando
+    es ambiguo y debe resolverlo el modelo de lenguaje.
+    """
+
+    UNIDADES = {
+        'un': 1, 'una': 1, 'uno': 1, 'dos': 2, 'tres': 3, 'cuatro': 4, 'cinco': 5,
+        'seis': 6, 'siete': 7, 'ocho': 8, 'nueve': 9, 'diez': 10,
+        'once': 11, 'doce': 12, 'trece': 13, 'catorce': 14, 'quince': 15,
+        'dieciseis': 16, 'diecisiete': 17, 'dieciocho': 18, 'diecinueve': 19,
+        'veinte': 20, 'veintiun': 21, 'veintiuno': 21, 'veintiuna': 21, 'veintidos': 22,
+        'veintitres': 23, 'veinticuatro': 24, 'veinticinco': 25, 'veintiseis': 26,
+        'veintisiete': 27, 'veintiocho': 28, 'veintinueve': 29,
+    }
+    DECENAS = {
+        'treinta': 30, 'cuarenta': 40, 'cincuenta': 50, 'sesenta': 60,
+        'setenta': 70, 'ochenta': 80, 'noventa': 90,
+    }
+    CENTENAS = {
+        'cien': 100, 'ciento': 100, 'doscientos': 200, 'doscientas': 200,
+        'trescientos': 300, 'trescientas': 300, 'cuatrocientos': 400, 'cuatrocientas': 400,
+        'quinientos': 500, 'quinientas': 500, 'seiscientos': 600, 'seiscientas': 600,
+        'setecientos': 700, 'setecientas': 700, 'ochocientos': 800, 'ochocientas': 800,
+        'novecientos': 900, 'novecientas': 900,
+    }
+
+    # Verbos / sustantivos que abren cada intención (ya sin tildes)
+    VERBOS_BUSCAR = {'buscar', 'busca', 'busco', 'buscame', 'encuentra', 'encontrar', 'muestra', 'mostrar',
+                     'muestrame', 'consultar', 'consulta'}
+    VERBOS_ENTRADA = {'ingresar', 'ingresa', 'ingreso', 'entrada', 'entradas'}
+    VERBOS_SALIDA = {'salida', 'salidas', 'vender', 'vende', 'venta', 'retirar', 'retira', 'retiro',
+                     'sacar', 'saca', 'despachar', 'despacha'}
+    VERBOS_PREVIOS = {'registrar', 'registra', 'registre', 'anotar', 'anota', 'hacer', 'haz', 'crear', 'crea',
+                      'quiero', 'por', 'favor'}
+    VERBOS_PROHIBIDOS = {'eliminar', 'elimina', 'borrar', 'borra', 'remover', 'remueve', 'suprimir', 'suprime'}
+
+    # Palabras que vuelven ambiguo el comando (varios productos, preguntas abiertas...)
+    PALABRAS_AMBIGUAS = {'y', 'e', 'o', 'u', 'pero', 'cuantos', 'cuantas', 'cuanto', 'cuanta', 'que', 'cual',
+                         'cuales', 'porque', 'si', 'no', 'tambien', 'mas', 'menos', 'todos', 'todas'}
+    CONECTORES = {'de', 'del', 'el', 'la', 'los', 'las'}
+    # Destino de un movimiento ("3 lapices para juan"): cierran el nombre del producto
+    DESTINOS = {'para', 'a', 'hacia'}
+    UNIDADES_MEDIDA = {'unidad', 'unidades', 'und', 'unds', 'pieza', 'piezas'}
+
+    # Los decimales ("2.5", "1,5") se conservan en un solo token
+    PATRON_TOKEN = re.compile(r'\d+(?:[.,]\d+)+|\w+')
+
+    def parse(self, text_command):
+        """Intenta interpretar el comando; devuelve el dict de resultado o None."""
+        originales = self.PATRON_TOKEN.findall((text_command or '').lower())
+        tokens = [quitar_tildes(t) for t in originales]
+        if not tokens:
+            return None
+
+        if any(t in self.VERBOS_PROHIBIDOS for t in tokens):
+            return self._resultado('ERROR', None, None, 1.0,
+                                   "No puedo eliminar productos por seguridad")
+
+        # Saltar fórmulas previas: "registrar", "por favor", "quiero hacer una"...
+        i = 0
+        while i < len(tokens) and (tokens[i] in self.VERBOS_PREVIOS or
+                                   (tokens[i] in ('una', 'un') and i + 1 < len(tokens) and
+                                    tokens[i + 1] in self.VERBOS_ENTRADA | self.VERBOS_SALIDA)):
+            i += 1
+        if i >= len(tokens):
+            return None
+
+        verbo = tokens[i]
+        if verbo in self.VERBOS_BUSCAR:
+            intencion = 'BUSCAR_PRODUCTO'
+        elif verbo in self.VERBOS_ENTRADA:
+            intencion = 'REGISTRAR_ENTRADA'
+        elif verbo in self.VERBOS_SALIDA:
+            intencion = 'REGISTRAR_SALIDA'
+        else:
+            return None
+        i += 1
+
+        verbos = self.VERBOS_BUSCAR | self.VERBOS_ENTRADA | self.VERBOS_SALIDA
+        for j in range(i, len(tokens)):
+            t = tokens[j]
+            if t == 'y' and self._es_y_numerica(tokens, j):
+                continue  # "treinta y cinco"
+            if t in self.PALABRAS_AMBIGUAS or t in verbos:
+                return None
+
+        # "de" tras el verbo: "entrada de dos cuadernos"
+        if i < len(tokens) and tokens[i] in ('de', 'del'):
+            i += 1
+
+        cantidad = None
+        if intencion != 'BUSCAR_PRODUCTO':
+            # "2.5 kilos", "2 5 cuadernos": cantidad no entera o dudosa, que decida Gemini
+            if i < len(tokens) and tokens[i][0].isdigit() and (
+                    not tokens[i].isdigit() or (i + 1 < len(tokens) and tokens[i + 1][0].isdigit())):
+                return None
+            cantidad, i = self._leer_cantidad(tokens, i)
+            # "dos unidades de cuaderno"
+            if cantidad is not None and i < len(tokens) and tokens[i] in self.UNIDADES_MEDIDA:
+                i += 1
+            while i < len(tokens) and tokens[i] in self.CONECTORES:
+                i += 1
+
+        if intencion == 'BUSCAR_PRODUCTO':
+            producto = ' '.join(originales[i:]) or None
+            if not producto:
+                return None
+            return self._resultado(intencion, producto, None, 0.95, f"Buscando '{producto}'")
+
+        # El producto termina en el destino; si lo hay, el comando puede tener más
+        # matices (o "para" ser parte del nombre) y se deja por debajo del umbral
+        fin = next((j for j in range(i, len(tokens)) if tokens[j] in self.DESTINOS), len(tokens))
+        producto = ' '.join(originales[i:fin]) or None
+        confianza = 0.95 if fin == len(tokens) else 0.8
+
+        campos_faltantes = []
+        if not producto:
+            campos_faltantes.append('producto')
+        if not cantidad:
+            campos_faltantes.append('cantidad')
+
+        tipo = 'entrada' if intencion == 'REGISTRAR_ENTRADA' else 'salida'
+        if campos_faltantes:
+            return self._resultado(intencion, producto, cantidad, min(confianza, 0.9),
+                                   f"Necesito más información para registrar la {tipo}",
+                                   campos_faltantes)
+        return self._resultado(intencion, producto, cantidad, confianza,
+                               f"Registrar {tipo} de {cantidad} '{producto}'")
+
+    def _leer_cantidad(self, tokens, i):
+        """Lee una cantidad en dígitos o en palabras a partir de la posición i."""
+        if i < len(tokens) and tokens[i].isdigit():
+            return int(tokens[i]), i + 1
+
+        total = 0
+        leido = False
+        while i < len(tokens):
+            t = tokens[i]
+            if t in self.CENTENAS and total % 1000 == 0:
+                total += self.CENTENAS[t]
+            elif t in self.DECENAS and total % 100 == 0:
+                total += self.DECENAS[t]
+            elif t in self.UNIDADES and total % 10 == 0 and not (total % 100 >= 20 and self.UNIDADES[t] >= 10):
+                total += self.UNIDADES[t]
+            elif t == 'y' and leido and self._es_y_numerica(tokens, i):
+                pass  # "treinta y cinco"
+            elif t == 'mil' and total < 1000:
+                total = (total or 1) * 1000
+            else:
+                break
+            leido = True
+            i += 1
+
+        return (total if leido else None), i
+
+    def _es_y_numerica(self, tokens, j):
+        return (0 < j < len(tokens) - 1 and tokens[j - 1] in self.DECENAS and
+                tokens[j + 1] in self.UNIDADES and self.UNIDADES[tokens[j + 1]] < 10)
+
+    def _resultado(self, intencion, producto, cantidad, confianza, mensaje, campos_faltantes=None):
+        return {
+            "intencion": intencion,
+            "producto": producto,
+            "cantidad": cantidad,
+            "confianza": confianza,
+            "mensaje": mensaje,
+            "necesita_clarificacion": bool(campos_faltantes),
+            "campos_faltantes": campos_faltantes or [],
+            "origen": "reglas"
+        }
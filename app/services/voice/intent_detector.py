@@ -1,5 +1,8 @@
 # app/services/voice/intent_detector.py
+import threading
+from app.config import Config
 from app.models.voice.voice_model import VoiceModel
+from app.services.voice.command_parser import CommandParser
 from app.services.voice.product_matcher import ProductMatcher
 
 
@@ -7,16 +10,32 @@ class IntentDetector:
     def __init__(self):
         self.voice_model = VoiceModel()
         self.product_matcher = ProductMatcher()
+        self.command_parser = CommandParser()
+
+        # Confianza mínima para resolver un comando sin llamar a Gemini
+        self.confianza_minima_reglas = getattr(Config, 'VOICE_FAST_PATH_MIN_CONFIDENCE', 0.85)
+
+        self._stats = {'total': 0, 'reglas': 0, 'gemini': 0}
+        self._stats_lock = threading.Lock()
 
     def analyze_command(self, text_command):
         """
         Analiza un comando de texto y detecta la intención
         """
-        # Primero procesar con Gemini
-        gemini_result = self.voice_model.process_command(text_command)
+        # Primero intentar con el intérprete local (sin llamada remota)
+        parsed_result = self.command_parser.parse(text_command)
+        if parsed_result and parsed_result['confianza'] >= self.confianza_minima_reglas:
+            print(f"⚡ Comando resuelto por reglas locales: {parsed_result['intencion']}")
+            self._registrar_origen('reglas')
+            command_result = parsed_result
+        else:
+            # Comando ambiguo: procesar con Gemini
+            self._registrar_origen('gemini')
+            command_result = self.voice_model.process_command(text_command)
+            command_result.setdefault('origen', 'gemini')
 
         # Validar y enriquecer el resultado
-        validated_result = self._validate_result(gemini_result)
+        validated_result = self._validate_result(command_result)
 
         # Si es una búsqueda, buscar productos reales
         if (validated_result['intencion'] == 'BUSCAR_PRODUCTO' and
@@ -49,6 +68,18 @@ class IntentDetector:
 
         return validated_result
 
+    def _registrar_origen(self, origen):
+        with self._stats_lock:
+            self._stats['total'] += 1
+            self._stats[origen] += 1
+
+    def get_stats(self):
+        """Estadísticas de la ruta rápida por reglas frente a Gemini"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['tasa_reglas'] = stats['reglas'] / stats['total'] if stats['total'] else 0.0
+        return stats
+
     def _procesar_movimiento(self, result):
         """Procesa un comando de movimiento (entrada/salida)"""
         producto = result.get('producto')
@@ -32,37 +32,27 @@ class MovementService:
 
             print(f"🎯 [MOVEMENT] Creando movimiento de ENTRADA...")
 
-            # ✅ TERCERO: Crear movimiento
-            movimiento_id = self.movimiento_model.create_movimiento(
+            # ✅ TERCERO: Registrar movimiento, detalle, stock y kardex en una sola transacción
+            movimiento_id = self.movimiento_model.registrar_movimiento(
                 fecha_movimiento=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 id_almacen=id_almacen,
                 id_tipo_movimiento=1,  # COMPRA
                 observacion=observaciones or f"Entrada por voz: {cantidad} unidades de {articulo['nombre']}",
-                id_usuario=id_usuario
+                id_usuario=id_usuario,
+                detalle=[{
+                    'id_articulo': id_articulo,
+                    'cantidad': cantidad,
+                    'costo_unitario': costo_unitario,
+                    'precio_venta': precio_venta
+                }],
+                es_entrada=True
             )
 
-            if not movimiento_id:
-                return False, "Error al crear movimiento"
-
-            # ✅ ACTUALIZADO: Agregar detalle CON PRECIO_VENTA
-            success = self.movimiento_model.agregar_detalle_movimiento(
-                id_movimiento_cabecera=movimiento_id,
-                id_articulo=id_articulo,
-                cantidad=cantidad,
-                costo_unitario=costo_unitario,
-                precio_venta=precio_venta,  # ✅ NUEVO PARÁMETRO
-                es_entrada=True  # ✅ NUEVO PARÁMETRO
-            )
-
-            if not success:
-                return False, "Error al agregar detalle"
-
-            # ✅ CUARTO: Actualizar stock
-            if self.movimiento_model.actualizar_stock(movimiento_id):
+            if movimiento_id:
                 print(f"✅ [MOVEMENT] Entrada registrada exitosamente: {cantidad} unidades de {articulo['nombre']}")
                 return True, f"✅ Entrada registrada: {cantidad} unidades de {articulo['nombre']}"
             else:
-                return False, "Error al actualizar stock"
+                return False, "Error al registrar el movimiento"
 
         except Exception as e:
             print(f"❌ [MOVEMENT] Error registrando entrada: {e}")
@@ -93,39 +83,34 @@ class MovementService:
 
             print(f"🎯 [MOVEMENT] Creando movimiento de SALIDA...")
 
-            # ✅ TERCERO: Crear movimiento
-            movimiento_id = self.movimiento_model.create_movimiento(
+            # ✅ TERCERO: Registrar movimiento, detalle, stock y kardex en una sola transacción
+            faltantes = []
+            movimiento_id = self.movimiento_model.registrar_movimiento(
                 fecha_movimiento=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 id_almacen=id_almacen,
                 id_tipo_movimiento=6,  # VENTA
                 observacion=observaciones or f"Salida por voz: {cantidad} unidades de {articulo['nombre']}",
-                id_usuario=id_usuario
+                id_usuario=id_usuario,
+                detalle=[{
+                    'id_articulo': id_articulo,
+                    'cantidad': cantidad,
+                    'costo_unitario': costo_unitario,
+                    'precio_venta': precio_venta
+                }],
+                es_entrada=False,
+                faltantes=faltantes
             )
 
-            if not movimiento_id:
-                return False, "Error al crear movimiento"
-
-            # ✅ ACTUALIZADO: Agregar detalle CON PRECIO_VENTA
-            success = self.movimiento_model.agregar_detalle_movimiento(
-                id_movimiento_cabecera=movimiento_id,
-                id_articulo=id_articulo,
-                cantidad=cantidad,
-                costo_unitario=costo_unitario,
-                precio_venta=precio_venta,  # ✅ NUEVO PARÁMETRO
-                es_entrada=False  # ✅ NUEVO PARÁMETRO
-            )
-
-            if not success:
-                return False, "Error al agregar detalle"
-
-            # ✅ CUARTO: Actualizar stock
-            if self.movimiento_model.actualizar_stock(movimiento_id):
+            if movimiento_id:
                 # ✅ NUEVO: Calcular total de venta
                 total_venta = cantidad * precio_venta
                 print(f"✅ [MOVEMENT] Salida registrada exitosamente: {cantidad} unidades de {articulo['nombre']}")
                 return True, f"✅ Venta registrada: {cantidad} unidades de {articulo['nombre']} - Total: S/ {total_venta:.2f}"
+            elif faltantes:
+                # El stock cambió entre la verificación y el registro
+                return False, f"❌ Stock insuficiente. Solo hay {faltantes[0]['disponible']} unidades de '{articulo['nombre']}'"
             else:
-                return False, "Error al actualizar stock"
+                return False, "Error al registrar el movimiento"
 
         except Exception as e:
             print(f"❌ [MOVEMENT] Error registrando salida: {e}")
@@ -0,0 +1,274 @@
+# app/services/voice/product_index.py
+import threading
+import time
+from collections import OrderedDict
+
+# Artículos modificados desde la última sincronización del índice (por proceso).
+# ArticuloModel los notifica al crear/actualizar/eliminar.
+_articulos_modificados = set()
+_modificados_lock = threading.Lock()
+
+# Valor que devuelve cargar_uno cuando la base de datos falla (distinto de None,
+# que indica que el artículo ya no existe o no está activo).
+ERROR_CARGA = object()
+
+
+def notificar_cambio_articulo(id_articulo):
+    """Marca un artículo para que el índice lo recargue en la próxima búsqueda."""
+    with _modificados_lock:
+        _articulos_modificados.add(id_articulo)
+
+
+def _tomar_modificados():
+    with _modificados_lock:
+        ids = set(_articulos_modificados)
+        _articulos_modificados.clear()
+    return ids
+
+
+def trigramas(token):
+    """Trigramas de un token con relleno ('$$lapiz$$'), para la búsqueda aproximada."""
+    texto = f"$${token}$$"
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def distancia_acotada(a, b, maximo):
+    """
+    Distancia de Levenshtein entre a y b si es <= maximo; si no, maximo + 1.
+    Corta en cuanto toda una fila supera el máximo.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return min(anterior[-1], maximo + 1)
+
+
+class ProductIndex:
+    """
+    Índice invertido en memoria del catálogo para el asistente de voz.
+
+    Guarda por artículo sus campos ya normalizados y con stemming (nombre,
+    categoría, código y marca) y un vocabulario token -> ids de artículo.
+    Una búsqueda solo puntúa a los artículos candidatos en lugar de recorrer
+    y normalizar todo el catálogo en cada comando.
+
+    Para errores de reconocimiento de voz ("boligafo", "cuadreno") guarda
+    además un índice de trigramas sobre el vocabulario: similares() solo
+    compara con la distancia de edición los tokens que comparten suficientes
+    trigramas con la palabra buscada.
+
+    Se mantiene fresco de dos formas:
+    - Incremental: los artículos notificados con notificar_cambio_articulo()
+      se recargan uno a uno antes de la siguiente consulta.
+    - Completa: cada `ttl` segundos se reconstruye (cambios de otros workers).
+
+    Ante un error de base de datos (cargar_todos devuelve None, cargar_uno
+    devuelve ERROR_CARGA) se conserva lo que ya estaba en el índice.
+
+    Las consultas por palabra se guardan en dos cachés LRU de `max_cache`
+    entradas cada una, que se vacían cuando cambia el índice.
+    """
+
+    def __init__(self, normalizar, stemmer, cargar_todos, cargar_uno, ttl=300, max_cache=2000):
+        self.normalizar = normalizar
+        self.stemmer = stemmer
+        self.cargar_todos = cargar_todos
+        self.cargar_uno = cargar_uno
+        self.ttl = ttl
+        self.max_cache = max(1, int(max_cache))
+
+        self.entradas = {}  # id_articulo -> campos precalculados
+        self.vocabulario = {}  # token -> set(id_articulo)
+        self._cache_subcadenas = OrderedDict()  # palabra -> set(id_articulo)
+        self.trigramas = {}  # trigrama -> set(token)
+        self._cache_similares = OrderedDict()  # (palabra, distancia) -> [(token, distancia)]
+        self._construido_en = None
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Construcción y mantenimiento
+    # ------------------------------------------------------------------
+    def _stem_texto(self, texto):
+        return ' '.join(self.stemmer.stem(p) for p in texto.split())
+
+    def _crear_entrada(self, articulo):
+        nombre = self.normalizar(articulo['nombre'])
+        categoria = self.normalizar(articulo.get('categoria_nombre') or '')
+        entrada = {
+            'articulo': articulo,
+            'nombre': nombre,
+            'nombre_raiz': self._stem_texto(nombre),
+            'categoria': categoria,
+            'categoria_raiz': self._stem_texto(categoria),
+            'codigo': self.normalizar(articulo['codigo']),
+            'marca': self.normalizar(articulo.get('marca_nombre') or ''),
+            'orden': (articulo['nombre'] or '').lower(),
+        }
+        entrada['tokens'] = set(' '.join([
+            entrada['nombre'], entrada['nombre_raiz'],
+            entrada['categoria'], entrada['categoria_raiz'],
+            entrada['codigo'], entrada['marca']
+        ]).split())
+        return entrada
+
+    def _agregar(self, articulo):
+        entrada = self._crear_entrada(articulo)
+        self.entradas[articulo['id_articulo']] = entrada
+        for token in entrada['tokens']:
+            if token not in self.vocabulario:
+                self.vocabulario[token] = set()
+                for trigrama in trigramas(token):
+                    self.trigramas.setdefault(trigrama, set()).add(token)
+            self.vocabulario[token].add(articulo['id_articulo'])
+
+    def _quitar(self, id_articulo):
+        entrada = self.entradas.pop(id_articulo, None)
+        if not entrada:
+            return
+        for token in entrada['tokens']:
+            ids = self.vocabulario.get(token)
+            if ids:
+                ids.discard(id_articulo)
+                if not ids:
+                    del self.vocabulario[token]
+                    for trigrama in trigramas(token):
+                        tokens = self.trigramas.get(trigrama)
+                        if tokens:
+                            tokens.discard(token)
+                            if not tokens:
+                                del self.trigramas[trigrama]
+
+    def reconstruir(self):
+        """Reconstruye el índice completo desde la base de datos."""
+        articulos = self.cargar_todos()
+        with self._lock:
+            if articulos is None:
+                # Mejor un índice algo viejo que uno vacío hasta el próximo ttl
+                print("⚠️ No se pudo recargar el índice de productos; "
+                      "se conserva el índice anterior")
+                self._construido_en = time.monotonic()
+                return
+            _tomar_modificados()
+            self.entradas = {}
+            self.vocabulario = {}
+            self._cache_subcadenas = OrderedDict()
+            self.trigramas = {}
+            self._cache_similares = OrderedDict()
+            for articulo in articulos:
+                self._agregar(articulo)
+            self._construido_en = time.monotonic()
+        print(f"📚 Índice de productos construido: {len(self.entradas)} artículos, "
+              f"{len(self.vocabulario)} términos")
+
+    def refrescar_articulo(self, id_articulo):
+        """Recarga un solo artículo (o lo quita si ya no está activo)."""
+        articulo = self.cargar_uno(id_articulo)
+        if articulo is ERROR_CARGA:
+            # Se conserva la entrada actual y se reintenta en la próxima consulta
+            notificar_cambio_articulo(id_articulo)
+            return
+        with self._lock:
+            self._quitar(id_articulo)
+            if articulo:
+                self._agregar(articulo)
+            self._cache_subcadenas.clear()
+            self._cache_similares.clear()
+
+    def asegurar_actualizado(self):
+        """Aplica cambios pendientes o reconstruye si el índice expiró."""
+        if (self._construido_en is None or
+                (self.ttl and time.monotonic() - self._construido_en > self.ttl)):
+            self.reconstruir()
+            return
+
+        for id_articulo in _tomar_modificados():
+            self.refrescar_articulo(id_articulo)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _cache_get(self, cache, clave):
+        valor = cache.get(clave)
+        if valor is not None:
+            cache.move_to_end(clave)
+        return valor
+
+    def _cache_set(self, cache, clave, valor):
+        cache[clave] = valor
+        while len(cache) > self.max_cache:
+            cache.popitem(last=False)
+
+    def _tokens_con_subcadena(self, palabra):
+        """Tokens que contienen `palabra`, acotados con el índice de trigramas."""
+        if len(palabra) < 3:
+            return [token for token in self.vocabulario if palabra in token]
+
+        # Un token que contiene la palabra contiene todos sus trigramas (sin relleno)
+        conjuntos = sorted((self.trigramas.get(palabra[i:i + 3], set()) for i in range(len(palabra) - 2)),
+                           key=len)
+        posibles = set(conjuntos[0]).intersection(*conjuntos[1:])
+        return [token for token in posibles if palabra in token]
+
+    def ids_con_subcadena(self, palabra):
+        """Artículos con algún token (nombre, raíz, categoría, código o marca) que contiene `palabra`."""
+        with self._lock:
+            ids = self._cache_get(self._cache_subcadenas, palabra)
+            if ids is None:
+                ids = set()
+                for token in self._tokens_con_subcadena(palabra):
+                    ids |= self.vocabulario[token]
+                self._cache_set(self._cache_subcadenas, palabra, ids)
+            return ids
+
+    def similares(self, palabra, max_distancia=None):
+        """
+        Tokens del vocabulario a distancia de edición <= max_distancia de
+        `palabra` (por defecto 1 hasta 5 letras y 2 para palabras más largas),
+        ordenados por distancia y por cantidad de artículos.
+        """
+        if max_distancia is None:
+            max_distancia = 1 if len(palabra) <= 5 else 2
+
+        with self._lock:
+            clave = (palabra, max_distancia)
+            resultado = self._cache_get(self._cache_similares, clave)
+            if resultado is not None:
+                return resultado
+
+            # Con d ediciones se pierden a lo sumo 3*d trigramas de los len+2 de la palabra
+            propios = trigramas(palabra)
+            minimo = max(1, len(propios) - 3 * max_distancia)
+            compartidos = {}
+            for trigrama in propios:
+                for token in self.trigramas.get(trigrama, ()):
+                    compartidos[token] = compartidos.get(token, 0) + 1
+
+            resultado = []
+            for token, cantidad in compartidos.items():
+                if cantidad < minimo or token == palabra:
+                    continue
+                distancia = distancia_acotada(palabra, token, max_distancia)
+                if distancia <= max_distancia:
+                    resultado.append((token, distancia))
+            resultado.sort(key=lambda par: (par[1], -len(self.vocabulario[par[0]]), par[0]))
+            self._cache_set(self._cache_similares, clave, resultado)
+            return resultado
+
+    def candidatos(self, palabras):
+        """Une los artículos que pueden puntuar para alguna de las palabras."""
+        ids = set()
+        for palabra in palabras:
+            ids |= self.ids_con_subcadena(palabra)
+        with self._lock:
+            return [self.entradas[i] for i in ids if i in self.entradas]
+
+    def todas(self):
+        with self._lock:
+            return list(self.entradas.values())
@@ -2,8 +2,8 @@
 from app.models.articulo_model import ArticuloModel
 from app.models.stock_almacen_model import StockAlmacenModel
 from app.database import get_db_connection, close_db_connection
-import re
-import unicodedata
+from app.services.voice.product_index import ERROR_CARGA, ProductIndex
+from app.utils.texto import normalizar_texto
 import nltk
 from nltk.stem import SnowballStemmer
 
@@ -15,11 +15,23 @@ except LookupError:
 
 
 class ProductMatcher:
+    # Palabras más cortas no se corrigen (demasiados términos a una letra de distancia)
+    LONGITUD_MINIMA_CORRECCION = 4
+    FACTOR_CORRECCION = 0.9
+
     def __init__(self):
         self.articulo_model = ArticuloModel()
         self.stock_model = StockAlmacenModel()
         self.stemmer = SnowballStemmer('spanish')
 
+        # Índice en memoria del catálogo (evita recargar y renormalizar en cada comando)
+        self.indice = ProductIndex(
+            normalizar=self._normalizar_texto,
+            stemmer=self.stemmer,
+            cargar_todos=self.articulo_model.get_articulos_para_voz,
+            cargar_uno=self._cargar_articulo_para_voz
+        )
+
         # Diccionario de sinónimos y variaciones expandido
         self.variaciones = {
             # Plurales comunes
@@ -53,9 +65,9 @@ class ProductMatcher:
         if self._es_consulta_no_relacionada(termino_busqueda):
             return []
 
-        articulos = self.articulo_model.get_articulos_para_voz()
+        self.indice.asegurar_actualizado()
 
-        if not articulos:
+        if not self.indice.entradas:
             print("⚠️ No se encontraron artículos activos")
             return []
 
@@ -70,14 +82,37 @@ class ProductMatcher:
         if not self._tiene_palabras_relevantes(palabras_termino):
             return []
 
+        # Palabras sin ninguna coincidencia en el catálogo (errores del reconocimiento de voz):
+        # se reemplazan por el término más cercano del índice antes de puntuar
+        correcciones = self._corregir_palabras(palabras_termino)
+        if correcciones:
+            print(f"🔍 Correcciones aproximadas: {correcciones}")
+            palabras_termino = [correcciones.get(p, p) for p in palabras_termino]
+            termino_normalizado = ' '.join(palabras_termino)
+
+        # 🎯 Términos clave vs adjetivos: se calculan una vez por consulta
+        terminos_clave = self._identificar_terminos_clave(palabras_termino)
+        print(f"🔍 Términos clave identificados: {terminos_clave}")
+
+        # Solo se puntúan los artículos que comparten algún término con la consulta;
+        # el resto tendría score 0 con cualquiera de las estrategias.
+        raices = [self.stemmer.stem(p) for p in palabras_termino]
+        candidatos = self.indice.candidatos(set(palabras_termino) | set(raices))
+        print(f"🔍 Candidatos del índice: {len(candidatos)} de {len(self.indice.entradas)}")
+
         resultados = []
 
         # Estrategias de búsqueda con scoring MEJORADO
-        for articulo in articulos:
-            score = self._calcular_score_relevancia_mejorado(articulo, palabras_termino, termino_normalizado)
+        for entrada in candidatos:
+            score = self._calcular_score_relevancia_mejorado(entrada, palabras_termino, termino_normalizado,
+                                                             terminos_clave)
+
+            # Cada palabra corregida resta algo de confianza
+            score *= self.FACTOR_CORRECCION ** len(correcciones)
 
             # Umbral más bajo para permitir más resultados
             if score >= 0.3:  # ⬆️ Aumentado umbral ligeramente
+                articulo = dict(entrada['articulo'])
                 articulo['score_relevancia'] = score
                 resultados.append(articulo)
 
@@ -91,8 +126,23 @@ class ProductMatcher:
         for res in resultados[:5]:  # Debug primeros 5
             print(f"   - {res['nombre']} (score: {res['score_relevancia']:.2f})")
 
-        # Enriquecer con stock
-        return [self._agregar_informacion_stock(r) for r in resultados]
+        # Enriquecer con stock (una sola consulta para todos los resultados)
+        return self._agregar_informacion_stock_lote(resultados)
+
+    def _corregir_palabras(self, palabras):
+        """
+        Busca en el índice de trigramas el término más cercano (distancia de
+        edición acotada) para cada palabra que no aparece en el catálogo.
+        Devuelve {palabra: corrección}.
+        """
+        correcciones = {}
+        for palabra in palabras:
+            if len(palabra) < self.LONGITUD_MINIMA_CORRECCION or self.indice.ids_con_subcadena(palabra):
+                continue
+            similares = self.indice.similares(palabra)
+            if similares:
+                correcciones[palabra] = similares[0][0]
+        return correcciones
 
     def _normalizar_y_mejorar_termino(self, texto):
         """Normaliza texto y aplica mejoras para matching"""
@@ -113,33 +163,16 @@ class ProductMatcher:
 
         return ' '.join(palabras_raiz)
 
-    def _calcular_score_relevancia_mejorado(self, articulo, palabras_termino, termino_completo):
-        """Calcula score de relevancia MEJORADO con PRIORIDAD de términos"""
-        nombre_normalizado = self._normalizar_texto(articulo['nombre'])
-        codigo_normalizado = self._normalizar_texto(articulo['codigo'])
-        categoria_normalizada = self._normalizar_texto(articulo.get('categoria_nombre', ''))
-        marca_normalizada = self._normalizar_texto(articulo.get('marca_nombre', ''))
-
-        # Aplicar stemming a los textos del artículo también
-        nombre_raiz = ' '.join([self.stemmer.stem(p) for p in nombre_normalizado.split()])
-        categoria_raiz = ' '.join([self.stemmer.stem(p) for p in categoria_normalizada.split()])
-
-        textos_busqueda = [
-            nombre_normalizado, nombre_raiz,
-            categoria_normalizada, categoria_raiz,
-            codigo_normalizado, marca_normalizada
-        ]
-
-        texto_completo = ' '.join(textos_busqueda)
-        texto_completo_raiz = ' '.join([self.stemmer.stem(p) for p in texto_completo.split()])
+    def _calcular_score_relevancia_mejorado(self, entrada, palabras_termino, termino_completo, terminos_clave):
+        """Calcula score de relevancia MEJORADO con PRIORIDAD de términos (sobre campos precalculados del índice)"""
+        nombre_normalizado = entrada['nombre']
+        codigo_normalizado = entrada['codigo']
+        categoria_normalizada = entrada['categoria']
+        marca_normalizada = entrada['marca']
+        nombre_raiz = entrada['nombre_raiz']
 
         score = 0.0
 
-        # 🎯 NUEVA ESTRATEGIA: IDENTIFICAR TÉRMINOS CLAVE vs ADJETIVOS
-        terminos_clave = self._identificar_terminos_clave(palabras_termino)
-
-        print(f"🔍 Términos clave identificados: {terminos_clave}")
-
         # ESTRATEGIA 1: Coincidencia exacta del TÉRMINO COMPLETO (máxima prioridad)
         if termino_completo in nombre_normalizado:
             score += 2.0  # ⬆️ Aumentado
@@ -196,7 +229,7 @@ class ProductMatcher:
                 score *= 0.3  # ⬇️ Reducir score significativamente
                 print(f"   ⚠️ Penalización: faltan {claves_faltantes} términos clave")
 
-        print(f"   📊 Score final: {score:.2f} para: {articulo['nombre']}")
+        print(f"   📊 Score final: {score:.2f} para: {entrada['articulo']['nombre']}")
         return min(score, 2.0)  # ⬆️ Aumentado límite por los bonuses
 
     def _identificar_terminos_clave(self, palabras):
@@ -224,25 +257,14 @@ class ProductMatcher:
     # MANTENER LOS MÉTODOS EXISTENTES (solo mejoramos los de arriba)
     def _normalizar_texto(self, texto):
         """Normaliza texto: minúsculas, sin tildes, sin caracteres especiales"""
-        if not texto:
-            return ""
-
-        # Convertir a minúsculas
-        texto = texto.lower()
-
-        # Remover tildes
-        texto = ''.join(
-            c for c in unicodedata.normalize('NFD', texto)
-            if unicodedata.category(c) != 'Mn'
-        )
+        return normalizar_texto(texto)
 
-        # Remover caracteres especiales, mantener letras, números y espacios
-        texto = re.sub(r'[^a-z0-9\s]', ' ', texto)
-
-        # Remover espacios extras
-        texto = re.sub(r'\s+', ' ', texto).strip()
-
-        return texto
+    def _cargar_articulo_para_voz(self, id_articulo):
+        """Carga un solo artículo activo para refrescar el índice"""
+        articulos = self.articulo_model.get_articulos_para_voz(id_articulo)
+        if articulos is None:
+            return ERROR_CARGA
+        return articulos[0] if articulos else None
 
     def _es_consulta_no_relacionada(self, termino):
         """Detecta consultas que no están relacionadas con el inventario"""
@@ -278,10 +300,28 @@ class ProductMatcher:
         palabras_relevantes = [p for p in palabras if p not in palabras_vacias and len(p) > 2]
         return len(palabras_relevantes) > 0
 
-    def _agregar_informacion_stock(self, articulo):
+    def _agregar_informacion_stock_lote(self, articulos):
+        """Agrega información de stock a varios artículos con una sola consulta"""
+        if not articulos:
+            return articulos
+
+        try:
+            stock_por_articulo = self.stock_model.get_stock_by_articulos(
+                [articulo['id_articulo'] for articulo in articulos]
+            )
+        except Exception as e:
+            print(f"⚠️ Error obteniendo stock en lote: {e}")
+            stock_por_articulo = {}
+
+        return [self._agregar_informacion_stock(articulo, stock_por_articulo.get(articulo['id_articulo'], 0))
+                for articulo in articulos]
+
+    def _agregar_informacion_stock(self, articulo, stock_actual=None):
         """Agrega información de stock al artículo - MEJORADO con ambos precios"""
         try:
-            if hasattr(self.stock_model, 'get_stock_by_articulo'):
+            if stock_actual is not None:
+                articulo['stock_actual'] = stock_actual
+            elif hasattr(self.stock_model, 'get_stock_by_articulo'):
                 stock_info = self.stock_model.get_stock_by_articulo(articulo['id_articulo'])
                 articulo['stock_actual'] = stock_info.get('stock_total', 0) if stock_info else 0
             else:
@@ -324,26 +364,32 @@ class ProductMatcher:
 
     def sugerir_productos_similares(self, termino_no_encontrado):
         """Sugiere productos similares cuando no se encuentra el término"""
-        articulos = self.articulo_model.get_articulos_para_voz()
-        sugerencias = []
+        self.indice.asegurar_actualizado()
 
         termino_mejorado = self._normalizar_y_mejorar_termino(termino_no_encontrado)
         palabras_termino = termino_mejorado.split()
+        if not palabras_termino:
+            return []
 
-        for articulo in articulos:
-            nombre_normalizado = self._normalizar_texto(articulo['nombre'])
-            nombre_raiz = ' '.join([self.stemmer.stem(p) for p in nombre_normalizado.split()])
-
-            # Buscar coincidencias con raíces
-            coincidencias = sum(1 for palabra in palabras_termino
-                                if self.stemmer.stem(palabra) in nombre_raiz)
+        # Raíces de la consulta más los términos cercanos a las que no aparecen en el catálogo
+        raices_termino = [self.stemmer.stem(palabra) for palabra in palabras_termino]
+        correcciones = self._corregir_palabras(raices_termino)
+        raices_termino = [correcciones.get(raiz, raiz) for raiz in raices_termino]
 
+        sugerencias = []
+        for entrada in self.indice.candidatos(raices_termino):
+            coincidencias = sum(1 for raiz in raices_termino
+                                if raiz in entrada['nombre_raiz'] or raiz in entrada['nombre'])
             if coincidencias > 0:
-                articulo['score_relevancia'] = coincidencias / len(palabras_termino)
-                sugerencias.append(articulo)
-
-            if len(sugerencias) >= 8:  # Más sugerencias
-                break
-
-        sugerencias.sort(key=lambda x: x['score_relevancia'], reverse=True)
-        return sugerencias
\ No newline at end of file
+                sugerencias.append((coincidencias / len(palabras_termino), entrada))
+
+        # Las 8 mejores por coincidencias y, a igual puntaje, en orden de catálogo (por nombre)
+        sugerencias.sort(key=lambda par: (-par[0], par[1]['orden']))
+        resultado = []
+        for score, entrada in sugerencias[:8]:
+            articulo = dict(entrada['articulo'])
+            articulo['score_relevancia'] = score * self.FACTOR_CORRECCION ** len(correcciones)
+            resultado.append(articulo)
+
+        # Enriquecer con stock (una sola consulta para todas las sugerencias)
+        return self._agregar_informacion_stock_lote(resultado)
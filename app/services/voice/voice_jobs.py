@@ -0,0 +1,214 @@
+# app/services/voice/voice_jobs.py
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class VoiceJobManager:
+    """
+    Cola acotada de trabajos para procesar comandos de voz fuera del request.
+
+    - max_workers: comandos procesados en paralelo (llamadas a Gemini simultáneas).
+    - max_pending: trabajos en vuelo (en la cola del executor o ejecutándose,
+      incluidos los ya expirados que siguen corriendo); por encima se rechazan.
+    - timeout: segundos tras los cuales un trabajo sin terminar se informa como
+      expirado. No interrumpe la ejecución: la llamada a Gemini sigue hasta
+      terminar y mientras tanto ocupa su lugar en max_pending.
+    - retention: segundos que se conserva el resultado para ser consultado.
+    - directorio: carpeta compartida donde se publica el estado de cada
+      trabajo (un JSON por trabajo), para que la consulta funcione aunque
+      llegue a otro worker de gunicorn. Con varios servidores debe ser una
+      carpeta común a todos.
+    """
+
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+    EXPIRADO = 'expirado'
+
+    def __init__(self, max_workers=4, max_pending=32, timeout=30, retention=300, directorio=None):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retention = retention
+        self.directorio = directorio
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='voice-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Un cupo por trabajo entregado al executor; se libera al terminar de ejecutarse
+        self._cupos = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, funcion, *args, usuario_id=None):
+        """Encola un trabajo. Devuelve su ID o None si la cola está llena."""
+        self._limpiar()
+        if not self._cupos.acquire(blocking=False):
+            return None
+
+        with self._lock:
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id,
+                'estado': self.PENDIENTE,
+                'usuario_id': usuario_id,
+                'creado_en': time.time(),
+                'terminado_en': None,
+                'resultado': None,
+                'error': None,
+            }
+            self._publicar(self._jobs[job_id])
+
+        try:
+            self._executor.submit(self._ejecutar, job_id, funcion, args)
+        except RuntimeError:
+            self._cupos.release()
+            raise
+        return job_id
+
+    def _ejecutar(self, job_id, funcion, args):
+        try:
+            self._procesar(job_id, funcion, args)
+        finally:
+            self._cupos.release()
+
+    def _procesar(self, job_id, funcion, args):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['estado'] != self.PENDIENTE:
+                return
+            if time.time() - job['creado_en'] > self.timeout:
+                self._terminar(job, self.EXPIRADO, error='El comando esperó demasiado en la cola')
+                return
+            job['estado'] = self.PROCESANDO
+            self._publicar(job)
+
+        try:
+            resultado = funcion(*args)
+            with self._lock:
+                if job['estado'] == self.PROCESANDO:
+                    self._terminar(job, self.COMPLETADO, resultado=resultado)
+        except Exception as e:
+            print(f"❌ Error en trabajo de voz {job_id}: {e}")
+            with self._lock:
+                if job['estado'] == self.PROCESANDO:
+                    self._terminar(job, self.ERROR, error=str(e))
+
+    def _terminar(self, job, estado, resultado=None, error=None):
+        job['estado'] = estado
+        job['resultado'] = resultado
+        job['error'] = error
+        job['terminado_en'] = time.time()
+        self._publicar(job)
+
+    def get(self, job_id):
+        """Devuelve una vista pública del trabajo (o None si no existe)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if (job['estado'] in (self.PENDIENTE, self.PROCESANDO) and
+                        time.time() - job['creado_en'] > self.timeout):
+                    self._terminar(job, self.EXPIRADO, error='El comando tardó demasiado en procesarse')
+                return self._vista(job)
+
+        # Encolado en otro worker: leer el estado publicado
+        job = self._leer_publicado(job_id)
+        if job is None:
+            return None
+        if (job['estado'] in (self.PENDIENTE, self.PROCESANDO) and
+                time.time() - job['creado_en'] > self.timeout):
+            job['estado'] = self.EXPIRADO
+            job['error'] = 'El comando tardó demasiado en procesarse'
+        return self._vista(job)
+
+    def _vista(self, job):
+        return {
+            'job_id': job['id'],
+            'estado': job['estado'],
+            'usuario_id': job['usuario_id'],
+            'resultado': job['resultado'],
+            'error': job['error'],
+        }
+
+    def stats(self):
+        with self._lock:
+            estados = {}
+            for job in self._jobs.values():
+                estados[job['estado']] = estados.get(job['estado'], 0) + 1
+        return estados
+
+    def _limpiar(self):
+        """Olvida los trabajos terminados hace más de `retention` segundos."""
+        ahora = time.time()
+        limite = ahora - self.retention
+        with self._lock:
+            for job in self._jobs.values():
+                if (job['estado'] in (self.PENDIENTE, self.PROCESANDO) and
+                        ahora - job['creado_en'] > self.timeout):
+                    self._terminar(job, self.EXPIRADO, error='El comando tardó demasiado en procesarse')
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job['terminado_en'] and job['terminado_en'] < limite]:
+                del self._jobs[job_id]
+                self._borrar_publicado(job_id)
+
+        # Archivos que dejó un worker reiniciado antes de limpiarlos
+        if not self.directorio:
+            return
+        try:
+            nombres = os.listdir(self.directorio)
+        except OSError:
+            return
+        for nombre in nombres:
+            archivo = os.path.join(self.directorio, nombre)
+            try:
+                if os.stat(archivo).st_mtime < limite - self.timeout:
+                    os.remove(archivo)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Estado compartido entre workers
+    # ------------------------------------------------------------------
+    def _archivo(self, job_id):
+        # job_id llega por la URL: solo se aceptan los hex generados por submit()
+        if not self.directorio or not job_id.isalnum():
+            return None
+        return os.path.join(self.directorio, f"{job_id}.json")
+
+    def _publicar(self, job):
+        archivo = self._archivo(job['id'])
+        if archivo is None:
+            return
+        datos = dict(self._vista(job), id=job['id'], creado_en=job['creado_en'])
+        del datos['job_id']
+        temporal = f"{archivo}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False, default=str)
+            os.replace(temporal, archivo)
+        except OSError as e:
+            print(f"⚠️ No se pudo publicar el trabajo de voz {job['id']}: {e}")
+
+    def _leer_publicado(self, job_id):
+        archivo = self._archivo(job_id)
+        if archivo is None:
+            return None
+        try:
+            with open(archivo, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer el trabajo de voz {job_id}: {e}")
+            return None
+
+    def _borrar_publicado(self, job_id):
+        archivo = self._archivo(job_id)
+        if archivo is None:
+            return
+        try:
+            os.remove(archivo)
+        except OSError:
+            pass
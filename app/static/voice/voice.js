@@ -345,14 +345,23 @@ class VoiceAssistant {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ command: commandText })
+            body: JSON.stringify({ command: commandText, async: true })
         })
         .then(response => {
-            if (!response.ok) {
+            // 503: cola del asistente llena, el cuerpo trae el mensaje
+            if (!response.ok && response.status !== 503) {
                 throw new Error(`Error HTTP: ${response.status}`);
             }
             return response.json();
         })
+        .then(data => {
+            // ✅ El servidor encola el comando y devuelve un job_id para consultar
+            if (data.job_id) {
+                this.showStatus('Procesando comando...', 'Esperando respuesta del asistente', 'warning');
+                return this.waitForJob(data.url || `/voice/jobs/${data.job_id}`);
+            }
+            return data;
+        })
         .then(data => {
             this.handleServerResponse(data);
             this.updateLastUpdateTime();
@@ -363,6 +372,35 @@ class VoiceAssistant {
         });
     }
 
+    // Consulta el estado de un comando encolado hasta que termine
+    waitForJob(url, interval = 400) {
+        return new Promise((resolve, reject) => {
+            const poll = () => {
+                fetch(url)
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(`Error HTTP: ${response.status}`);
+                        }
+                        return response.json();
+                    })
+                    .then(job => {
+                        if (job.estado === 'completado') {
+                            resolve(job.resultado);
+                        } else if (job.estado === 'error' || job.estado === 'expirado') {
+                            resolve({
+                                error: true,
+                                message: job.error || 'No se pudo procesar el comando'
+                            });
+                        } else {
+                            setTimeout(poll, interval);
+                        }
+                    })
+                    .catch(reject);
+            };
+            poll();
+        });
+    }
+
     // MODIFICAR método showStatus para mostrar estado de activación
     showStatus(title, detail, type = 'info') {
         const statusElement = document.getElementById('system-status');
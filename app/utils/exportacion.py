@@ -0,0 +1,73 @@
+# app/utils/exportacion.py
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from flask import Response, stream_with_context
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return str(valor)  # Decimal y otros: como texto, sin perder precisión
+
+
+def filas_csv(filas, columnas=None):
+    """
+    Convierte un iterable de diccionarios en líneas CSV, una por fila
+
+    Args:
+        filas: Iterable de diccionarios (puede ser un generador)
+        columnas: Columnas a exportar; por defecto las claves de la primera fila
+    """
+    buffer = io.StringIO()
+    writer = None
+    for fila in filas:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=columnas or list(fila.keys()), extrasaction='ignore')
+            buffer.write('\ufeff')  # BOM para que Excel reconozca UTF-8
+            writer.writeheader()
+        writer.writerow(fila)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if writer is None and columnas:
+        yield '\ufeff' + ','.join(columnas) + '\r\n'
+
+
+def filas_ndjson(filas):
+    """Convierte un iterable de diccionarios en líneas JSON (NDJSON), una por fila"""
+    for fila in filas:
+        yield json.dumps(fila, default=_valor_json, ensure_ascii=False) + '\n'
+
+
+def respuesta_streaming(filas, formato, nombre_archivo, columnas=None):
+    """
+    Respuesta HTTP que envía las filas a medida que se leen de la base de datos
+
+    Args:
+        filas: Iterable de diccionarios (idealmente un generador con cursor de servidor)
+        formato: 'csv' o 'ndjson'
+        nombre_archivo: Nombre sin extensión para la descarga
+        columnas: Columnas del CSV (opcional)
+    """
+    if formato == 'csv':
+        contenido = filas_csv(filas, columnas)
+    else:
+        contenido = filas_ndjson(filas)
+
+    return Response(
+        stream_with_context(contenido),
+        mimetype=FORMATOS[formato],
+        headers={
+            'Content-Disposition': f'attachment; filename="{nombre_archivo}.{formato}"',
+            'X-Accel-Buffering': 'no',
+        }
+    )
@@ -1,5 +1,10 @@
 # app/utils/pagination.py
 
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
 from flask import request
 from math import ceil
 
@@ -85,6 +90,135 @@ class Paginator:
         }
 
 
+def _codificar_valor(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'d': valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return {'dec': str(valor)}
+    return valor
+
+
+def _decodificar_valor(valor):
+    if isinstance(valor, dict):
+        if 'dt' in valor:
+            return datetime.fromisoformat(valor['dt'])
+        if 'd' in valor:
+            return date.fromisoformat(valor['d'])
+        if 'dec' in valor:
+            return Decimal(valor['dec'])
+    return valor
+
+
+def encode_cursor(direccion, clave, page):
+    """Codifica dirección, clave de orden y número de página en un token para la URL"""
+    datos = [direccion, [_codificar_valor(v) for v in clave], page]
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decodifica un token de encode_cursor
+
+    Returns:
+        Tupla (direccion, clave, page); ('next', None, 1) si el token está vacío o no es válido
+    """
+    if not token:
+        return 'next', None, 1
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        direccion, clave, page = datos
+        if direccion not in ('next', 'prev'):
+            raise ValueError(direccion)
+        return direccion, tuple(_decodificar_valor(v) for v in clave), max(1, int(page))
+    except (ValueError, TypeError):
+        return 'next', None, 1
+
+
+class KeysetPaginator:
+    """
+    Paginación por cursor (keyset) para listados grandes en orden descendente.
+
+    En lugar de OFFSET, cada página se pide a partir de la clave de orden de
+    la última (o primera) fila mostrada, p. ej. (fecha_movimiento, id). El
+    costo de una página no depende de su posición y los tokens siguen siendo
+    válidos aunque se registren filas nuevas. get_pagination_data() es
+    compatible con macros/pagination.html.
+    """
+
+    def __init__(self, fetch_fn, key_fn, cursor=None, per_page=None, default_per_page=10, count_fn=None):
+        """
+        Inicializa el paginador
+
+        Args:
+            fetch_fn: Función (clave, direccion, limit) que retorna las filas. Con
+                direccion 'next', las de clave menor a `clave` en orden descendente;
+                con 'prev', las de clave mayor en orden ascendente. `clave` es None
+                en la primera página.
+            key_fn: Función que retorna la clave de orden (tupla) de una fila
+            cursor: Token de la página (si es None, se toma de request.args)
+            per_page: Items por página (si es None, se toma de request.args)
+            default_per_page: Valor por defecto de items por página
+            count_fn: Función opcional sin argumentos que retorna el total de items
+        """
+        token = cursor if cursor is not None else request.args.get('cursor', '')
+        self.per_page = per_page if per_page is not None else request.args.get('per_page', default_per_page, type=int)
+        if self.per_page < 1:
+            self.per_page = default_per_page
+
+        direccion, clave, self.page = decode_cursor(token)
+
+        # Se pide una fila extra para saber si hay más en esa dirección
+        filas = fetch_fn(clave, direccion, self.per_page + 1)
+        hay_mas = len(filas) > self.per_page
+        filas = filas[:self.per_page]
+
+        if direccion == 'prev':
+            filas.reverse()
+            if not hay_mas:
+                # Llegamos al inicio: mostrar la primera página completa
+                direccion, clave, self.page = 'next', None, 1
+                filas = fetch_fn(None, 'next', self.per_page + 1)
+                hay_mas = len(filas) > self.per_page
+                filas = filas[:self.per_page]
+
+        self.paginated_items = filas
+        self.has_prev = clave is not None and (direccion == 'next' or hay_mas)
+        self.has_next = hay_mas if direccion == 'next' else True
+        self.prev_cursor = encode_cursor('prev', key_fn(filas[0]), self.page - 1) \
+            if self.has_prev and filas else None
+        self.next_cursor = encode_cursor('next', key_fn(filas[-1]), self.page + 1) \
+            if self.has_next and filas else None
+        self.has_prev = self.prev_cursor is not None
+        self.has_next = self.next_cursor is not None
+
+        self.total_items = count_fn() if count_fn else None
+        self.start_index = (self.page - 1) * self.per_page
+
+    def get_items(self):
+        """Retorna los items de la página actual"""
+        return self.paginated_items
+
+    def get_pagination_data(self):
+        """Retorna un diccionario con la información de paginación"""
+        total_pages = ceil(self.total_items / self.per_page) if self.total_items else None
+        return {
+            'modo': 'keyset',
+            'page': self.page,
+            'per_page': self.per_page,
+            'total_items': self.total_items,
+            'total_pages': total_pages,
+            'has_prev': self.has_prev,
+            'has_next': self.has_next,
+            'prev_cursor': self.prev_cursor,
+            'next_cursor': self.next_cursor,
+            'start_index': self.start_index + 1 if self.paginated_items else 0,
+            'end_index': self.start_index + len(self.paginated_items),
+            'pages': []
+        }
+
+
 def paginate(items, per_page=10):
     """
     Función helper para paginar rápidamente
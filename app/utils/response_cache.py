@@ -0,0 +1,117 @@
+# app/utils/response_cache.py
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Caché LRU con expiración (TTL) para respuestas ya calculadas (comandos
+    del modelo de voz, resúmenes de reportes).
+
+    - max_items: número máximo de comandos guardados (se descarta el menos usado).
+    - ttl: segundos de validez de cada respuesta.
+    - path: archivo JSON opcional para conservar la caché entre reinicios de
+      los workers de gunicorn. Se escribe de forma atómica y como máximo
+      cada `save_interval` segundos.
+    """
+
+    def __init__(self, max_items=500, ttl=43200, path=None, save_interval=30):
+        self.max_items = max(1, int(max_items))
+        self.ttl = ttl
+        self.path = path
+        self.save_interval = save_interval
+
+        self._items = OrderedDict()  # clave -> (respuesta, expira_en)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._ultimo_guardado = 0.0
+        self._pendiente = False
+
+        if self.path:
+            self._cargar()
+
+    def get(self, clave):
+        """Devuelve una copia de la respuesta guardada o None."""
+        with self._lock:
+            item = self._items.get(clave)
+            if item is None or item[1] < time.time():
+                if item is not None:
+                    del self._items[clave]
+                self._misses += 1
+                return None
+            self._items.move_to_end(clave)
+            self._hits += 1
+            return copy.deepcopy(item[0])
+
+    def set(self, clave, respuesta):
+        with self._lock:
+            self._items[clave] = (copy.deepcopy(respuesta), time.time() + self.ttl)
+            self._items.move_to_end(clave)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+            self._pendiente = True
+        self._guardar()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._pendiente = True
+        self._guardar(forzar=True)
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'items': len(self._items),
+                'max_items': self.max_items,
+                'hits': self._hits,
+                'misses': self._misses,
+                'tasa_aciertos': self._hits / total if total else 0.0,
+            }
+
+    # ------------------------------------------------------------------
+    # Persistencia en disco
+    # ------------------------------------------------------------------
+    def _cargar(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer la caché de voz '{self.path}': {e}")
+            return
+
+        ahora = time.time()
+        with self._lock:
+            for clave, respuesta, expira_en in datos.get('items', []):
+                if expira_en > ahora:
+                    self._items[clave] = (respuesta, expira_en)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        print(f"✅ Caché de voz cargada: {len(self._items)} comandos")
+
+    def _guardar(self, forzar=False):
+        if not self.path:
+            return
+
+        with self._lock:
+            ahora = time.time()
+            if not self._pendiente or (not forzar and ahora - self._ultimo_guardado < self.save_interval):
+                return
+            items = [[clave, respuesta, expira_en] for clave, (respuesta, expira_en) in self._items.items()]
+            self._pendiente = False
+            self._ultimo_guardado = ahora
+
+        temporal = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump({'items': items}, archivo, ensure_ascii=False, default=str)
+            os.replace(temporal, self.path)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la caché de voz '{self.path}': {e}")
@@ -0,0 +1,28 @@
+# app/utils/texto.py
+import re
+import unicodedata
+
+
+def quitar_tildes(texto):
+    """Elimina tildes y diacríticos (á -> a, ñ -> n)."""
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', texto)
+        if unicodedata.category(c) != 'Mn'
+    )
+
+
+def normalizar_texto(texto):
+    """Normaliza texto: minúsculas, sin tildes, sin caracteres especiales"""
+    if not texto:
+        return ""
+
+    # Convertir a minúsculas y remover tildes
+    texto = quitar_tildes(texto.lower())
+
+    # Remover caracteres especiales, mantener letras, números y espacios
+    texto = re.sub(r'[^a-z0-9\s]', ' ', texto)
+
+    # Remover espacios extras
+    texto = re.sub(r'\s+', ' ', texto).strip()
+
+    return texto
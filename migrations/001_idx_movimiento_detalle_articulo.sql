@@ -0,0 +1,14 @@
+-- 001: índice para filtrar movimientos por artículo
+--
+-- El filtro por artículo de los listados de entradas/salidas (EXISTS sobre
+-- movimiento_detalle) busca las líneas de un artículo y llega a su cabecera.
+-- Con (id_articulo, id_movimiento_cabecera) la consulta se resuelve solo con
+-- el índice, sin recorrer movimiento_detalle completo.
+--
+-- Verificar con:
+--   EXPLAIN SELECT 1 FROM movimiento_detalle md
+--   WHERE md.id_articulo = 1 AND md.id_movimiento_cabecera = 1;
+-- La columna "key" debe mostrar idx_movimiento_detalle_articulo.
+
+CREATE INDEX idx_movimiento_detalle_articulo
+    ON movimiento_detalle (id_articulo, id_movimiento_cabecera);
@@ -0,0 +1,36 @@
+-- 002: snapshot del saldo de kardex por (artículo, almacén)
+--
+-- MovimientoModel.registrar_kardex y KardexModel.get_saldo_actual_articulo
+-- leen el último saldo con una búsqueda por clave primaria en lugar de
+-- ORDER BY fecha DESC, id_kardex DESC LIMIT 1 sobre kardex. La fila se
+-- actualiza en la misma transacción que el INSERT en kardex.
+
+CREATE TABLE IF NOT EXISTS kardex_saldo
+(
+    id_articulo      INT            NOT NULL,
+    id_almacen       INT            NOT NULL,
+    cantidad_saldo   DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    costo_promedio   DECIMAL(18, 6) NOT NULL DEFAULT 0,
+    valor_saldo      DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    id_kardex_ultimo INT            NULL,
+    fecha_ultimo     DATETIME       NULL,
+    actualizado_en   TIMESTAMP      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_articulo, id_almacen),
+    CONSTRAINT fk_kardex_saldo_articulo FOREIGN KEY (id_articulo) REFERENCES articulo (id_articulo),
+    CONSTRAINT fk_kardex_saldo_almacen FOREIGN KEY (id_almacen) REFERENCES almacen (id_almacen)
+);
+
+-- Carga inicial: último registro de kardex de cada par (mismo orden que registrar_kardex)
+INSERT INTO kardex_saldo
+(id_articulo, id_almacen, cantidad_saldo, costo_promedio, valor_saldo, id_kardex_ultimo, fecha_ultimo)
+SELECT k.id_articulo, k.id_almacen, k.cantidad_saldo, k.costo_promedio, k.valor_saldo, k.id_kardex, k.fecha
+FROM (SELECT k.*,
+             ROW_NUMBER() OVER (PARTITION BY k.id_articulo, k.id_almacen
+                 ORDER BY k.fecha DESC, k.id_kardex DESC) AS rn
+      FROM kardex k) k
+WHERE k.rn = 1
+ON DUPLICATE KEY UPDATE cantidad_saldo   = VALUES(cantidad_saldo),
+                        costo_promedio   = VALUES(costo_promedio),
+                        valor_saldo      = VALUES(valor_saldo),
+                        id_kardex_ultimo = VALUES(id_kardex_ultimo),
+                        fecha_ultimo     = VALUES(fecha_ultimo);
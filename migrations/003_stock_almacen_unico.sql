@@ -0,0 +1,13 @@
+-- 003: clave única de stock por (artículo, almacén)
+--
+-- MovimientoModel.actualizar_stock suma las entradas con
+-- INSERT ... ON DUPLICATE KEY UPDATE stock_actual = stock_actual + VALUES(stock_actual),
+-- que necesita esta clave para encontrar la fila existente. También es el
+-- índice que usa la resta con guarda de las salidas.
+--
+-- Si la creación falla por duplicados, consolidarlos antes con:
+--   SELECT id_articulo, id_almacen, COUNT(*) FROM stock_almacen
+--   GROUP BY id_articulo, id_almacen HAVING COUNT(*) > 1;
+
+ALTER TABLE stock_almacen
+    ADD UNIQUE KEY uk_stock_almacen_articulo_almacen (id_articulo, id_almacen);
@@ -0,0 +1,19 @@
+-- 004: índices compuestos para las consultas de kardex por rango de fechas
+--
+-- KardexModel y ReporteModel filtran el kardex con rangos semiabiertos
+-- (k.fecha >= inicio AND k.fecha < fin + 1 día) y ordenan por (fecha, id_kardex):
+--   - por artículo y almacén: idx_kardex_articulo_almacen_fecha
+--   - por almacén:            idx_kardex_almacen_fecha
+-- Ambos índices cubren también el ORDER BY, sin filesort.
+-- Los listados de movimientos ordenan y paginan por (fecha_movimiento, id).
+--
+-- Verificar con: flask db-explain --almacen <id> --articulo <id> [--desde AAAA-MM-DD --hasta AAAA-MM-DD]
+
+CREATE INDEX idx_kardex_articulo_almacen_fecha
+    ON kardex (id_articulo, id_almacen, fecha, id_kardex);
+
+CREATE INDEX idx_kardex_almacen_fecha
+    ON kardex (id_almacen, fecha, id_kardex);
+
+CREATE INDEX idx_movimiento_cabecera_fecha
+    ON movimiento_cabecera (fecha_movimiento, id_movimiento_cabecera);
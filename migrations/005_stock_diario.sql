@@ -0,0 +1,25 @@
+-- 005: resumen diario materializado de stock y valorización
+--
+-- Una fila por (día, almacén, artículo) con movimiento en el kardex: entradas
+-- y salidas del día y el saldo, costo promedio y valor al cierre. Los días
+-- sin movimiento no se guardan: el stock a una fecha X es la última fila con
+-- fecha <= X de cada par. Lo mantiene KardexModel.refrescar_stock_diario
+-- (al registrar movimientos) y el comando `flask stock-diario`.
+--
+-- Carga inicial: flask stock-diario --completo
+
+CREATE TABLE IF NOT EXISTS stock_diario
+(
+    fecha            DATE           NOT NULL,
+    id_almacen       INT            NOT NULL,
+    id_articulo      INT            NOT NULL,
+    cantidad_entrada DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    cantidad_salida  DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    valor_entrada    DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    valor_salida     DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    cantidad_cierre  DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    costo_promedio   DECIMAL(18, 6) NOT NULL DEFAULT 0,
+    valor_cierre     DECIMAL(18, 4) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_almacen, id_articulo, fecha),
+    KEY idx_stock_diario_fecha (fecha, id_almacen)
+);
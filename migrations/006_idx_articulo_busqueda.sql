@@ -0,0 +1,19 @@
+-- 006: índices para el autocompletado de artículos
+--
+-- ArticuloModel.autocompletar_articulos busca por:
+--   - prefijo de código (codigo LIKE 'abc%'): idx_articulo_codigo
+--     (omitir si codigo ya tiene un índice único)
+--   - prefijo de nombre para términos cortos y orden por nombre: idx_articulo_nombre
+--   - palabras del nombre (MATCH ... AGAINST '+lapi* +amar*'): ft_articulo_nombre
+--
+-- Las palabras de menos de innodb_ft_min_token_size (3 por defecto)
+-- no se indexan; para esas el modelo usa el prefijo de nombre.
+
+CREATE INDEX idx_articulo_codigo
+    ON articulo (codigo);
+
+CREATE INDEX idx_articulo_nombre
+    ON articulo (nombre);
+
+CREATE FULLTEXT INDEX ft_articulo_nombre
+    ON articulo (nombre);
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Permite `import app...` al ejecutar pytest desde la raíz del proyecto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,90 @@
+from app.services import catalogos as modulo
+from app.services.catalogos import CatalogCache
+
+
+class Cargador:
+    def __init__(self, valor):
+        self.valor = valor
+        self.llamadas = 0
+
+    def __call__(self):
+        self.llamadas += 1
+        return self.valor
+
+
+def test_get_guarda_y_devuelve_copias():
+    cache = CatalogCache()
+    cargar = Cargador([{'id_marca': 1, 'nombre': 'Faber'}])
+
+    primero = cache.get('marca', 'todas', cargar)
+    primero[0]['nombre'] = 'modificado'
+    segundo = cache.get('marca', 'todas', cargar)
+
+    assert cargar.llamadas == 1
+    assert segundo == [{'id_marca': 1, 'nombre': 'Faber'}]
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_no_guarda_resultados_vacios():
+    cache = CatalogCache()
+    cargar = Cargador([])
+
+    cache.get('marca', 'todas', cargar)
+    cache.get('marca', 'todas', cargar)
+
+    assert cargar.llamadas == 2
+
+
+def test_invalidar_solo_descarta_esa_tabla():
+    cache = CatalogCache()
+    marcas, categorias = Cargador(['m']), Cargador(['c'])
+    cache.get('marca', 'todas', marcas)
+    cache.get('categoria', 'todas', categorias)
+
+    cache.invalidar('marca')
+    cache.get('marca', 'todas', marcas)
+    cache.get('categoria', 'todas', categorias)
+
+    assert marcas.llamadas == 2
+    assert categorias.llamadas == 1
+
+
+def test_invalidacion_entre_workers(tmp_path):
+    worker_a = CatalogCache(directorio=str(tmp_path), intervalo=0)
+    worker_b = CatalogCache(directorio=str(tmp_path), intervalo=0)
+    cargar = Cargador(['almacen principal'])
+    worker_b.get('almacen', 'todos', cargar)
+    worker_b.get('almacen', 'todos', cargar)
+
+    worker_a.invalidar('almacen')
+    worker_b.get('almacen', 'todos', cargar)
+
+    assert (tmp_path / 'almacen.version').exists()
+    assert cargar.llamadas == 2
+
+
+def test_ttl(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(modulo.time, 'monotonic', lambda: ahora[0])
+    cache = CatalogCache(ttl=60)
+    cargar = Cargador(['x'])
+
+    cache.get('marca', 'todas', cargar)
+    ahora[0] += 59
+    cache.get('marca', 'todas', cargar)
+    ahora[0] += 2
+    cache.get('marca', 'todas', cargar)
+
+    assert cargar.llamadas == 2
+
+
+def test_no_guarda_valores_cargados_durante_una_invalidacion():
+    cache = CatalogCache()
+
+    def cargar_viejo():
+        # Otra petición modifica la tabla mientras esta todavía lee el valor anterior
+        cache.invalidar('marca')
+        return ['valor viejo']
+
+    assert cache.get('marca', 'todas', cargar_viejo) == ['valor viejo']
+    assert cache.get('marca', 'todas', Cargador(['valor nuevo'])) == ['valor nuevo']
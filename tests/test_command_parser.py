@@ -0,0 +1,70 @@
+import pytest
+
+from app.services.voice.command_parser import CommandParser
+
+
+@pytest.fixture
+def parser():
+    return CommandParser()
+
+
+@pytest.mark.parametrize('comando, intencion, producto, cantidad, confianza', [
+    ('entrada de dos cuadernos', 'REGISTRAR_ENTRADA', 'cuadernos', 2, 0.95),
+    ('Registrar salida de 5 cartulinas', 'REGISTRAR_SALIDA', 'cartulinas', 5, 0.95),
+    ('por favor una entrada de treinta y cinco lápices', 'REGISTRAR_ENTRADA', 'lápices', 35, 0.95),
+    ('ingresar ciento veinte hojas bond', 'REGISTRAR_ENTRADA', 'hojas bond', 120, 0.95),
+    ('vender dos unidades de borrador', 'REGISTRAR_SALIDA', 'borrador', 2, 0.95),
+    ('salida de 3 lapices para juan', 'REGISTRAR_SALIDA', 'lapices', 3, 0.8),
+])
+def test_movimientos(parser, comando, intencion, producto, cantidad, confianza):
+    resultado = parser.parse(comando)
+
+    assert resultado['intencion'] == intencion
+    assert resultado['producto'] == producto
+    assert resultado['cantidad'] == cantidad
+    assert resultado['confianza'] == confianza
+    assert not resultado['necesita_clarificacion']
+    assert resultado['origen'] == 'reglas'
+
+
+@pytest.mark.parametrize('comando, producto', [
+    ('buscar lápiz amarillo', 'lápiz amarillo'),
+    ('buscar cable 1.5 mm', 'cable 1.5 mm'),
+    ('buscar papel para impresora', 'papel para impresora'),
+])
+def test_busqueda_conserva_la_frase(parser, comando, producto):
+    resultado = parser.parse(comando)
+
+    assert resultado['intencion'] == 'BUSCAR_PRODUCTO'
+    assert resultado['producto'] == producto
+
+
+def test_campos_faltantes(parser):
+    sin_cantidad = parser.parse('entrada de cuadernos')
+    assert sin_cantidad['necesita_clarificacion']
+    assert sin_cantidad['campos_faltantes'] == ['cantidad']
+    assert sin_cantidad['confianza'] <= 0.9
+
+    sin_producto = parser.parse('salida de 4')
+    assert sin_producto['campos_faltantes'] == ['producto']
+
+
+def test_eliminar_no_esta_permitido(parser):
+    resultado = parser.parse('eliminar el producto lapiz')
+
+    assert resultado['intencion'] == 'ERROR'
+    assert resultado['confianza'] == 1.0
+
+
+@pytest.mark.parametrize('comando', [
+    '',
+    None,
+    'hola como estas',
+    'entrada de 2.5 kilos de arroz',
+    'salida de 2 5 cuadernos',
+    'entrada de dos cuadernos y tres lapices',
+    'cuantos lapices hay',
+    'registrar',
+])
+def test_comandos_ambiguos_quedan_para_gemini(parser, comando):
+    assert parser.parse(comando) is None
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.utils.pagination import KeysetPaginator, decode_cursor, encode_cursor
+
+
+def test_cursor_ida_y_vuelta_conserva_tipos():
+    clave = (datetime(2025, 3, 1, 10, 30, 15), date(2025, 3, 1), Decimal('12.50'), 42, 'abc')
+    token = encode_cursor('prev', clave, 3)
+
+    assert '=' not in token
+    assert decode_cursor(token) == ('prev', clave, 3)
+
+
+@pytest.mark.parametrize('token', ['', None, 'no-es-base64!', encode_cursor('arriba', (1,), 2)])
+def test_cursor_invalido_vuelve_a_la_primera_pagina(token):
+    assert decode_cursor(token) == ('next', None, 1)
+
+
+def _fuente(total):
+    """fetch_fn sobre una lista en memoria ordenada por (fecha, id) descendente."""
+    filas = [{'fecha': datetime(2025, 1, 1 + i // 3), 'id': i} for i in range(total)]
+
+    def clave(f):
+        return f['fecha'], f['id']
+
+    def fetch(desde, direccion, limit):
+        if direccion == 'next':
+            candidatas = sorted(filas, key=clave, reverse=True)
+            candidatas = [f for f in candidatas if desde is None or clave(f) < desde]
+        else:
+            candidatas = sorted(filas, key=clave)
+            candidatas = [f for f in candidatas if clave(f) > desde]
+        return candidatas[:limit]
+
+    return fetch, clave
+
+
+def _pagina(fetch, clave, cursor):
+    return KeysetPaginator(fetch, clave, cursor=cursor, per_page=4)
+
+
+def test_keyset_recorre_todas_las_filas_y_regresa():
+    fetch, clave = _fuente(10)
+
+    primera = _pagina(fetch, clave, '')
+    assert [f['id'] for f in primera.get_items()] == [9, 8, 7, 6]
+    assert not primera.has_prev and primera.has_next
+
+    segunda = _pagina(fetch, clave, primera.next_cursor)
+    assert [f['id'] for f in segunda.get_items()] == [5, 4, 3, 2]
+    assert segunda.page == 2
+
+    tercera = _pagina(fetch, clave, segunda.next_cursor)
+    assert [f['id'] for f in tercera.get_items()] == [1, 0]
+    assert tercera.has_prev and not tercera.has_next
+
+    anterior = _pagina(fetch, clave, tercera.prev_cursor)
+    assert [f['id'] for f in anterior.get_items()] == [5, 4, 3, 2]
+    assert anterior.page == 2
+
+
+def test_keyset_prev_al_inicio_muestra_primera_pagina_completa():
+    fetch, clave = _fuente(10)
+    primera = _pagina(fetch, clave, '')
+    segunda = _pagina(fetch, clave, primera.next_cursor)
+
+    # No hay más filas antes de la clave: se vuelve a la primera página
+    token = encode_cursor('prev', clave(segunda.get_items()[0]), 1)
+    inicio = _pagina(fetch, clave, token)
+    assert [f['id'] for f in inicio.get_items()] == [9, 8, 7, 6]
+    assert inicio.page == 1 and not inicio.has_prev
+
+
+def test_keyset_datos_de_paginacion():
+    fetch, clave = _fuente(6)
+    paginator = KeysetPaginator(fetch, clave, cursor='', per_page=4, count_fn=lambda: 6)
+    datos = paginator.get_pagination_data()
+
+    assert datos['modo'] == 'keyset'
+    assert datos['total_pages'] == 2
+    assert (datos['start_index'], datos['end_index']) == (1, 4)
@@ -0,0 +1,157 @@
+import pytest
+
+from app.services.voice import product_index
+from app.services.voice.product_index import (
+    ERROR_CARGA, ProductIndex, distancia_acotada, notificar_cambio_articulo, trigramas
+)
+
+
+class StemmerSimple:
+    """Sustituto del SnowballStemmer: quita la 's' final."""
+
+    def stem(self, palabra):
+        return palabra[:-1] if palabra.endswith('s') and len(palabra) > 3 else palabra
+
+
+def _articulo(id_articulo, nombre, codigo, categoria='', marca=''):
+    return {'id_articulo': id_articulo, 'nombre': nombre, 'codigo': codigo,
+            'categoria_nombre': categoria, 'marca_nombre': marca}
+
+
+CATALOGO = [
+    _articulo(1, 'Lapiz grafito', 'LAP-001', 'Utiles', 'Faber'),
+    _articulo(2, 'Boligrafo azul', 'BOL-002', 'Utiles', 'Pilot'),
+    _articulo(3, 'Cuadernos cuadriculados', 'CUA-003', 'Papeleria'),
+    _articulo(4, 'Papel bond A4', 'PAP-004', 'Papeleria', 'Chamex'),
+]
+
+
+class Fuente:
+    """Simula ArticuloModel: None en cargar_todos y ERROR_CARGA en cargar_uno si falla la base."""
+
+    def __init__(self, articulos):
+        self.articulos = {a['id_articulo']: a for a in articulos}
+        self.falla = False
+
+    def todos(self):
+        return None if self.falla else list(self.articulos.values())
+
+    def uno(self, id_articulo):
+        return ERROR_CARGA if self.falla else self.articulos.get(id_articulo)
+
+
+@pytest.fixture(autouse=True)
+def sin_modificados():
+    product_index._tomar_modificados()
+    yield
+    product_index._tomar_modificados()
+
+
+def _indice(fuente, **kwargs):
+    indice = ProductIndex(str.lower, StemmerSimple(), fuente.todos, fuente.uno, **kwargs)
+    indice.reconstruir()
+    return indice
+
+
+def test_ids_con_subcadena_coincide_con_recorrido_completo():
+    indice = _indice(Fuente(CATALOGO))
+
+    for palabra in ['la', 'pap', 'cuadern', 'utiles', 'bol-002', 'azul', 'xyz', 'a4']:
+        esperado = {e['articulo']['id_articulo'] for e in indice.todas()
+                    if any(palabra in token for token in e['tokens'])}
+        assert indice.ids_con_subcadena(palabra) == esperado, palabra
+
+
+def test_entrada_incluye_raices():
+    indice = _indice(Fuente(CATALOGO))
+    assert indice.ids_con_subcadena('cuaderno') == {3}
+    assert 'cuaderno' in indice.entradas[3]['nombre_raiz']
+
+
+def test_cache_de_subcadenas_acotada():
+    indice = _indice(Fuente(CATALOGO), max_cache=2)
+    for palabra in ['lap', 'bol', 'cua']:
+        indice.ids_con_subcadena(palabra)
+
+    assert list(indice._cache_subcadenas) == ['bol', 'cua']
+
+
+def test_reconstruir_con_error_conserva_el_indice():
+    fuente = Fuente(CATALOGO)
+    indice = _indice(fuente)
+    fuente.falla = True
+
+    indice.reconstruir()
+
+    assert len(indice.entradas) == 4
+    assert indice.ids_con_subcadena('lapiz') == {1}
+
+
+def test_refrescar_articulo_actualiza_y_quita():
+    fuente = Fuente(CATALOGO)
+    indice = _indice(fuente)
+    indice.ids_con_subcadena('lapiz')
+
+    fuente.articulos[1] = _articulo(1, 'Portaminas', 'LAP-001')
+    indice.refrescar_articulo(1)
+    assert indice.ids_con_subcadena('lapiz') == set()
+    assert indice.ids_con_subcadena('portaminas') == {1}
+
+    del fuente.articulos[2]
+    indice.refrescar_articulo(2)
+    assert 2 not in indice.entradas
+    assert 'boligrafo' not in indice.vocabulario
+
+
+def test_refrescar_articulo_con_error_conserva_la_entrada_y_reintenta():
+    fuente = Fuente(CATALOGO)
+    indice = _indice(fuente)
+    fuente.falla = True
+
+    notificar_cambio_articulo(1)
+    indice.asegurar_actualizado()
+
+    assert indice.ids_con_subcadena('lapiz') == {1}
+    assert product_index._articulos_modificados == {1}
+
+    fuente.falla = False
+    fuente.articulos[1] = _articulo(1, 'Portaminas', 'LAP-001')
+    indice.asegurar_actualizado()
+
+    assert indice.ids_con_subcadena('portaminas') == {1}
+    assert product_index._articulos_modificados == set()
+
+
+def test_trigramas_con_relleno():
+    assert trigramas('sol') == {'$$s', '$so', 'sol', 'ol$', 'l$$'}
+
+
+@pytest.mark.parametrize('a, b, maximo, esperado', [
+    ('boligrafo', 'boligrafo', 2, 0),
+    ('boligafo', 'boligrafo', 2, 1),
+    ('cuadreno', 'cuaderno', 2, 2),
+    ('lapiz', 'papel', 2, 3),
+    ('lapiz', 'lapicero', 2, 3),
+    ('', 'abc', 3, 3),
+])
+def test_distancia_acotada(a, b, maximo, esperado):
+    assert distancia_acotada(a, b, maximo) == esperado
+
+
+def test_similares_corrige_errores_de_reconocimiento():
+    indice = _indice(Fuente(CATALOGO))
+
+    assert indice.similares('boligafo')[0] == ('boligrafo', 1)
+    assert ('lapiz', 1) in indice.similares('lapis')
+    assert indice.similares('grafito') == []
+    assert indice.similares('zzzzzz') == []
+
+
+def test_similares_coincide_con_recorrido_completo():
+    indice = _indice(Fuente(CATALOGO))
+
+    for palabra in ['cuadreno', 'papl', 'azl', 'chamez', 'pilto']:
+        maximo = 1 if len(palabra) <= 5 else 2
+        esperado = {token for token in indice.vocabulario
+                    if token != palabra and distancia_acotada(palabra, token, maximo) <= maximo}
+        assert {token for token, _ in indice.similares(palabra)} == esperado, palabra
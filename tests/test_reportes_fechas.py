@@ -0,0 +1,18 @@
+# tests/test_reportes_fechas.py
+import pytest
+
+from app.controllers.reportes_controller import _parsear_fecha
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    ('2026-01-05', '2026-01-05'),
+    ('2026-1-5', '2026-01-05'),
+    ('2026-12-31', '2026-12-31'),
+])
+def test_normaliza_fechas_validas(valor, esperado):
+    assert _parsear_fecha(valor) == esperado
+
+
+@pytest.mark.parametrize('valor', [None, '', 'abc', '2026-13-01', '2026-02-30', '05/01/2026'])
+def test_rechaza_fechas_invalidas(valor):
+    assert _parsear_fecha(valor) is None
@@ -0,0 +1,56 @@
+# tests/test_response_cache.py
+from app.utils.response_cache import ResponseCache
+
+
+def test_devuelve_copia_y_cuenta_aciertos():
+    cache = ResponseCache(max_items=10, ttl=60)
+    respuesta = {'intencion': 'BUSCAR_PRODUCTO', 'productos': [1, 2]}
+    cache.set('buscar lapiz', respuesta)
+
+    obtenida = cache.get('buscar lapiz')
+    obtenida['productos'].append(3)
+
+    assert cache.get('buscar lapiz') == respuesta
+    assert cache.get('otro comando') is None
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 1
+
+
+def test_descarta_el_menos_usado():
+    cache = ResponseCache(max_items=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_expira_por_ttl(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr('app.utils.response_cache.time.time', lambda: ahora[0])
+    cache = ResponseCache(max_items=10, ttl=30)
+    cache.set('a', 1)
+
+    ahora[0] += 31
+    assert cache.get('a') is None
+    assert cache.stats()['items'] == 0
+
+
+def test_persiste_entre_instancias(tmp_path):
+    ruta = str(tmp_path / 'cache.json')
+    cache = ResponseCache(max_items=10, ttl=60, path=ruta, save_interval=0)
+    cache.set('buscar lapiz', {'producto': 'lapiz'})
+
+    recargada = ResponseCache(max_items=10, ttl=60, path=ruta)
+    assert recargada.get('buscar lapiz') == {'producto': 'lapiz'}
+
+
+def test_archivo_danado_no_impide_iniciar(tmp_path):
+    ruta = tmp_path / 'cache.json'
+    ruta.write_text('{no es json', encoding='utf-8')
+
+    cache = ResponseCache(path=str(ruta))
+    assert cache.stats()['items'] == 0
@@ -0,0 +1,27 @@
+# tests/test_venta_fechas.py
+from datetime import datetime
+
+import pytest
+
+from app.models.venta_model import VentaModel
+
+
+@pytest.fixture
+def modelo():
+    return VentaModel()
+
+
+def test_acepta_texto_iso(modelo):
+    assert modelo._parsear_fecha('2026-10-18T09:30') == datetime(2026, 10, 18, 9, 30)
+    assert modelo._parsear_fecha('2026-10-18 09:30:15') == datetime(2026, 10, 18, 9, 30, 15)
+
+
+def test_descarta_fracciones_de_segundo(modelo):
+    # DATETIME no guarda microsegundos: la fecha debe coincidir con la almacenada
+    assert modelo._parsear_fecha(datetime(2026, 10, 18, 9, 30, 15, 999999)) == datetime(2026, 10, 18, 9, 30, 15)
+    assert modelo._parsear_fecha('2026-10-18T09:30:15.250000') == datetime(2026, 10, 18, 9, 30, 15)
+
+
+@pytest.mark.parametrize('valor', ['', 'abc', '18/10/2026', None])
+def test_rechaza_fechas_invalidas(modelo, valor):
+    assert modelo._parsear_fecha(valor) is None
@@ -0,0 +1,63 @@
+# tests/test_voice_jobs.py
+import threading
+import time
+
+from app.services.voice.voice_jobs import VoiceJobManager
+
+
+def _esperar(manager, job_id, estados, limite=2.0):
+    fin = time.time() + limite
+    while time.time() < fin:
+        job = manager.get(job_id)
+        if job and job['estado'] in estados:
+            return job
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_completa_y_publica_para_otro_worker(tmp_path):
+    manager = VoiceJobManager(max_workers=1, directorio=str(tmp_path))
+    otro_worker = VoiceJobManager(max_workers=1, directorio=str(tmp_path))
+
+    job_id = manager.submit(lambda texto: {'texto': texto}, 'buscar lapiz', usuario_id=7)
+    _esperar(manager, job_id, (VoiceJobManager.COMPLETADO,))
+
+    job = otro_worker.get(job_id)
+    assert job['estado'] == VoiceJobManager.COMPLETADO
+    assert job['usuario_id'] == 7
+    assert job['resultado'] == {'texto': 'buscar lapiz'}
+
+
+def test_expirados_que_siguen_corriendo_ocupan_cupo():
+    liberar = threading.Event()
+    manager = VoiceJobManager(max_workers=1, max_pending=1, timeout=0.05)
+
+    job_id = manager.submit(liberar.wait, 5)
+    assert _esperar(manager, job_id, (VoiceJobManager.EXPIRADO,))['estado'] == VoiceJobManager.EXPIRADO
+
+    # El trabajo expiró pero sigue ejecutándose: no hay cupo para otro
+    assert manager.submit(lambda: None) is None
+
+    liberar.set()
+    fin = time.time() + 2
+    nuevo = None
+    while nuevo is None and time.time() < fin:
+        nuevo = manager.submit(lambda: 'ok')
+        time.sleep(0.01)
+    assert nuevo is not None
+
+
+def test_error_en_el_trabajo():
+    manager = VoiceJobManager(max_workers=1)
+
+    def falla():
+        raise ValueError('sin respuesta')
+
+    job = _esperar(manager, manager.submit(falla), (VoiceJobManager.ERROR,))
+    assert job['estado'] == VoiceJobManager.ERROR
+    assert job['error'] == 'sin respuesta'
+
+
+def test_id_invalido_no_lee_archivos(tmp_path):
+    manager = VoiceJobManager(directorio=str(tmp_path))
+    assert manager.get('../../etc/passwd') is None